@@ -1,7 +1,12 @@
 import datetime
+import threading
+import weakref
+from decimal import Decimal, localcontext
+from functools import lru_cache
 from user import User
 from logger import log
-from currency import currate
+from concurrency import IdAllocator, account_locks
+from money import Money, _money, _round_div
 """
 Модуль accounts містить класи для роботи з банківськими рахунками.
 
@@ -9,34 +14,179 @@ from currency import currate
 - Cheking_account: Базовий клас для чекових рахунків.
 - Savings_account: Клас для ощадних рахунків, успадкований від Cheking_account.
 - Credit_account: Клас для кредитних рахунків, успадкований від Savings_account.
+
+Функції:
+- accrue_all: Нараховує відсотки на всі ощадні та кредитні рахунки банку за один прохід.
+- observe_blocking: Підписує об'єкт на зміни статусу блокування рахунків.
+- observe_balances: Підписує об'єкт на зміни балансів рахунків.
+- register_history: Реєструє джерело історії транзакцій рахунків.
 """
 
+_block_observers = ()
+_balance_observers = ()
+_history_sources = ()
+_observers_lock = threading.Lock()
+
+
+def observe_blocking(observer):
+    """
+        Підписує об'єкт на зміни статусу блокування рахунків (block_account, unblock_account).
+
+        Зберігається лише слабке посилання, тож підписка не утримує об'єкт у пам'яті.
+
+        Аргументи:
+            observer: Об'єкт з методом _blocked_changed(account).
+    """
+    global _block_observers
+    with _observers_lock:
+        _block_observers = tuple(ref for ref in _block_observers if ref() is not None) + (weakref.ref(observer),)
+
+
+def observe_balances(observer):
+    """
+        Підписує об'єкт на зміни балансів рахунків (deposit, withdraw, перекази, нарахування відсотків).
+
+        Зберігається лише слабке посилання, тож підписка не утримує об'єкт у пам'яті.
+
+        Аргументи:
+            observer: Об'єкт з методом _balance_changed(account, balance, credit), де balance та credit - зміна
+                балансу та кредиту рахунку у мінорних одиницях.
+    """
+    global _balance_observers
+    with _observers_lock:
+        _balance_observers = tuple(ref for ref in _balance_observers if ref() is not None) + (weakref.ref(observer),)
+
+
+def register_history(source):
+    """
+        Реєструє джерело історії транзакцій рахунків (див. Cheking_account.history).
+
+        Зберігається лише слабке посилання, тож реєстрація не утримує джерело у пам'яті.
+
+        Аргументи:
+            source: Об'єкт з методами has(account_id) та page(account_id, since, until, limit, cursor).
+    """
+    global _history_sources
+    with _observers_lock:
+        _history_sources = tuple(ref for ref in _history_sources if ref() is not None) + (weakref.ref(source),)
+
+
+def _nanoseconds(value, name : str) -> int:
+    """Перетворює межу часу (наносекунди від епохи або datetime) на наносекунди."""
+    if isinstance(value, datetime.datetime):
+        return int(value.timestamp()) * 10 ** 9 + value.microsecond * 1000
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    e = TypeError(f"{name} повинно бути цілим числом наносекунд або datetime, а не {value!r}")
+    log.exception("Неправильний запит історії рахунку", e)
+    raise e
+
+
+def _notify_blocked(account):
+    """Повідомляє підписників про зміну статусу блокування рахунку."""
+    for ref in _block_observers:
+        observer = ref()
+        if observer is not None:
+            observer._blocked_changed(account)
+
+
+def _notify_balance(account, balance : int, credit : int = 0):
+    """Повідомляє підписників про зміну балансу (та кредиту) рахунку у мінорних одиницях."""
+    for ref in _balance_observers:
+        observer = ref()
+        if observer is not None:
+            observer._balance_changed(account, balance, credit)
+
+
+def _add_months(date : datetime.date, months : int) -> datetime.date:
+    """
+        Додає до дати вказану кількість місяців (день обрізається до кінця місяця).
+
+        Аргументи:
+            date (datetime.date): Початкова дата.
+            months (int): Кількість місяців.
+
+        Повертає:
+            datetime.date: Нова дата.
+    """
+    # calendar (разом з locale) імпортується лише при першому нарахуванні, а не під час імпорту модуля.
+    import calendar
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def _months_between(start : datetime.date, end : datetime.date) -> int:
+    """
+        Повертає кількість повних місяців між двома датами.
+
+        Аргументи:
+            start (datetime.date): Початкова дата.
+            end (datetime.date): Кінцева дата.
+
+        Повертає:
+            int: Кількість повних місяців (0, якщо end раніше start).
+    """
+    months = (end.year - start.year) * 12 + (end.month - start.month)
+    if end.day < start.day:
+        months -= 1
+    return max(months, 0)
+
+
+@lru_cache(maxsize=4096)
+def _interest_ratio(percent : float, periods : int) -> tuple:
+    """
+        Повертає точний множник відсотків (1 + percent) ** periods - 1 у вигляді дробу.
+
+        Степінь обчислюється у Decimal з 40 значущими цифрами, тому результат не залежить
+        від кількості періодів так, як накопичення у циклі. Результати кешуються.
+
+        Аргументи:
+            percent (float): Ставка за період.
+            periods (int): Кількість періодів.
+
+        Повертає:
+            tuple: (чисельник, знаменник) множника.
+    """
+    with localcontext() as ctx:
+        ctx.prec = 40
+        return ((Decimal(1) + Decimal(percent)) ** periods - 1).as_integer_ratio()
+
 
 class Cheking_account:
     """
         Клас, що представляє чековий рахунок.
 
         Атрибути класу:
-        - __id: Лічильник для генерації унікальних ID рахунків.
+        - __ids: Потокобезпечний генератор унікальних ID рахунків (IdAllocator).
         - _suported_currency: Список підтримуваних валют.
 
         Атрибути екземпляра:
         - _account_id: Унікальний ідентифікатор рахунку.
         - _currency: Валюта рахунку.
-        - _balance: Поточний баланс рахунку.
+        - _balance: Поточний баланс рахунку (Money у валюті рахунку).
         - _owner: Власник рахунку (об'єкт класу User).
         - _blocked: Статус блокування рахунку.
 
         Методи:
         - __init__: Ініціалізує рахунок.
         - change_id: Змінює ID рахунку (класовий метод).
+        - _reserve_ids: Резервує діапазон ID для пакетного створення рахунків (класовий метод).
         - deposit: Поповнює рахунок.
         - withdraw: Знімає кошти з рахунку.
+        - _prepare_deposit, _prepare_withdraw: Перевіряють операцію без зміни балансу (перша фаза переказу).
         - block_account: Блокує рахунок.
         - unblock_account: Розблоковує рахунок.
+        - history: Повертає сторінку історії транзакцій рахунку за період.
+        - iter_history: Потоково повертає історію транзакцій рахунку за період.
+        - _state, _load_state: Повертають та встановлюють змінний стан рахунку для журналу.
+        - _dump, _restore: Повертають дані рахунку для журналу та відновлюють з них рахунок.
         """
-    __id = 1
+    __slots__ = ("_account_id", "_currency", "_balance", "_owner", "_blocked")
+    __ids = IdAllocator()
     _suported_currency = ["UAH", "USD", "EUR"]
+    _kind = "checking"
 
     def __init__(self, user : User, currency : str= "UAH") -> None:
         """
@@ -56,15 +206,16 @@ class Cheking_account:
             raise e
 
         if not isinstance(user, User):
-            log.exception(f"Неіснуючий користувач : {user}", TypeError())
+            log.exception("Неіснуючий користувач : %s", TypeError(), user)
             raise TypeError("Неіснуючий користувач")
 
         self._account_id = Cheking_account.change_id()
         self._currency = currency
-        self._balance = 0
+        self._balance = Money(0, currency)
         self._owner = user
         self._blocked = False
-        log.info(f"Рахунок з id = {self._account_id}, користувача {user}, було успішно створено!")
+        log.info("Рахунок з id = %s, користувача %s, було успішно створено!", self._account_id, user,
+                 account_id=self._account_id, user_id=user._user_id)
 
     @classmethod
     def change_id(cls):
@@ -74,88 +225,294 @@ class Cheking_account:
             Повертає:
                     int: Новий ID рахунку.
             """
-        cls.__id += 1
-        return cls.__id - 1
+        return Cheking_account.__ids.next()
 
-    def deposit(self, suma : (int, float), currency : str = "UAH"):
+    @classmethod
+    def _advance_id(cls, account_id : int):
+        """
+            Гарантує, що наступні згенеровані ID будуть більшими за account_id.
+
+            Аргументи:
+                account_id (int): Вже використаний ID.
+        """
+        Cheking_account.__ids.advance(account_id)
+
+    @staticmethod
+    def _next_id() -> int:
+        """Повертає ID, який буде видано наступному рахунку."""
+        return Cheking_account.__ids.peek()
+
+    @classmethod
+    def _reserve_ids(cls, count : int) -> range:
+        """
+            Резервує count наступних ID рахунків (для Bank.bulk_create_accounts).
+
+            Аргументи:
+                count (int): Кількість ID.
+
+            Повертає:
+                range: Зарезервовані ID.
+        """
+        return Cheking_account.__ids.reserve(count)
+
+    @classmethod
+    def _stride_ids(cls, step : int, offset : int):
+        """
+            Задає крок ID рахунків (див. IdAllocator.stride), щоб шарди не видавали однакових ID.
+
+            Аргументи:
+                step (int): Крок ID.
+                offset (int): Остача ID від ділення на step.
+        """
+        Cheking_account.__ids.stride(step, offset)
+
+    def _state(self) -> dict:
+        """
+            Повертає змінний стан рахунку (те, що змінюють транзакції).
+
+            Повертає:
+                dict: Баланс у мінорних одиницях та статус блокування.
+        """
+        return {"balance": self._balance._minor, "blocked": self._blocked}
+
+    def _load_state(self, state : dict):
+        """
+            Встановлює змінний стан рахунку, отриманий з _state.
+
+            Аргументи:
+                state (dict): Стан рахунку.
+        """
+        self._balance = _money(state["balance"], self._currency)
+        self._blocked = state["blocked"]
+
+    def _dump(self) -> dict:
+        """
+            Повертає всі дані рахунку для журналу.
+
+            Повертає:
+                dict: Тип, ID, ID власника, валюта, параметри та стан рахунку.
+        """
+        data = {"type": self._kind, "id": self._account_id, "owner": self._owner._user_id, "currency": self._currency}
+        data.update(self._state())
+        return data
+
+    @classmethod
+    def _restore(cls, data : dict, owner : User, advance : bool = True):
+        """
+            Відновлює рахунок з даних журналу без генерації нового ID.
+
+            Аргументи:
+                data (dict): Дані, отримані з _dump.
+                owner (User): Власник рахунку.
+                advance (bool, optional): Зсунути лічильник ID за ID рахунку. False - якщо ID вже
+                    зарезервовано (Bank.bulk_create_accounts). За замовчуванням True.
+
+            Повертає:
+                Cheking_account: Відновлений рахунок.
+        """
+        account = object.__new__(cls)
+        account._account_id = data["id"]
+        account._currency = data["currency"]
+        account._owner = owner
+        account._restore_params(data)
+        account._load_state(data)
+        if advance:
+            Cheking_account._advance_id(account._account_id)
+        return account
+
+    def _restore_params(self, data : dict):
+        """Встановлює незмінні параметри рахунку з даних журналу."""
+        pass
+
+    def deposit(self, suma : (int, float, Money), currency : str = "UAH"):
         """
             Поповнює рахунок на вказану суму.
 
             Аргументи:
-                suma (int, float): Сума для поповнення.
-                currency (str, optional): Валюта суми. За замовчуванням "UAH".
+                suma (int, float, Money): Сума для поповнення.
+                currency (str, optional): Валюта суми (для Money береться його валюта). За замовчуванням "UAH".
 
             Винятки:
                 ValueError: Якщо валюта не підтримується.
                 Exception: Якщо suma не є числом або менше/рівне 0.05.
                 """
+        amount = self._prepare_deposit(suma, currency)
+        self._balance += amount
+        _notify_balance(self, amount._minor)
+
+    def _prepare_deposit(self, suma : (int, float, Money), currency : str = "UAH") -> Money:
+        """
+            Перевіряє поповнення рахунку, не змінюючи баланс.
+
+            Аргументи:
+                suma (int, float, Money): Сума для поповнення.
+                currency (str, optional): Валюта суми (для Money береться його валюта). За замовчуванням "UAH".
+
+            Повертає:
+                Money: Сума поповнення у валюті рахунку.
+
+            Винятки:
+                ValueError: Якщо валюта не підтримується.
+                Exception: Якщо suma не є числом або менше/рівне 0.05.
+        """
+        if isinstance(suma, Money):
+            currency = suma._currency
         if currency not in self._suported_currency:
             e = ValueError(f"Значення {currency}, для валют не припустиме")
             log.exception("Некоректна валюта для рахунку", e)
             raise e
 
-        if not isinstance(suma, (float, int)) or suma <= 0.05:
-            e = Exception(f"Сума дезиту не може приймати знчення: {suma}, мінімальне значення депозиту: {suma} {currency}")
+        if not isinstance(suma, (float, int, Money)) or suma <= 0.05:
+            e = Exception(f"Сума дезиту не може приймати знчення: {suma}, мінімальне значення депозиту: 0.05 {currency}")
             log.exception("Помилка суми депозиту", e)
             raise e
 
-        realsum = currate.convert(suma, currency, self._currency)
-        self._balance += realsum
+        return Money.of(suma, currency).convert(self._currency)
 
-    def withdraw(self, suma : (int, float), currency : str = "UAH"):
+    def withdraw(self, suma : (int, float, Money), currency : str = "UAH"):
         """
             Знімає вказану суму з рахунку.
 
             Аргументи:
-                suma (int, float): Сума для зняття.
-                currency (str, optional): Валюта суми. За замовчуванням "UAH".
+                suma (int, float, Money): Сума для зняття.
+                currency (str, optional): Валюта суми (для Money береться його валюта). За замовчуванням "UAH".
 
                 Винятки:
                 ValueError: Якщо валюта не підтримується.
                 Exception: Якщо suma не є числом або менше/рівне 0.
                 Exception: Якщо на рахунку недостатньо коштів.
             """
+        amount = self._prepare_withdraw(suma, currency)
+        self._balance -= amount
+        _notify_balance(self, -amount._minor)
+
+    def _prepare_withdraw(self, suma : (int, float, Money), currency : str = "UAH") -> Money:
+        """
+            Перевіряє зняття з рахунку (валюту, суму та достатність коштів), не змінюючи баланс.
+
+            Аргументи:
+                suma (int, float, Money): Сума для зняття.
+                currency (str, optional): Валюта суми (для Money береться його валюта). За замовчуванням "UAH".
+
+            Повертає:
+                Money: Сума зняття у валюті рахунку.
+
+            Винятки:
+                ValueError: Якщо валюта не підтримується.
+                Exception: Якщо suma не є числом, менше/рівне 0 або на рахунку недостатньо коштів.
+        """
+        if isinstance(suma, Money):
+            currency = suma._currency
         if currency not in self._suported_currency:
             e = ValueError(f"Значення {currency}, для валют не припустиме")
             log.exception("Некоректна валюта для рахунку", e)
             raise e
 
-        if not isinstance(suma, (float, int)) or suma <= 0:
-            e = Exception(f"Сума дезиту не може приймати знчення: {sum}")
+        if not isinstance(suma, (float, int, Money)) or suma <= 0:
+            e = Exception(f"Сума дезиту не може приймати знчення: {suma}")
             log.exception("Помилка суми депозиту", e)
             raise e
 
 
-        realsum = currate.convert(suma, currency, self._currency)
+        realsum = Money.of(suma, currency).convert(self._currency)
 
         if self._balance < realsum:
             e = Exception("На рахунку недостатньо коштів")
-            log.exception(f"На рахунку {self._account_id}, недостатньо коштів", e)
+            log.exception("На рахунку %s, недостатньо коштів", e, self._account_id, account_id=self._account_id)
             raise e
 
-        self._balance -= realsum
+        return realsum
 
     def block_account(self):
         """Блокує рахунок."""
         self._blocked = True
+        _notify_blocked(self)
 
     def unblock_account(self):
         """Розблоковує рахунок."""
         self._blocked = False
+        _notify_blocked(self)
+
+    def history(self, since=None, until=None, limit : int = None, cursor : int = None) -> tuple:
+        """
+            Повертає сторінку історії транзакцій рахунку, виконаних через банк (Bank.execute, Bank.execute_batch).
+
+            Період шукається бінарним пошуком в історії рахунку, тож вартість не залежить
+            від кількості транзакцій банку.
+
+            Аргументи:
+                since (int, datetime, optional): Початок періоду (включно), наносекунди від епохи або datetime.
+                until (int, datetime, optional): Кінець періоду (не включно).
+                limit (int, optional): Максимальна кількість записів. За замовчуванням - усі.
+                cursor (int, optional): Курсор, повернутий попередньою сторінкою того самого запиту.
+
+            Повертає:
+                tuple: (список TransactionRecord у порядку виконання, курсор наступної сторінки або None).
+
+            Винятки:
+                TypeError: Якщо межі періоду, limit або cursor мають неправильний тип.
+                ValueError: Якщо limit не є додатним або cursor від'ємний.
+        """
+        for name, value in (("limit", limit), ("cursor", cursor)):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                e = TypeError(f"{name} повинно бути цілим числом, а не {value!r}")
+                log.exception("Неправильний запит історії рахунку", e)
+                raise e
+        if (limit is not None and limit < 1) or (cursor is not None and cursor < 0):
+            e = ValueError("limit повинно бути додатним, а cursor - невід'ємним")
+            log.exception("Неправильний запит історії рахунку", e)
+            raise e
+        since = _nanoseconds(since, "since") if since is not None else None
+        until = _nanoseconds(until, "until") if until is not None else None
+
+        for ref in _history_sources:
+            source = ref()
+            if source is not None and source.has(self._account_id):
+                return source.page(self._account_id, since, until, limit, cursor)
+        return [], None
+
+    def iter_history(self, since=None, until=None, page : int = 1024):
+        """
+            Потоково повертає історію транзакцій рахунку за період (наприклад, для формування виписки).
+
+            Історія читається сторінками по page записів, тож пам'ять не залежить від довжини періоду.
+
+            Аргументи:
+                since (int, datetime, optional): Початок періоду (включно).
+                until (int, datetime, optional): Кінець періоду (не включно).
+                page (int, optional): Розмір сторінки. За замовчуванням 1024.
+
+            Повертає:
+                generator: Записи TransactionRecord у порядку виконання.
+        """
+        records, cursor = self.history(since, until, page)
+        yield from records
+        while cursor is not None:
+            records, cursor = self.history(since, until, page, cursor)
+            yield from records
 
 class Savings_account(Cheking_account):
     """
         Клас, що представляє ощадний рахунок.
 
+        Атрибути класу:
+        - _clock: Функція, що повертає поточну дату (datetime.date.today за замовчуванням).
+
         Атрибути екземпляра:
-        - __last_interest_date: Дата останнього нарахування відсотків.
-        - __period: Період нарахування відсотків (у місяцях).
-        - __percent: Відсоткова ставка.
+        - _last_interest_date: Дата останнього нарахування відсотків.
+        - _period: Період нарахування відсотків (у місяцях).
+        - _percent: Відсоткова ставка.
 
         Методи:
         - __init__: Ініціалізує ощадний рахунок.
+        - set_clock: Встановлює джерело поточної дати (класовий метод).
+        - interest_due: Розраховує відсотки без їх нарахування.
         - calculate_interest: Розраховує та нараховує відсотки.
     """
+    __slots__ = ("_last_interest_date", "_period", "_percent")
+    _clock = staticmethod(datetime.date.today)
+    _kind = "savings"
+
     def __init__(self, user: User, period : int, percent : float, currency : str= "UAH") -> None:
         """
             Ініціалізує новий ощадний рахунок.
@@ -169,41 +526,102 @@ class Savings_account(Cheking_account):
             Винятки:
                 TypeError: Якщо period або percent мають невірний тип.
         """
-        if not isinstance(period, int) or not isinstance(percent, float) or percent < 0 or percent > 100:
+        if not isinstance(period, int) or period <= 0 or not isinstance(percent, float) or percent < 0 or percent > 100:
             log.exception("Не вірні типи данних в атрибутах period, percent", TypeError())
             raise TypeError("Не вірні типи данних в атрибутах period, percent")
 
         super().__init__(user, currency)
-        self.__last_interest_date = datetime.date.today()
-        self.__period = period
-        self.__percent = percent
+        self._last_interest_date = self._clock()
+        self._period = period
+        self._percent = percent
 
-    def calculate_interest(self):
+    @classmethod
+    def set_clock(cls, clock):
         """
-            Розраховує та нараховує відсотки на рахунок.
+            Встановлює джерело поточної дати для нарахування відсотків.
+
+            Аргументи:
+                clock (callable): Функція без аргументів, що повертає datetime.date.
+        """
+        cls._clock = staticmethod(clock)
+
+    def _state(self) -> dict:
+        state = super()._state()
+        state["last_interest"] = self._last_interest_date.toordinal()
+        return state
+
+    def _load_state(self, state : dict):
+        super()._load_state(state)
+        self._last_interest_date = datetime.date.fromordinal(state["last_interest"])
+
+    def _dump(self) -> dict:
+        data = super()._dump()
+        data["period"] = self._period
+        data["percent"] = self._percent
+        return data
+
+    def _restore_params(self, data : dict):
+        self._period = data["period"]
+        self._percent = data["percent"]
+
+    def _interest_base(self) -> Money:
+        """Повертає суму, на яку нараховуються відсотки."""
+        return self._balance
+
+    def _apply_interest(self, interest : Money):
+        """Зараховує відсотки на рахунок."""
+        self._balance += interest
+        _notify_balance(self, interest._minor)
+
+    def interest_due(self, as_of : datetime.date = None) -> Money:
+        """
+            Розраховує відсотки за повні періоди без їх нарахування.
+
+            Аргументи:
+                as_of (datetime.date, optional): Дата розрахунку. За замовчуванням - поточна дата _clock.
 
             Повертає:
-                float: Сума нарахованих відсотків.
-            """
-        today = datetime.date.today()
-        months_passed = (today.year - self.__last_interest_date.year) * 12 + (
-                    today.month - self.__last_interest_date.month)
+                Money: Сума відсотків.
+        """
+        return self._accrual(as_of or self._clock())[1]
+
+    def _accrual(self, as_of : datetime.date) -> tuple:
+        """
+            Повертає кількість повних періодів до as_of та відсотки за них.
 
-        if today.day < self.__last_interest_date.day:
-            months_passed -= 1
+            Аргументи:
+                as_of (datetime.date): Дата розрахунку.
+
+            Повертає:
+                tuple: (кількість періодів, Money відсотків).
+        """
+        periods = _months_between(self._last_interest_date, as_of) // self._period
+        if periods < 1:
+            return 0, Money(0, self._currency)
+        numerator, denominator = _interest_ratio(self._percent, periods)
+        return periods, _money(_round_div(self._interest_base()._minor * numerator, denominator, Money.default_rounding),
+                               self._currency)
+
+    def calculate_interest(self, as_of : datetime.date = None):
+        """
+            Розраховує та нараховує відсотки на рахунок.
 
-        full_periods = months_passed // self.__period
+            Відсотки за n повних періодів обчислюються одразу за формулою (1 + r) ** n
+            з одним округленням, без циклу по періодах.
 
-        if full_periods >= 1:
-            initial_balance = self._balance
-            for _ in range(full_periods):
-                self._balance += self._balance * self.__percent
+            Аргументи:
+                as_of (datetime.date, optional): Дата розрахунку. За замовчуванням - поточна дата _clock.
 
-            self.__last_interest_date = today
+            Повертає:
+                Money: Сума нарахованих відсотків.
+            """
+        periods, interest = self._accrual(as_of or self._clock())
+        if periods < 1:
+            return interest
 
-            return self._balance - initial_balance
-        else:
-            return 0.0
+        self._apply_interest(interest)
+        self._last_interest_date = _add_months(self._last_interest_date, periods * self._period)
+        return interest
 
 
 class Credit_account(Savings_account):
@@ -211,14 +629,17 @@ class Credit_account(Savings_account):
         Клас, що представляє кредитний рахунок.
 
         Атрибути екземпляра:
-        - _limit: Кредитний ліміт.
-        - _credit: Поточний розмір кредиту.
+        - _limit: Кредитний ліміт (Money).
+        - _credit: Поточний розмір кредиту (Money).
 
         Методи:
         - __init__: Ініціалізує кредитний рахунок.
-        - calculate_interest: Розраховує відсотки за кредитом.
-        - withdraw: Знімає кошти з рахунку з урахуванням кредитного ліміту.
+        - calculate_interest: Розраховує та додає до кредиту відсотки на використану частину ліміту.
+        - _prepare_withdraw: Перевіряє зняття з урахуванням кредитного ліміту.
     """
+    __slots__ = ("_limit", "_credit")
+    _kind = "credit"
+
     def __init__(self, limit : (float, int), user : User, period : int, percent : float, currency : str= "UAH") -> None:
         """
             Ініціалізує новий кредитний рахунок.
@@ -239,67 +660,126 @@ class Credit_account(Savings_account):
 
         super().__init__(user, period, percent, currency)
         self._currency = currency
-        self._balance = limit
-        self._limit = limit
-        self._credit = 0
-
-    def calculate_interest(self):
-        """
-            Розраховує відсотки за кредитом.
-
-            Повертає:
-                float: Сума нарахованих відсотків.
-            """
-        if self._balance == 0:
-            return 0.0
-
-        today = datetime.date.today()
-        months_passed = (today.year - self.__last_interest_date.year) * 12 + (
-                    today.month - self.__last_interest_date.month)
-
-        if today.day < self.__last_interest_date.day:
-            months_passed -= 1
-
-        full_periods = months_passed // self.__period
-
-        if full_periods >= 1:
-            initial_balance = self._limit - self._balance
-            for _ in range(full_periods):
-                initial_balance += initial_balance * self.__percent
-
-            self.__last_interest_date = today
-            return initial_balance
-        else:
-            return 0.0
-
-    def withdraw(self, suma: (float, int), currency: str = "UAH"):
+        self._balance = Money.of(limit, currency)
+        self._limit = self._balance
+        self._credit = Money(0, currency)
+
+    def _state(self) -> dict:
+        state = super()._state()
+        state["credit"] = self._credit._minor
+        return state
+
+    def _load_state(self, state : dict):
+        super()._load_state(state)
+        self._credit = _money(state["credit"], self._currency)
+
+    def _dump(self) -> dict:
+        data = super()._dump()
+        data["limit"] = self._limit._minor
+        return data
+
+    def _restore_params(self, data : dict):
+        super()._restore_params(data)
+        self._limit = _money(data["limit"], data["currency"])
+
+    def _interest_base(self) -> Money:
+        """Повертає поточний борг (використану частину ліміту), на який нараховуються відсотки."""
+        return self._limit - self._balance
+
+    def _apply_interest(self, interest : Money):
+        """Додає відсотки до суми кредиту."""
+        self._credit += interest
+        _notify_balance(self, 0, interest._minor)
+
+    def _prepare_withdraw(self, suma: (float, int, Money), currency: str = "UAH") -> Money:
         """
-            Знімає вказану суму з рахунку з урахуванням кредитного ліміту.
+            Перевіряє зняття вказаної суми з урахуванням кредитного ліміту, не змінюючи баланс.
 
             Аргументи:
-                suma (float, int): Сума для зняття.
-                currency (str, optional): Валюта суми. За замовчуванням "UAH".
+                suma (float, int, Money): Сума для зняття.
+                currency (str, optional): Валюта суми (для Money береться його валюта). За замовчуванням "UAH".
+
+            Повертає:
+                Money: Сума зняття у валюті рахунку.
 
             Винятки:
                 Exception: Якщо suma не є числом або менше/рівне 0.
                 TypeError: Якщо валюта не підтримується.
                 ValueError: Якщо перевищено кредитний ліміт.
         """
-        if not isinstance(suma, (float, int)) or suma <= 0:
+        if not isinstance(suma, (float, int, Money)) or suma <= 0:
             e = Exception(f"Сума дезиту не може приймати знчення: {suma}")
             log.exception("Помилка суми депозиту", e)
             raise e
 
+        if isinstance(suma, Money):
+            currency = suma._currency
         if currency not in self._suported_currency:
             e = TypeError(f"Значення {currency}, для валют не припустиме")
             log.exception("Некоректна валюта для рахунку", e)
             raise e
 
-        realsum = currate.convert(suma, currency, self._currency)
+        realsum = Money.of(suma, currency).convert(self._currency)
 
         if self._balance - realsum < 0:
             e = ValueError("Операція відмінена через перевищення кредитного ліміту")
-            log.exception(f"На рахунку {self._account_id}, перевищення кредитного ліміту, операція відмінена", e)
+            log.exception("На рахунку %s, перевищення кредитного ліміту, операція відмінена", e, self._account_id,
+                          account_id=self._account_id)
             raise e
-        else:
-            self._balance -= realsum
\ No newline at end of file
+        return realsum
+
+
+def accrue_all(bank, as_of : datetime.date = None) -> dict:
+    """
+        Нараховує відсотки на всі ощадні та кредитні рахунки банку за один прохід.
+
+        Рахунки з однаковими датою останнього нарахування, періодом і ставкою
+        використовують один раз обчислений множник, тож вартість проходу
+        зводиться до цілочисельного множення на кожен рахунок.
+        Новий стан змінених рахунків записується до журналу банку одним записом,
+        а агреговані показники банку (Bank.stats) оновлюються на суму відсотків.
+        Кожен рахунок змінюється під своїм блокуванням, тож прохід можна виконувати
+        паралельно з транзакціями.
+
+        Аргументи:
+            bank (Bank): Банк, рахунки якого обробляються.
+            as_of (datetime.date, optional): Дата нарахування. За замовчуванням - поточна дата Savings_account._clock.
+
+        Повертає:
+            dict: {"accounts": кількість рахунків з нарахуванням, "interest": {валюта: Money}}.
+    """
+    as_of = as_of or Savings_account._clock()
+    groups = {}
+    totals = {}
+    changed = []
+
+    for account in bank._accounts.values():
+        if not isinstance(account, Savings_account):
+            continue
+        key = (account._last_interest_date, account._period, account._percent)
+        group = groups.get(key)
+        if group is None:
+            periods = _months_between(account._last_interest_date, as_of) // account._period
+            group = groups[key] = (periods, _interest_ratio(account._percent, periods) if periods >= 1 else None,
+                                   _add_months(account._last_interest_date, periods * account._period))
+        periods, ratio, next_date = group
+        if ratio is None:
+            continue
+
+        with account_locks.hold(account):
+            if account._last_interest_date != key[0]:
+                continue
+            interest = _money(_round_div(account._interest_base()._minor * ratio[0], ratio[1], Money.default_rounding),
+                              account._currency)
+            account._apply_interest(interest)
+            account._last_interest_date = next_date
+        totals[account._currency] = totals.get(account._currency, Money(0, account._currency)) + interest
+        changed.append(account)
+
+    count = len(changed)
+    if changed:
+        bank._record_state("interest", changed)
+
+    log.info(lambda: f"Нараховано відсотки на {count} рахунків станом на {as_of}: "
+                     f"{', '.join(str(total) for total in totals.values())}")
+    return {"accounts": count, "interest": totals}
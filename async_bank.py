@@ -0,0 +1,270 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from bank import Bank
+from currency import CurrencyRates, currate
+from transaction import Transaction
+from logger import log
+
+"""
+Модуль async_bank містить асинхронний фасад банку для використання з asyncio.
+
+Методи Bank, рахунків і транзакцій синхронні (а завантаження курсів може виконувати
+блокуючий HTTP-запит), тому фасад виконує їх у власному пулі потоків і не блокує цикл подій.
+
+Класи:
+- AsyncBank: Асинхронний фасад банку.
+
+Функції:
+- refresh_rates: Оновлює курси валют; одночасні виклики чекають на одне спільне завантаження.
+"""
+
+_refreshes = {}
+
+
+async def refresh_rates(rates : CurrencyRates = None):
+    """
+        Оновлює курси валют у пулі потоків.
+
+        Якщо оновлення тих самих курсів вже виконується, виклик чекає на нього замість
+        нового завантаження, тож одночасні виклики роблять лише один запит до джерела.
+
+        Аргументи:
+            rates (CurrencyRates, optional): Курси валют. За замовчуванням - спільні курси currate.
+
+        Винятки:
+            Exception: Помилка завантаження курсів (отримують усі, хто чекав на це завантаження).
+    """
+    rates = rates if rates is not None else currate
+    loop = asyncio.get_running_loop()
+    key = (id(rates), loop)
+    future = _refreshes.get(key)
+    if future is None:
+        future = _refreshes[key] = loop.run_in_executor(None, rates.refresh)
+        future.add_done_callback(lambda _: _refreshes.pop(key, None))
+    await asyncio.shield(future)
+
+
+class AsyncBank:
+    """
+        Асинхронний фасад банку.
+
+        Операції над одним рахунком виконуються строго в порядку виклику: кожен рахунок має
+        чергу операцій (ланцюжок futures), і операція починається лише після завершення всіх
+        раніше надісланих операцій над її рахунками. Операції над різними рахунками виконуються
+        паралельно у пулі потоків без спільного блокування.
+
+        Атрибути:
+        - bank: Банк, над яким побудовано фасад.
+        - rates: Курси валют, які оновлюються асинхронно.
+
+        Методи:
+        - add_user: Додає користувача.
+        - get_user, get_account: Повертають користувача чи рахунок за ID.
+        - create_checking_account, create_savings_account, create_credit_account: Створюють рахунки.
+        - bulk_add_users, bulk_create_accounts: Додають пакет користувачів чи рахунків.
+        - execute: Виконує транзакцію в порядку черг її рахунків.
+        - refresh_rates: Оновлює курси валют.
+        - close: Закриває банк та пул потоків.
+    """
+
+    def __init__(self, bank : Bank, workers : int = None, rates : CurrencyRates = None) -> None:
+        """
+            Ініціалізує фасад.
+
+            Аргументи:
+                bank (Bank): Банк.
+                workers (int, optional): Кількість потоків пулу. За замовчуванням - як у ThreadPoolExecutor.
+                rates (CurrencyRates, optional): Курси валют. За замовчуванням - спільні курси currate.
+
+            Винятки:
+                TypeError: Якщо bank не є об'єктом Bank.
+        """
+        if not isinstance(bank, Bank):
+            e = TypeError(f"bank повинен бути об'єктом Bank, а не {bank!r}")
+            log.exception("Неможливо створити асинхронний банк", e)
+            raise e
+
+        self.bank = bank
+        self.rates = rates if rates is not None else currate
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="async-bank")
+        self._tails = {}
+
+    async def _call(self, function, *args):
+        """Виконує синхронну функцію у пулі потоків фасаду."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _serialized(self, accounts, function, *args):
+        """
+            Виконує функцію після завершення всіх раніше надісланих операцій над рахунками accounts.
+
+            Аргументи:
+                accounts (iterable): Рахунки операції.
+                function (callable): Синхронна функція, що виконується у пулі потоків.
+
+            Повертає:
+                Результат function.
+        """
+        loop = asyncio.get_running_loop()
+        ids = {account._account_id for account in accounts}
+        done = loop.create_future()
+        previous = []
+        for account_id in ids:
+            tail = self._tails.get(account_id)
+            if tail is not None and not tail.done():
+                previous.append(tail)
+            self._tails[account_id] = done
+
+        running = None
+        try:
+            if previous:
+                await asyncio.wait(previous)
+            running = loop.run_in_executor(self._executor, function, *args)
+            return await asyncio.shield(running)
+        finally:
+            # Навіть якщо виклик скасовано, наступні операції чекають на попередні та на вже запущену.
+            pending = [future for future in previous + [running] if future is not None and not future.done()]
+            if pending:
+                asyncio.gather(*pending, return_exceptions=True).add_done_callback(lambda _: done.set_result(None))
+            else:
+                done.set_result(None)
+            for account_id in ids:
+                if self._tails.get(account_id) is done:
+                    del self._tails[account_id]
+
+    async def _ensure_rates(self):
+        """
+            Чекає на перше завантаження курсів, а застарілі курси оновлює у фоні (після помилки -
+            із затримкою CurrencyRates.retry), щоб синхронна конвертація у пулі потоків не запускала власне завантаження.
+
+            Очікування не блокує цикл подій. Помилка першого завантаження записується в лог і не перериває
+            операцію: операції без конвертації валют виконуються і без курсів, а конвертація без курсів
+            одразу завершується помилкою (як у CurrencyRates._ensure_loaded).
+        """
+        rates = self.rates
+        if not rates._load_attempted:
+            try:
+                await refresh_rates(rates)
+            except Exception as e:
+                log.exception("Не вдалося завантажити курси валют", e)
+            finally:
+                rates._load_attempted = True
+        elif rates._due():
+            task = asyncio.ensure_future(refresh_rates(rates))
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def refresh_rates(self):
+        """
+            Оновлює курси валют (одночасні виклики чекають на одне спільне завантаження).
+
+            Винятки:
+                Exception: Помилка завантаження курсів.
+        """
+        await refresh_rates(self.rates)
+
+    async def add_user(self, first_name : str, last_name : str, email : str = None, phone_number : str = None):
+        """
+            Додає нового користувача до банку (див. Bank.add_user).
+
+            Повертає:
+                User: Створений користувач.
+        """
+        return await self._call(self.bank.add_user, first_name, last_name, email, phone_number)
+
+    async def get_user(self, user_id : int):
+        """
+            Повертає користувача за ID (див. Bank.get_user).
+
+            Повертає:
+                User: Користувач або None.
+        """
+        return self.bank.get_user(user_id)
+
+    async def get_account(self, account_id : int):
+        """
+            Повертає рахунок за ID (див. Bank.get_account).
+
+            Повертає:
+                Account: Рахунок або None.
+        """
+        return self.bank.get_account(account_id)
+
+    async def create_checking_account(self, user, currency : str = "UAH"):
+        """
+            Створює чековий рахунок (див. Bank.create_checking_account).
+
+            Повертає:
+                Cheking_account: Створений рахунок.
+        """
+        return await self._call(self.bank.create_checking_account, user, currency)
+
+    async def create_savings_account(self, user, period : int, percent : float, currency : str = "UAH"):
+        """
+            Створює ощадний рахунок (див. Bank.create_savings_account).
+
+            Повертає:
+                Savings_account: Створений рахунок.
+        """
+        return await self._call(self.bank.create_savings_account, user, period, percent, currency)
+
+    async def create_credit_account(self, user, limit : float, period : int, percent : float, currency : str = "UAH"):
+        """
+            Створює кредитний рахунок (див. Bank.create_credit_account).
+
+            Повертає:
+                Credit_account: Створений рахунок.
+        """
+        return await self._call(self.bank.create_credit_account, user, limit, period, percent, currency)
+
+    async def bulk_add_users(self, rows):
+        """
+            Додає пакет користувачів (див. Bank.bulk_add_users).
+
+            Повертає:
+                list: Створені користувачі.
+        """
+        return await self._call(self.bank.bulk_add_users, rows)
+
+    async def bulk_create_accounts(self, rows):
+        """
+            Створює пакет рахунків (див. Bank.bulk_create_accounts).
+
+            Повертає:
+                list: Створені рахунки.
+        """
+        return await self._call(self.bank.bulk_create_accounts, rows)
+
+    async def execute(self, transaction : Transaction):
+        """
+            Виконує транзакцію через Bank.execute після всіх раніше надісланих операцій над її рахунками.
+
+            Аргументи:
+                transaction (Transaction): Транзакція.
+
+            Повертає:
+                TransactionRecord, list: Запис виконаної транзакції (див. Bank.execute).
+
+            Винятки:
+                TypeError: Якщо transaction не є транзакцією.
+                Exception: Помилки виконання транзакції.
+        """
+        if not isinstance(transaction, Transaction):
+            e = TypeError(f"transaction повинно бути об'єктом Transaction, а не {transaction!r}")
+            log.exception("Недопустиме значення аргументу", e)
+            raise e
+
+        await self._ensure_rates()
+        return await self._serialized(transaction._accounts(), self.bank.execute, transaction)
+
+    async def close(self):
+        """Чекає на завершення надісланих операцій, закриває банк та зупиняє пул потоків."""
+        if self._tails:
+            await asyncio.wait(set(self._tails.values()))
+        await self._call(self.bank.close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+        return False
@@ -1,12 +1,40 @@
+import gc
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
 from user import User
 from accounts import Cheking_account, Credit_account, Savings_account
+from transaction import Transaction, TransactionRecord, CompositeTransaction
+from journal import Journal
+from snapshot import Snapshot
 from logger import log
+from store import AccountStore
+from concurrency import account_locks
+from money import Money, _money
+from index import BankIndex, HistoryIndex
+from stats import BankStats
 """
 Модуль bank містить клас Bank для управління банківською системою.
 
 Класи:
 - Bank: Головний клас для роботи з користувачами та рахунками.
 """
+
+
+@contextmanager
+def _gc_paused():
+    """Вимикає збирач сміття на час створення великої кількості об'єктів (пакетне створення та відновлення)."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 class Bank:
     """
     Клас, що представляє банківську систему.
@@ -15,8 +43,16 @@ class Bank:
     - _name: Назва банку.
     - _address: Адреса банку.
     - _users: Словник користувачів банку (ключ - user_id).
-    - _accounts: Словник рахунків банку (ключ - account_id).
-    - __transactions: Список транзакцій.
+    - _accounts: Словник рахунків банку (ключ - account_id) або колонкове сховище AccountStore.
+    - _journal: Журнал операцій (Journal) або None.
+    - _lock: Блокування реєстру користувачів і рахунків, історії та журналу (для узгоджених знімків).
+    - _snapshot_path: Шлях до файлу знімка стану або None.
+    - _snapshot_interval: Кількість записів журналу між автоматичними знімками (0 - лише вручну).
+    - _index: Вторинні індекси користувачів і рахунків (BankIndex).
+    - _history: Історія транзакцій кожного рахунку (HistoryIndex).
+    - _stats: Агреговані залишки та кредитна заборгованість, що оновлюються інкрементно (BankStats).
+    - __transactions: Список записів виконаних транзакцій (TransactionRecord).
+    - BATCH_OK, BATCH_INVALID, BATCH_NO_ACCOUNT, BATCH_BLOCKED, BATCH_FUNDS: Коди результатів execute_batch.
 
     Методи:
     - __init__: Ініціалізує банк.
@@ -25,29 +61,96 @@ class Bank:
     - create_checking_account: Створює чековий рахунок.
     - create_savings_account: Створює ощадний рахунок.
     - create_credit_account: Створює кредитний рахунок.
+    - bulk_add_users: Додає пакет користувачів з одним записом до журналу.
+    - bulk_create_accounts: Створює пакет рахунків з одним записом до журналу.
     - get_account: Отримує рахунок за ID.
+    - find_users: Шукає користувачів за email або телефоном.
+    - query: Шукає рахунки за типом, валютою, блокуванням та використанням кредитного ліміту.
+    - stats: Повертає агреговані показники банку за O(1).
+    - check_stats: Порівнює агреговані показники з повним перерахунком.
+    - execute: Виконує транзакцію та записує її до історії і журналу.
+    - execute_batch: Виконує пакет операцій з одним записом до журналу.
+    - transactions: Повертає записи виконаних транзакцій.
+    - snapshot: Записує знімок стану банку у фоновому потоці.
+    - close: Закриває журнал операцій.
+    - _register_account: Реєструє новий рахунок у банку та в користувача.
+    - _register_accounts: Реєструє пакет нових рахунків.
+    - _load_snapshot: Відновлює стан банку зі знімка.
+    - _replay: Відновлює стан банку з журналу.
     """
-    def __init__(self, name: str, address: str):
+    _account_types = {cls._kind: cls for cls in (Cheking_account, Savings_account, Credit_account)}
+    BATCH_OK, BATCH_INVALID, BATCH_NO_ACCOUNT, BATCH_BLOCKED, BATCH_FUNDS = range(5)
+
+    def __init__(self, name: str, address: str, columnar: bool = False, journal: (str, Journal) = None,
+                 snapshot: str = None, snapshot_interval: int = 0):
         """
             Ініціалізує новий банк.
 
+            Якщо вказано журнал, стан банку (користувачі, рахунки, баланси, історія транзакцій)
+            відновлюється з нього, а всі подальші операції дописуються до нього.
+            Якщо також існує знімок стану, спочатку завантажується знімок, а з журналу
+            відтворюються лише записи, зроблені після нього.
+
             Аргументи:
                 name (str): Назва банку.
                 address (str): Адреса банку.
+                columnar (bool, optional): Зберігати рахунки у колонковому сховищі AccountStore. За замовчуванням False.
+                journal (str, Journal, optional): Шлях до журналу операцій або об'єкт Journal. За замовчуванням None.
+                snapshot (str, optional): Шлях до файлу знімка стану. За замовчуванням None.
+                snapshot_interval (int, optional): Автоматично записувати знімок кожні snapshot_interval
+                    записів журналу (0 - лише через snapshot()). За замовчуванням 0.
 
             Винятки:
-                TypeError: Якщо name або address не є рядками.
+                TypeError: Якщо name або address не є рядками, journal або snapshot мають невірний тип.
+                ValueError: Якщо snapshot_interval задано без журналу та знімка або він від'ємний.
         """
         if not isinstance(name, str) or not isinstance(address, str):
             log.exception("Неправильні типи даних для назви або адреси банку", TypeError())
             raise TypeError("Неправильні типи даних для назви або адреси банку")
 
+        if not isinstance(journal, (str, Journal, type(None))):
+            e = TypeError(f"journal повинен бути шляхом до файлу або об'єктом Journal, а не {journal!r}")
+            log.exception("Неправильний тип журналу банку", e)
+            raise e
+
+        if not isinstance(snapshot, (str, type(None))):
+            e = TypeError(f"snapshot повинен бути шляхом до файлу, а не {snapshot!r}")
+            log.exception("Неправильний тип знімка банку", e)
+            raise e
+
+        if not isinstance(snapshot_interval, int) or snapshot_interval < 0 or \
+                (snapshot_interval and (journal is None or snapshot is None)):
+            e = ValueError("snapshot_interval повинен бути невід'ємним цілим числом і потребує журналу та знімка")
+            log.exception("Неправильний інтервал знімків банку", e)
+            raise e
+
         self._name = name
         self._address = address
         self._users = {}
-        self._accounts = {}
+        self._accounts = AccountStore(self._users) if columnar else {}
         self.__transactions = []
-        log.info(f"Створено банк '{self._name}' за адресою: {self._address}")
+        self._lock = threading.RLock()
+        self._journal = Journal(journal) if isinstance(journal, str) else journal
+        self._snapshot_path = snapshot
+        self._snapshot_interval = snapshot_interval
+        self._snapshot_seq = 0
+        self._snapshot_thread = None
+        self._index = BankIndex()
+        self._history = HistoryIndex(self.__transactions)
+        self._stats = BankStats(self._accounts)
+        log.info("Створено банк '%s' за адресою: %s", self._name, self._address)
+
+        offset = 0
+        if snapshot is not None and os.path.exists(snapshot):
+            offset = self._load_snapshot()
+        if self._journal is not None:
+            self._replay(offset)
+        if self._users or self._accounts:
+            self._index.rebuild(self._users, self._accounts)
+        if self.__transactions:
+            self._history.rebuild()
+        if self._accounts:
+            self._stats.rebuild(self._accounts.values())
 
     def __str__(self):
         """
@@ -76,9 +179,12 @@ class Bank:
         """
         user = User(first_name, last_name, email, phone_number)
 
-        self._users[user.get_user_id()] = user
+        with self._lock:
+            self._users[user.get_user_id()] = user
+            self._index.add_user(user)
+        self._await_commit(self._commit({"op": "user", **user._dump()}))
 
-        log.info(f"Додано нового користувача: {user}")
+        log.info("Додано нового користувача: %s", user)
         return user
 
     def get_user(self, user_id: int):
@@ -115,15 +221,13 @@ class Bank:
                 ValueError: Якщо користувач не зареєстрований у банку.
         """
         if not isinstance(user, User) or user.get_user_id() not in self._users:
-            log.error(f"Користувача {user} не знайдено в банку.")
+            log.error("Користувача %s не знайдено в банку.", user)
             raise ValueError(f"Користувача {user} не знайдено в банку.")
 
-        account = Cheking_account(user, currency)
-
-        self._accounts[account._account_id] = account
-        user.add_account(account)
+        account = self._create_account(user, Cheking_account, user, currency)
 
-        log.info(f"Створено чековий рахунок #{account._account_id} для користувача {user}.")
+        log.info("Створено чековий рахунок #%s для користувача %s.", account._account_id, user,
+                 account_id=account._account_id, user_id=user._user_id)
         return account
 
     def create_savings_account(self, user: User, period: int, percent: float, currency: str = "UAH"):
@@ -143,15 +247,13 @@ class Bank:
                 ValueError: Якщо користувач не зареєстрований у банку.
         """
         if not isinstance(user, User) or user.get_user_id() not in self._users:
-            log.error(f"Користувача {user} не знайдено в банку.")
+            log.error("Користувача %s не знайдено в банку.", user)
             raise ValueError(f"Користувача {user} не знайдено в банку.")
 
-        account = Savings_account(user, period, percent, currency)
+        account = self._create_account(user, Savings_account, user, period, percent, currency)
 
-        self._accounts[account._account_id] = account
-        user.add_account(account)
-
-        log.info(f"Створено ощадний рахунок #{account._account_id} для користувача {user}.")
+        log.info("Створено ощадний рахунок #%s для користувача %s.", account._account_id, user,
+                 account_id=account._account_id, user_id=user._user_id)
         return account
 
     def create_credit_account(self, user: User, limit: float, period: int, percent: float, currency: str = "UAH"):
@@ -172,17 +274,684 @@ class Bank:
                 ValueError: Якщо користувач не зареєстрований у банку.
         """
         if not isinstance(user, User) or user.get_user_id() not in self._users:
-            log.error(f"Користувача {user} не знайдено в банку.")
+            log.error("Користувача %s не знайдено в банку.", user)
             raise ValueError(f"Користувача {user} не знайдено в банку.")
 
-        account = Credit_account(limit, user, period, percent, currency)
+        account = self._create_account(user, Credit_account, limit, user, period, percent, currency)
+
+        log.info("Створено кредитний рахунок #%s для користувача %s.", account._account_id, user,
+                 account_id=account._account_id, user_id=user._user_id)
+        return account
+
+    def bulk_add_users(self, rows) -> list:
+        """
+            Додає пакет користувачів (наприклад, під час підключення партнера).
+
+            Спочатку перевіряються всі рядки, тож при помилці жоден користувач не додається. ID
+            резервуються одним діапазоном, а до журналу та логу пакет записується одним записом.
+
+            Аргументи:
+                rows (iterable): Рядки (first_name, last_name, email, phone_number); email та phone_number
+                    можна не вказувати.
+
+            Повертає:
+                list: Створені користувачі (User) у порядку рядків.
+
+            Винятки:
+                TypeError: Якщо рядок має невірну довжину або first_name чи last_name не є рядками.
+        """
+        parsed = []
+        for number, row in enumerate(rows):
+            if not 2 <= len(row) <= 4 or not isinstance(row[0], str) or not isinstance(row[1], str):
+                e = TypeError(f"Неправильні дані користувача у рядку {number}: {row!r}")
+                log.exception("Неможливо додати пакет користувачів", e)
+                raise e
+            parsed.append(row if len(row) == 4 else (*row, None, None)[:4])
+        if not parsed:
+            return []
 
-        self._accounts[account._account_id] = account
-        user.add_account(account)
+        with self._lock:
+            data = [{"id": user_id, "first_name": first_name, "last_name": last_name,
+                     "email": email, "phone_number": phone_number}
+                    for user_id, (first_name, last_name, email, phone_number)
+                    in zip(User._reserve_ids(len(parsed)), parsed)]
+            with _gc_paused():
+                users = [User._restore(item, advance=False) for item in data]
+            index = self._index
+            for user in users:
+                self._users[user._user_id] = user
+                index.add_user(user)
+            seq = self._commit({"op": "users", "users": data})
+        self._await_commit(seq)
 
-        log.info(f"Створено кредитний рахунок #{account._account_id} для користувача {user}.")
+        log.info("Додано пакет користувачів: %s (ID %s-%s)", len(users), users[0]._user_id, users[-1]._user_id)
+        return users
+
+    def bulk_create_accounts(self, rows) -> list:
+        """
+            Створює пакет рахунків (наприклад, під час підключення партнера).
+
+            Спочатку перевіряються всі рядки (рядки з однаковими параметрами перевіряються один раз),
+            тож при помилці жоден рахунок не створюється. ID резервуються одним діапазоном, рахунки
+            реєструються з їхніх станів (див. _register_accounts), а до журналу та логу пакет записується одним записом.
+
+            Аргументи:
+                rows (iterable): Рядки (kind, user, currency, period, percent, limit), де kind - "checking",
+                    "savings" або "credit", user - користувач банку (User) або його ID, а поля, не потрібні
+                    для типу рахунку, можна не вказувати (для чекового рахунку - лише kind, user, currency).
+
+            Повертає:
+                list: Створені рахунки у порядку рядків (у колонковому режимі - їхні представлення у сховищі).
+
+            Винятки:
+                ValueError: Якщо тип рахунку невідомий, користувача не знайдено в банку або валюта не підтримується.
+                TypeError: Якщо рядок має невірну довжину або period, percent чи limit мають невірний тип.
+        """
+        data = []
+        users = self._users
+        today = {}
+        templates = {}
+        for number, row in enumerate(rows):
+            if not 3 <= len(row) <= 6:
+                e = TypeError(f"Неправильна довжина рядка рахунку {number}: {row!r}")
+                log.exception("Неможливо створити пакет рахунків", e)
+                raise e
+            kind, user, currency, period, percent, limit = (*row, None, None, None)[:6]
+            owner = users.get(user._user_id if isinstance(user, User) else user) \
+                if isinstance(user, (User, int)) else None
+            if owner is None or (isinstance(user, User) and owner is not user):
+                e = ValueError(f"Невідомий тип рахунку, користувач або валюта у рядку {number}: {row!r}")
+                log.exception("Неможливо створити пакет рахунків", e)
+                raise e
+            # Типи входять до ключа, бо 5 == 5.0, а percent і limit повинні бути float.
+            key = (kind, currency, period, percent, limit, type(period), type(percent), type(limit))
+            try:
+                template = templates.get(key)
+            except TypeError:
+                key = template = None
+            if template is None:
+                template = self._account_template(number, row, kind, currency, period, percent, limit, today)
+                if key is not None:
+                    templates[key] = template
+            item = template.copy()
+            item["owner"] = owner._user_id
+            data.append(item)
+        if not data:
+            return []
+
+        with self._lock:
+            for account_id, item in zip(Cheking_account._reserve_ids(len(data)), data):
+                item["id"] = account_id
+            accounts = self._register_accounts(data)
+            seq = self._commit({"op": "accounts", "accounts": data})
+        self._await_commit(seq)
+
+        log.info("Створено пакет рахунків: %s (ID %s-%s)", len(accounts), accounts[0]._account_id,
+                 accounts[-1]._account_id)
+        return accounts
+
+    def _register_account(self, user: User, account: (Cheking_account, Credit_account, Savings_account)):
+        """
+            Реєструє новий рахунок у банку та в списку рахунків користувача.
+
+            Аргументи:
+                user (User): Власник рахунку.
+                account (Cheking_account, Credit_account, Savings_account): Новий рахунок.
+
+            Повертає:
+                Account: Рахунок (у колонковому режимі - його представлення у сховищі).
+        """
+        with self._lock:
+            if isinstance(self._accounts, AccountStore):
+                account = self._accounts.add(account)
+            else:
+                self._accounts[account._account_id] = account
+            user.add_account(account)
+            self._index.add_account(account)
+            self._stats.add(account)
         return account
 
+    def _account_template(self, number: int, row, kind, currency, period, percent, limit, today: dict) -> dict:
+        """
+            Перевіряє параметри рядка bulk_create_accounts та повертає стан нового рахунку без ID і власника.
+
+            Аргументи:
+                number (int): Номер рядка (для повідомлення про помилку).
+                row: Рядок (для повідомлення про помилку).
+                kind, currency, period, percent, limit: Поля рядка.
+                today (dict): Дати останнього нарахування відсотків за типом рахунку (заповнюється при першому зверненні).
+
+            Повертає:
+                dict: Ті самі дані, що повертає _dump: з них рахунок створюється та відновлюється з журналу.
+
+            Винятки:
+                ValueError: Якщо тип рахунку невідомий або валюта не підтримується.
+                TypeError: Якщо period, percent чи limit мають невірний тип.
+        """
+        if kind not in self._account_types or currency not in Cheking_account._suported_currency:
+            e = ValueError(f"Невідомий тип рахунку, користувач або валюта у рядку {number}: {row!r}")
+            log.exception("Неможливо створити пакет рахунків", e)
+            raise e
+        item = {"type": kind, "id": 0, "owner": 0, "currency": currency, "balance": 0, "blocked": False}
+        if kind != "checking":
+            if not isinstance(period, int) or period <= 0 or not isinstance(percent, float) or \
+                    percent < 0 or percent > 100 or kind == "credit" and (not isinstance(limit, float) or limit <= 0):
+                e = TypeError(f"Не вірні типи данних в атрибутах period, percent, limit у рядку {number}: {row!r}")
+                log.exception("Неможливо створити пакет рахунків", e)
+                raise e
+            if kind not in today:
+                today[kind] = self._account_types[kind]._clock().toordinal()
+            item["last_interest"] = today[kind]
+            item["period"] = period
+            item["percent"] = percent
+            if kind == "credit":
+                item["balance"] = item["limit"] = Money.of(limit, currency)._minor
+                item["credit"] = 0
+        return item
+
+    def _register_accounts(self, states: list) -> list:
+        """
+            Створює пакет нових рахунків з їхніх станів та реєструє їх у банку і в списках рахунків власників.
+
+            У колонковому режимі колонки сховища доповнюються зі станів без створення об'єктів рахунків
+            (AccountStore.extend_states); індекси та показники також оновлюються зі станів одним проходом.
+            Лічильник ID рахунків не зсувається (ID зарезервовано або зсуває викликач).
+
+            Аргументи:
+                states (list): Стани нових рахунків у форматі _dump у порядку зростання ID.
+
+            Повертає:
+                list: Рахунки (у колонковому режимі - їхні представлення у сховищі).
+        """
+        users = self._users
+        with self._lock:
+            if isinstance(self._accounts, AccountStore):
+                accounts = self._accounts.extend_states(states)
+            else:
+                types = self._account_types
+                with _gc_paused():
+                    accounts = [types[state["type"]]._restore(state, users[state["owner"]], advance=False)
+                                for state in states]
+                self._accounts.update(zip([state["id"] for state in states], accounts))
+            for state, account in zip(states, accounts):
+                # Тип рахунку вже відомий, тож перевірка User.add_account не потрібна.
+                users[state["owner"]]._accounts_list[state["id"]] = account
+            self._index.add_states(states)
+            self._stats.add_states(states)
+        return accounts
+
+    def _create_account(self, user: User, account_class: type, *args):
+        """
+            Створює рахунок, реєструє його та записує до журналу.
+
+            Рахунок створюється (отримує ID) під блокуванням банку, тож рахунки, створені
+            з різних потоків, потрапляють до сховища та журналу у порядку зростання ID.
+
+            Аргументи:
+                user (User): Власник рахунку.
+                account_class (type): Клас рахунку.
+                *args: Аргументи конструктора рахунку.
+
+            Повертає:
+                Account: Зареєстрований рахунок.
+        """
+        with self._lock:
+            account = self._register_account(user, account_class(*args))
+            seq = self._commit({"op": "account", **account._dump()})
+        self._await_commit(seq)
+        return account
+
+    def _commit(self, entry: dict = None, records: list = ()) -> int:
+        """
+            Додає записи транзакцій до історії банку та історії їхніх рахунків, а запис - до журналу операцій.
+
+            Усі вони додаються під блокуванням банку, тож знімок стану бачить їх узгоджено.
+            Фіксація журналу на диску тут не очікується (див. _await_commit).
+
+            Аргументи:
+                entry (dict, optional): Запис журналу (ігнорується, якщо журнал не підключено).
+                records (list, optional): Записи транзакцій (TransactionRecord) для історії.
+
+            Повертає:
+                int: Номер запису журналу або 0.
+        """
+        with self._lock:
+            start = len(self.__transactions)
+            self.__transactions.extend(records)
+            self._history.add(records, start)
+            if entry is None or self._journal is None:
+                return 0
+            return self._journal.append(entry, wait=False)
+
+    def _await_commit(self, seq: int):
+        """
+            Чекає фіксації запису журналу на диску (для durable журналу) та за потреби запускає знімок.
+
+            Виконується поза блокуваннями, тож записи з різних потоків фіксуються спільними fsync.
+
+            Аргументи:
+                seq (int): Номер запису журналу, повернутий _commit.
+        """
+        if not seq:
+            return
+        if self._journal.durable:
+            self._journal.wait(seq)
+        if self._snapshot_interval and seq - self._snapshot_seq >= self._snapshot_interval:
+            self.snapshot()
+
+    def _record_state(self, kind: str, accounts):
+        """
+            Записує до журналу новий стан рахунків після операції поза транзакціями
+            (закриття рахунку, масове нарахування відсотків).
+
+            Аргументи:
+                kind (str): Тип операції.
+                accounts (iterable): Змінені рахунки.
+        """
+        if self._journal is not None:
+            self._await_commit(self._commit({"op": "state", "kind": kind,
+                                             "accounts": [dict(account._state(), id=account._account_id)
+                                                          for account in accounts]}))
+
+    def execute(self, transaction: Transaction) -> (TransactionRecord, list):
+        """
+            Виконує транзакцію, додає її запис до історії банку та до журналу операцій.
+
+            Складена транзакція (CompositeTransaction) додає до історії запис на кожен переказ
+            і записується до журналу одним записом, тож після відновлення вона також або є повністю, або її немає.
+
+            До журналу записується стан задіяних рахунків після виконання, тож відновлення
+            не залежить від курсів валют і дати на момент відтворення. Рахунки транзакції
+            заблоковані від виконання до запису в журнал, тож порядок записів журналу для
+            кожного рахунку збігається з порядком виконання; метод можна викликати з багатьох потоків.
+
+            Аргументи:
+                transaction (Transaction): Транзакція.
+
+            Повертає:
+                TransactionRecord, list: Запис виконаної транзакції (для складеної - список записів переказів).
+
+            Винятки:
+                TypeError: Якщо transaction не є транзакцією.
+                Exception: Помилки виконання транзакції (стан рахунків і журнал не змінюються).
+        """
+        if not isinstance(transaction, Transaction):
+            e = TypeError(f"transaction повинно бути об'єктом Transaction, а не {transaction!r}")
+            log.exception("Недопустиме значення аргументу", e)
+            raise e
+
+        accounts = transaction._accounts()
+        with account_locks.hold(*accounts):
+            transaction.execute()
+            records = transaction.to_records()
+            entry = None
+            if self._journal is not None:
+                states = [dict(account._state(), id=account._account_id) for account in accounts]
+                if len(records) == 1:
+                    entry = {"op": "tx", **records[0]._asdict(), "accounts": states}
+                else:
+                    entry = {"op": "batch", "records": [list(record) for record in records], "accounts": states}
+            seq = self._commit(entry, records)
+        self._await_commit(seq)
+        return records if isinstance(transaction, CompositeTransaction) else records[0]
+
+    def execute_batch(self, rows, mark: dict = None) -> array:
+        """
+            Виконує пакет операцій (наприклад, платіжний файл) одним проходом.
+
+            Рядки перевіряються разом, без створення об'єктів Transaction: спочатку визначаються
+            рахунки (кожен рахунок шукається один раз), потім під блокуванням усіх задіяних рахунків
+            рядки перевіряються по черзі на поточних балансах з урахуванням попередніх рядків,
+            а сумарна зміна кожного рахунку застосовується один раз. Неможливі рядки пропускаються
+            і не впливають на інші. Для виконаних рядків до історії додаються записи з ID
+            із зарезервованого діапазону; до журналу пакет записується одним записом, а до логу - одним рядком.
+
+            Аргументи:
+                rows (iterable): Рядки (kind, source_id, target_id, amount, currency), де kind - "deposit",
+                    "withdraw" або "transfer", відсутній рахунок - None, amount - сума в основних одиницях
+                    (або Money), currency - валюта суми (None - валюта вихідного рахунку, для поповнення - цільового).
+                mark (dict, optional): Позначка, що записується до журналу в тому самому записі, що й пакет,
+                    разом з кодами результатів рядків (ключі mark та status), навіть якщо жоден рядок не виконано.
+                    Так завантажувач (ingest.py) атомарно фіксує свою позицію у файлі. За замовчуванням None.
+
+            Повертає:
+                array: Код результату для кожного рядка (array('b')): BATCH_OK - виконано, BATCH_INVALID - невірний
+                    рядок (не кортеж з 5 полів), тип, сума чи валюта, BATCH_NO_ACCOUNT - рахунок не знайдено, BATCH_BLOCKED - рахунок заблоковано,
+                    BATCH_FUNDS - недостатньо коштів або перевищено кредитний ліміт.
+        """
+        accounts = {}
+        parsed = []
+        status = array('b')
+        suported = Cheking_account._suported_currency
+        for row in rows:
+            if not isinstance(row, (tuple, list)) or len(row) != 5:
+                status.append(self.BATCH_INVALID)
+                parsed.append(None)
+                continue
+            kind, source_id, target_id, amount, currency = row
+            code = self.BATCH_OK
+            source = target = None
+            if kind == "deposit":
+                source_id = None
+            elif kind == "withdraw":
+                target_id = None
+            elif kind != "transfer":
+                code = self.BATCH_INVALID
+
+            for account_id in (source_id, target_id):
+                if account_id is not None and account_id not in accounts:
+                    accounts[account_id] = self._accounts.get(account_id) if isinstance(account_id, int) else None
+            if code == self.BATCH_OK:
+                source = accounts.get(source_id) if source_id is not None else None
+                target = accounts.get(target_id) if target_id is not None else None
+                if (kind != "deposit" and source is None) or (kind != "withdraw" and target is None):
+                    code = self.BATCH_NO_ACCOUNT
+            if code == self.BATCH_OK:
+                if currency is None:
+                    currency = amount._currency if isinstance(amount, Money) else (source or target)._currency
+                try:
+                    if not isinstance(currency, str) or currency not in suported or isinstance(amount, bool) or \
+                            not isinstance(amount, (int, float, Money)) or amount <= 0:
+                        code = self.BATCH_INVALID
+                    else:
+                        amount = Money.of(amount, currency)
+                except (TypeError, ValueError, OverflowError):
+                    code = self.BATCH_INVALID
+            status.append(code)
+            parsed.append((kind, source, target, amount) if code == self.BATCH_OK else None)
+
+        touched = [account for account in accounts.values() if account is not None]
+        with account_locks.hold(*touched):
+            balances = {}
+            executed = []
+            for index, row in enumerate(parsed):
+                if row is None:
+                    continue
+                kind, source, target, amount = row
+                if (source is not None and source._blocked) or (target is not None and target._blocked):
+                    status[index] = self.BATCH_BLOCKED
+                    continue
+                if kind == "deposit" and amount._minor <= 5:
+                    status[index] = self.BATCH_INVALID
+                    continue
+                credit = amount.convert(target._currency)._minor if target is not None else 0
+                if kind == "transfer" and credit <= 5:
+                    status[index] = self.BATCH_INVALID
+                    continue
+                if source is not None:
+                    source_id = source._account_id
+                    balance = balances.get(source_id)
+                    if balance is None:
+                        balance = source._balance._minor
+                    debit = amount.convert(source._currency)._minor
+                    if balance < debit:
+                        status[index] = self.BATCH_FUNDS
+                        continue
+                    balances[source_id] = balance - debit
+                if target is not None:
+                    target_id = target._account_id
+                    balance = balances.get(target_id)
+                    balances[target_id] = (target._balance._minor if balance is None else balance) + credit
+                executed.append(row)
+
+            before = self._stats.capture(touched)
+            changed = []
+            for account in touched:
+                balance = balances.get(account._account_id)
+                if balance is not None and balance != account._balance._minor:
+                    account._balance = _money(balance, account._currency)
+                    changed.append(account)
+            self._stats.update(before, touched)
+
+            timestamp = time.time_ns()
+            ids = Transaction._reserve_ids(len(executed)) if executed else range(0)
+            records = [TransactionRecord(transaction_id, kind,
+                                         source._account_id if source is not None else None,
+                                         target._account_id if target is not None else None,
+                                         amount._minor, amount._currency, timestamp)
+                       for transaction_id, (kind, source, target, amount) in zip(ids, executed)]
+            entry = None
+            if self._journal is not None and (records or mark is not None):
+                entry = {"op": "batch", "records": [list(record) for record in records],
+                         "accounts": [dict(account._state(), id=account._account_id) for account in changed]}
+                if mark is not None:
+                    entry["mark"] = mark
+                    entry["status"] = "".join(map(str, status))
+            seq = self._commit(entry, records)
+        self._await_commit(seq)
+
+        log.info("Виконано пакет операцій: %s з %s рядків, змінено %s рахунків", len(records), len(status), len(changed))
+        return status
+
+    def stats(self) -> dict:
+        """
+            Повертає агреговані показники банку.
+
+            Показники оновлюються інкрементно при кожній зміні балансу рахунку банку (зокрема прямих
+            викликах deposit, withdraw та Transaction.execute), у execute_batch та при створенні рахунків,
+            тож виклик не перебирає рахунки.
+
+            Повертає:
+                dict: {"accounts": кількість рахунків, "blocked": кількість заблокованих рахунків,
+                "deposits": {валюта: Money} - сума залишків чекових та ощадних рахунків,
+                "exposure": {валюта: Money} - кредитна заборгованість (_limit - _balance + _credit)}.
+        """
+        result = {"accounts": len(self._accounts), "blocked": self._index.blocked_count(), "deposits": {}, "exposure": {}}
+        for (name, currency), minor in self._stats.totals().items():
+            result[name][currency] = Money(minor, currency)
+        return result
+
+    def check_stats(self, repair: bool = False) -> dict:
+        """
+            Порівнює інкрементні показники з повним перерахунком по всіх рахунках.
+
+            Під час перевірки блокуються всі рахунки та банк, тож паралельні операції чекають на її завершення.
+            Розбіжність означає, що баланс рахунку змінено в обхід методів рахунку (прямим присвоєнням _balance).
+
+            Аргументи:
+                repair (bool, optional): Замінити інкрементні показники перерахованими. За замовчуванням False.
+
+            Повертає:
+                dict: Розбіжності {(показник, валюта): (інкрементне значення, перераховане значення)};
+                порожній словник - показники узгоджені.
+        """
+        with account_locks.hold(*self._accounts.values()), self._lock:
+            actual = self._stats.totals()
+            expected = BankStats.recompute(self._accounts.values())
+            blocked = sum(1 for account in self._accounts.values() if account._blocked)
+            mismatches = {key: (actual.get(key, 0), expected.get(key, 0))
+                          for key in actual.keys() | expected.keys() if actual.get(key, 0) != expected.get(key, 0)}
+            if blocked != self._index.blocked_count():
+                mismatches[("blocked", None)] = (self._index.blocked_count(), blocked)
+            if mismatches and repair:
+                self._stats.rebuild(self._accounts.values())
+                self._index.rebuild(self._users, self._accounts)
+
+        if mismatches:
+            log.warning("Агреговані показники банку '%s' не збігаються з перерахунком: %s", self._name, mismatches)
+        return mismatches
+
+    def transactions(self) -> list:
+        """
+            Повертає записи транзакцій, виконаних через execute (включно з відновленими з журналу).
+
+            Повертає:
+                list: Записи TransactionRecord у порядку виконання.
+        """
+        return list(self.__transactions)
+
+    def snapshot(self, wait: bool = False) -> threading.Thread:
+        """
+            Записує знімок стану банку.
+
+            Під блокуванням банку фіксується позиція журналу і копіюються колонки колонкового сховища
+            (для рахунків-об'єктів банку з журналом - лише їх список); стан рахунків-об'єктів, кодування
+            та запис файлу виконуються у фоновому потоці, тож обробка транзакцій не зупиняється.
+            Знімки записуються по черзі, кожен атомарно замінює попередній.
+
+            Аргументи:
+                wait (bool, optional): Дочекатися запису знімка. За замовчуванням False.
+
+            Повертає:
+                threading.Thread: Потік, що записує знімок.
+
+            Винятки:
+                ValueError: Якщо для банку не задано шлях до знімка.
+        """
+        if self._snapshot_path is None:
+            e = ValueError("Для банку не задано шлях до знімка")
+            log.exception("Неможливо записати знімок банку", e)
+            raise e
+
+        with self._lock:
+            seq, offset = self._journal.position() if self._journal is not None else (0, 0)
+            # З журналом під блокуванням фіксується лише список рахунків-об'єктів, а їх стан читається
+            # у фоновому потоці: розбіжність з позицією seq виправляє відтворення журналу після неї.
+            state = Snapshot.capture(self._users, self._accounts, self.__transactions, seq, offset,
+                                     (User._next_id(), Cheking_account._next_id(), Transaction._next_id()),
+                                     defer_accounts=self._journal is not None)
+            self._snapshot_seq = seq
+            thread = threading.Thread(target=self._write_snapshot, args=(state, self._snapshot_thread),
+                                      name="bank-snapshot", daemon=True)
+            self._snapshot_thread = thread
+        thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _write_snapshot(self, state: Snapshot, previous: threading.Thread):
+        """
+            Записує знімок у файл (виконується у фоновому потоці).
+
+            Спершу чекає на попередній знімок та фіксацію журналу до позиції знімка,
+            щоб знімок ніколи не випереджав журнал на диску.
+        """
+        if previous is not None:
+            previous.join()
+        try:
+            if self._journal is not None:
+                self._journal.flush()
+            state.write(self._snapshot_path)
+            log.info("Записано знімок банку '%s' до %s (журнал до запису #%s)", self._name, self._snapshot_path,
+                     state.seq)
+        except Exception as e:
+            log.exception("Не вдалося записати знімок банку до %s", e, self._snapshot_path)
+
+    def close(self):
+        """Чекає на запис знімка, фіксує та закриває журнал операцій банку."""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._journal is not None:
+            self._journal.close()
+
+    def _load_snapshot(self) -> int:
+        """
+            Відновлює користувачів, рахунки, історію транзакцій та лічильники ID зі знімка.
+
+            У колонковому режимі колонки знімка стають колонками сховища без перетворення на об'єкти.
+
+            Повертає:
+                int: Зміщення у журналі, з якого починаються записи після знімка.
+        """
+        snapshot = Snapshot.load(self._snapshot_path)
+        for data in snapshot.users():
+            user = User._restore(data)
+            self._users[user._user_id] = user
+
+        store = snapshot.account_store(self._users)
+        if isinstance(self._accounts, AccountStore):
+            self._accounts = store
+            for account in store.values():
+                account._owner.add_account(account)
+        else:
+            for view in store.values():
+                owner = view._owner
+                self._register_account(owner, self._account_types[view._kind]._restore(view._dump(), owner))
+
+        self.__transactions.extend(snapshot.transactions())
+        next_user, next_account, next_transaction = snapshot.counters
+        User._advance_id(next_user - 1)
+        Cheking_account._advance_id(next_account - 1)
+        Transaction._advance_id(next_transaction - 1)
+        self._snapshot_seq = snapshot.seq
+        log.info("Відновлено стан банку '%s' зі знімка %s: %s користувачів, %s рахунків (журнал до запису #%s)",
+                 self._name, self._snapshot_path, len(self._users), len(self._accounts), snapshot.seq)
+        return snapshot.offset
+
+    def _replay(self, offset: int = 0) -> int:
+        """
+            Відновлює користувачів, рахунки, баланси та історію транзакцій з журналу.
+
+            Журнал читається потоково, запис за записом; об'єкти відновлюються без
+            генерації нових ID та без записів у лог на кожен об'єкт. Записи, вже враховані
+            у завантаженому знімку, пропускаються.
+
+            Аргументи:
+                offset (int, optional): Зміщення у журналі, з якого починати читання. За замовчуванням 0.
+
+            Повертає:
+                int: Кількість відтворених записів.
+        """
+        if offset > os.path.getsize(self._journal.path):
+            log.warning("Журнал %s коротший за позицію зі знімка, журнал читається з початку", self._journal.path)
+            offset = 0
+
+        count = 0
+        users = self._users
+        accounts = self._accounts
+        transactions = self.__transactions
+        last_transaction_id = 0
+        after_seq = self._snapshot_seq
+        for entry in self._journal.entries(offset):
+            if entry["seq"] <= after_seq:
+                continue
+            op = entry["op"]
+            if op == "tx" or op == "batch" or op == "state":
+                for state in entry["accounts"]:
+                    accounts[state["id"]]._load_state(state)
+                if op == "tx":
+                    record = TransactionRecord(entry["transaction_id"], entry["kind"], entry["source_id"],
+                                               entry["target_id"], entry["amount"], entry["currency"],
+                                               entry["timestamp"])
+                    transactions.append(record)
+                    last_transaction_id = max(last_transaction_id, record.transaction_id)
+                elif op == "batch":
+                    for values in entry["records"]:
+                        record = TransactionRecord(*values)
+                        transactions.append(record)
+                        last_transaction_id = max(last_transaction_id, record.transaction_id)
+            elif op == "user" or op == "users":
+                for data in (entry["users"] if op == "users" else (entry,)):
+                    if data["id"] not in users:
+                        user = User._restore(data)
+                        users[user._user_id] = user
+            elif op == "account":
+                if entry["id"] in accounts:
+                    accounts[entry["id"]]._load_state(entry)
+                else:
+                    owner = users[entry["owner"]]
+                    self._register_account(owner, self._account_types[entry["type"]]._restore(entry, owner))
+            elif op == "accounts":
+                created = []
+                for data in entry["accounts"]:
+                    if data["id"] in accounts:
+                        accounts[data["id"]]._load_state(data)
+                    else:
+                        created.append(data)
+                if created:
+                    self._register_accounts(created)
+                    Cheking_account._advance_id(created[-1]["id"])
+            else:
+                log.warning("Невідомий запис журналу: %s", entry)
+                continue
+            count += 1
+
+        if last_transaction_id:
+            Transaction._advance_id(last_transaction_id)
+        log.info("Відновлено стан банку '%s' з журналу %s: %s записів, %s користувачів, %s рахунків",
+                 self._name, self._journal.path, count, len(users), len(accounts))
+        return count
+
     def get_account(self, account_id : int):
         """
             Отримує рахунок за ID.
@@ -202,6 +971,76 @@ class Bank:
 
         return self._accounts.get(account_id)
 
+    def find_users(self, email: str = None, phone_number: str = None) -> list:
+        """
+            Шукає користувачів за email та/або телефоном через хеш-індекси (без перебору користувачів).
+
+            Аргументи:
+                email (str, optional): Email.
+                phone_number (str, optional): Номер телефону.
+
+            Повертає:
+                list: Користувачі, що відповідають усім вказаним значенням (у порядку ID).
+
+            Винятки:
+                ValueError: Якщо не вказано ні email, ні телефон.
+        """
+        if email is None and phone_number is None:
+            e = ValueError("Потрібно вказати email або phone_number")
+            log.exception("Неможливо знайти користувачів", e)
+            raise e
+
+        users = self._users
+        return [users[user_id] for user_id in sorted(self._index.users(email, phone_number))]
+
+    def query(self, account_type: type = None, currency: str = None, blocked: bool = None,
+              min_utilization: float = None) -> list:
+        """
+            Шукає рахунки через вторинні індекси.
+
+            Рахунки за типом, валютою та статусом блокування знаходяться перетином індексів
+            (вартість залежить від кількості знайдених рахунків, а не від розміру банку);
+            фільтр використання кредитного ліміту перевіряється лише для знайдених кредитних рахунків.
+
+            Аргументи:
+                account_type (type, optional): Клас рахунку (Cheking_account, Savings_account, Credit_account), точний тип.
+                currency (str, optional): Валюта рахунку.
+                blocked (bool, optional): Статус блокування.
+                min_utilization (float, optional): Мінімальна частка використаного кредитного ліміту (0..1),
+                    лише для кредитних рахунків.
+
+            Повертає:
+                list: Рахунки у порядку ID.
+
+            Винятки:
+                TypeError: Якщо account_type не є класом рахунку.
+                ValueError: Якщо валюта не підтримується або min_utilization задано не для кредитних рахунків.
+        """
+        if account_type is not None and account_type not in (Cheking_account, Savings_account, Credit_account):
+            e = TypeError(f"account_type повинен бути класом рахунку, а не {account_type!r}")
+            log.exception("Неправильний запит рахунків", e)
+            raise e
+
+        if currency is not None and currency not in Cheking_account._suported_currency:
+            e = ValueError(f"Значення {currency}, для валют не припустиме")
+            log.exception("Неправильний запит рахунків", e)
+            raise e
+
+        if min_utilization is not None:
+            if account_type not in (None, Credit_account):
+                e = ValueError("min_utilization можна використовувати лише для кредитних рахунків")
+                log.exception("Неправильний запит рахунків", e)
+                raise e
+            account_type = Credit_account
+
+        ids = self._index.accounts(account_type._kind if account_type is not None else None, currency, blocked)
+        accounts = self._accounts
+        found = [accounts[account_id] for account_id in sorted(ids)]
+        if min_utilization is not None:
+            found = [account for account in found
+                     if account._limit._minor - account._balance._minor >= min_utilization * account._limit._minor]
+        return found
+
     def close_account(self, account: (Cheking_account, Credit_account, Savings_account)):
         """
             Закриває рахунок в банку.
@@ -217,21 +1056,19 @@ class Bank:
                 f"account повинно бути об'єктом одного з класів: (Cheking_account, Credit_account, Savings_account), а не {account}")
             log.exception("Недопустиме значення аргументу", e)
             raise e
-        if isinstance(account, Credit_account):
-            if account._balance == account._limit and account._credit == 0:
-                account.block_account()
-            elif account._balance < account._limit:
-                log.info(f"Рахунок #{account._account_id} не можливо закрити через присутні на ньому борг у розімрі: {account._limit - account._balance + account._credit} {account._currency}")
-            else:
-                log.info(f"Рахунок #{account._account_id} не можливо закрити через присутні на ньому кошти у розімрі: {account._balance - account._limit} {account._currency}")
-
-
-        elif isinstance(account, (Savings_account, Cheking_account)):
-            if account.balance == 0:
-                account.block_account()
-            else:
-                log.info(f"Рахунок #{account._account_id} не можливо закрити через присутні на ньому кошти у розімрі: {account._balance} {account._currency}")
-
-
-
+        with account_locks.hold(account):
+            if isinstance(account, Credit_account):
+                if account._balance == account._limit and account._credit == 0:
+                    account.block_account()
+                    self._record_state("close", (account,))
+                elif account._balance < account._limit:
+                    log.info(lambda: f"Рахунок #{account._account_id} не можливо закрити через присутні на ньому борг у розімрі: {account._limit - account._balance + account._credit}")
+                else:
+                    log.info(lambda: f"Рахунок #{account._account_id} не можливо закрити через присутні на ньому кошти у розімрі: {account._balance - account._limit}")
 
+            elif isinstance(account, (Savings_account, Cheking_account)):
+                if account._balance == 0:
+                    account.block_account()
+                    self._record_state("close", (account,))
+                else:
+                    log.info("Рахунок #%s не можливо закрити через присутні на ньому кошти у розімрі: %s", account._account_id, account._balance)
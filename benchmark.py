@@ -0,0 +1,1210 @@
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from logger import Logger, log
+from bank import Bank
+from journal import Journal
+from concurrency import TransactionExecutor
+from transaction import DepositTransaction, TransferTransaction, CompositeTransaction, TransactionRecord, \
+    WithdrawTransaction
+from accounts import Credit_account
+from stats import BankStats
+from sharding import ShardedBank
+from currency import StaticRateSource, currate
+from metrics import metrics
+from tracing import tracer, profile_call, trace_memory
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+Модуль benchmark містить заміри продуктивності та використання пам'яті банківської системи.
+
+Запуск:
+    python benchmark.py memory [--count N]
+    python benchmark.py journal [--users N] [--transactions N] [--durable]
+    python benchmark.py snapshot [--users N] [--transactions N] [--tail N] [--columnar]
+    python benchmark.py stress [--accounts N] [--transactions N] [--threads N] [--columnar] [--journal]
+    python benchmark.py batch [--users N] [--rows N] [--columnar] [--journal]
+    python benchmark.py bulk [--users N] [--columnar] [--journal] [--durable]
+    python benchmark.py query [--users N] [--columnar]
+    python benchmark.py stats [--users N] [--columnar]
+    python benchmark.py history [--accounts N] [--transactions N] [--columnar]
+    python benchmark.py shards [--max-shards N] [--accounts N] [--rows N] [--cross F]
+    python benchmark.py suite [--books N,N,...] [--operations N] [--columnar] [--output FILE]
+    python benchmark.py metrics [--operations N]
+    python benchmark.py profile [--users N] [--transactions N] [--rows N] [--keep N] [--output DIR]
+    python benchmark.py imports [--modules M,M,...] [--repeat N] [--budget-ms F]
+    python benchmark.py compare BASELINE CURRENT [--threshold F]
+
+Функції:
+- bytes_per_object: Середня кількість байтів, виділених на один об'єкт.
+- memory_benchmark: Порівнює пам'ять об'єктів з __slots__ та з __dict__.
+- journal_benchmark: Вимірює швидкість запису журналу та відновлення банку з нього.
+- snapshot_benchmark: Порівнює запуск банку зі знімка та хвоста журналу із повним відтворенням журналу.
+- stress_test: Перевіряє відсутність втрачених оновлень при паралельному виконанні транзакцій.
+- batch_benchmark: Порівнює Bank.execute_batch з виконанням тих самих операцій по одній.
+- bulk_benchmark: Порівнює пакетне створення користувачів і рахунків зі створенням по одному.
+- query_benchmark: Порівнює пошук через вторинні індекси з перебором.
+- stats_benchmark: Порівнює Bank.stats з обчисленням показників перебором рахунків.
+- history_benchmark: Вимірює запит історії рахунку при зростанні кількості транзакцій.
+- shards_benchmark: Вимірює пропускну здатність шардованого банку за кількістю шардів.
+- suite_benchmark: Набір відтворюваних замірів гарячих шляхів (операцій/с, p50/p99, пікова пам'ять).
+- metrics_benchmark: Вимірює накладні витрати метрик на гарячих шляхах.
+- profile_benchmark: Трасує повільні транзакції та профілює пакетне виконання (cProfile, tracemalloc).
+- import_benchmark: Вимірює час імпорту модулів (python -X importtime) та перевіряє відсутність побічних ефектів.
+- compare_results: Знаходить регресії сценаріїв suite_benchmark відносно базових результатів.
+"""
+
+_SUITE_RATES = {"USD": {"buy": 41.0, "sale": 41.5}, "EUR": {"buy": 44.5, "sale": 45.2}}
+_SUITE_CURRENCIES = ("UAH", "USD", "EUR")
+
+
+class _DictLayout:
+    """Об'єкт зі звичайним __dict__, що відтворює розміщення атрибутів до впровадження __slots__."""
+
+
+def _as_dict_layout(obj):
+    """
+        Копіює атрибути об'єкта з __slots__ в об'єкт з __dict__.
+
+        Аргументи:
+            obj (object): Об'єкт з __slots__.
+
+        Повертає:
+            _DictLayout: Об'єкт з тими самими атрибутами у __dict__.
+    """
+    layout = _DictLayout()
+    for cls in reversed(type(obj).__mro__):
+        for name in cls.__dict__.get("__slots__", ()):
+            if hasattr(obj, name):
+                layout.__dict__[name] = getattr(obj, name)
+    return layout
+
+
+def bytes_per_object(factory, count : int = 10000) -> float:
+    """
+        Вимірює середню кількість байтів, виділених на один об'єкт (за tracemalloc).
+
+        Аргументи:
+            factory (callable): Функція, що створює один об'єкт.
+            count (int, optional): Кількість об'єктів. За замовчуванням 10000.
+
+        Повертає:
+            float: Байтів на об'єкт.
+    """
+    objects = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            objects[i] = factory()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / count
+
+
+def memory_benchmark(count : int = 10000) -> dict:
+    """
+        Порівнює пам'ять, яку займає один об'єкт з __slots__ та такий самий об'єкт з __dict__.
+
+        Вимірюється "оболонка" об'єкта (посилання на вже створені значення спільні),
+        тож різниця показує саме виграш від __slots__. Для TransactionRecord
+        порівняння ведеться зі словником з тими самими полями.
+
+        Аргументи:
+            count (int, optional): Кількість об'єктів у кожному замірі. За замовчуванням 10000.
+
+        Повертає:
+            dict: {назва: {"dict": байтів, "slots": байтів}}.
+    """
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        bank = Bank("Benchmark", "Local")
+        user = bank.add_user("Bench", "User", "bench@example.com", "0000000000")
+        checking = bank.create_checking_account(user)
+        savings = bank.create_savings_account(user, 1, 0.01)
+        credit = bank.create_credit_account(user, 1000.0, 1, 0.01)
+        transaction = TransferTransaction(10, credit, checking)
+        record = transaction.to_record()
+    finally:
+        log.set_level(previous_level)
+
+    results = {}
+    for name, obj in (("User", user), ("Cheking_account", checking), ("Savings_account", savings),
+                      ("Credit_account", credit), ("TransferTransaction", transaction)):
+        layout = _as_dict_layout(obj)
+        results[name] = {
+            "dict": bytes_per_object(lambda: copy.copy(layout), count),
+            "slots": bytes_per_object(lambda: copy.copy(obj), count),
+        }
+    fields = record._asdict()
+    results["TransactionRecord"] = {
+        "dict": bytes_per_object(lambda: dict(fields), count),
+        "slots": bytes_per_object(lambda: TransactionRecord(*record), count),
+    }
+    return results
+
+
+def _open_accounts(bank : Bank, users : int) -> list:
+    """Додає користувачів з одним поповненим чековим рахунком на кожного та повертає рахунки."""
+    accounts = []
+    for i in range(users):
+        user = bank.add_user("Bench", f"User{i}")
+        account = bank.create_checking_account(user)
+        bank.execute(DepositTransaction(1000, account))
+        accounts.append(account)
+    return accounts
+
+
+def _transfer(bank : Bank, accounts : list, transactions : int, rng : random.Random):
+    """Виконує випадкові перекази між рахунками."""
+    for _ in range(transactions):
+        source, target = rng.sample(accounts, 2)
+        bank.execute(TransferTransaction(rng.randint(1, 10), source, target))
+
+
+def journal_benchmark(users : int = 1000, transactions : int = 100000, durable : bool = False,
+                      seed : int = 1) -> dict:
+    """
+        Наповнює банк з журналом операцій, а потім вимірює час запуску банку з відновленням з журналу.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів (по одному чековому рахунку на кожного). За замовчуванням 1000.
+            transactions (int, optional): Кількість транзакцій. За замовчуванням 100000.
+            durable (bool, optional): Чекати фіксації кожного запису на диску. За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Швидкість запису (транзакцій/с), кількість fsync, розмір журналу,
+            час запуску та швидкість відтворення (записів/с).
+    """
+    rng = random.Random(seed)
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.journal")
+            journal = Journal(path, durable=durable)
+            bank = Bank("Benchmark", "Local", journal=journal)
+            accounts = _open_accounts(bank, users)
+
+            started = time.perf_counter()
+            _transfer(bank, accounts, transactions, rng)
+            journal.flush()
+            write_time = time.perf_counter() - started
+            bank.close()
+
+            started = time.perf_counter()
+            restored = Bank("Benchmark", "Local", journal=path)
+            startup_time = time.perf_counter() - started
+            restored.close()
+
+            if any(restored.get_account(account._account_id)._balance != account._balance for account in accounts):
+                raise RuntimeError("Стан відновленого банку не збігається з початковим")
+
+            return {
+                "transactions_per_sec": transactions / write_time,
+                "fsyncs": journal.commits,
+                "journal_bytes": os.path.getsize(path),
+                "entries": journal.seq,
+                "startup_sec": startup_time,
+                "replay_entries_per_sec": journal.seq / startup_time,
+            }
+    finally:
+        log.set_level(previous_level)
+
+
+def snapshot_benchmark(users : int = 100000, transactions : int = 100000, tail : int = 1000,
+                       columnar : bool = False, seed : int = 1) -> dict:
+    """
+        Порівнює час запуску банку зі знімка та хвоста журналу з повним відтворенням журналу
+        і з побудовою того самого банку через add_user та create_checking_account.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів (по одному чековому рахунку на кожного). За замовчуванням 100000.
+            transactions (int, optional): Кількість транзакцій до знімка. За замовчуванням 100000.
+            tail (int, optional): Кількість транзакцій після знімка. За замовчуванням 1000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Час побудови банку з нуля, паузи на знімок, запису знімка, розмір знімка,
+            час запуску з журналу та зі знімка з хвостом журналу (у секундах).
+    """
+    rng = random.Random(seed)
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            journal_path = os.path.join(directory, "bench.journal")
+            snapshot_path = os.path.join(directory, "bench.snapshot")
+            bank = Bank("Benchmark", "Local", columnar=columnar, journal=Journal(journal_path, durable=False),
+                        snapshot=snapshot_path)
+            started = time.perf_counter()
+            accounts = _open_accounts(bank, users)
+            rebuild_time = time.perf_counter() - started
+            _transfer(bank, accounts, transactions, rng)
+
+            started = time.perf_counter()
+            writer = bank.snapshot()
+            pause_time = time.perf_counter() - started
+            _transfer(bank, accounts, tail, rng)
+            writer.join()
+            write_time = time.perf_counter() - started
+            bank.close()
+
+            expected = {account._account_id: account._balance for account in accounts}
+            os.rename(snapshot_path, snapshot_path + ".keep")
+            started = time.perf_counter()
+            Bank("Benchmark", "Local", columnar=columnar, journal=journal_path).close()
+            journal_startup = time.perf_counter() - started
+
+            os.rename(snapshot_path + ".keep", snapshot_path)
+            started = time.perf_counter()
+            restored = Bank("Benchmark", "Local", columnar=columnar, journal=journal_path, snapshot=snapshot_path)
+            snapshot_startup = time.perf_counter() - started
+            restored.close()
+
+            if any(restored.get_account(account_id)._balance != balance for account_id, balance in expected.items()):
+                raise RuntimeError("Стан відновленого банку не збігається з початковим")
+
+            return {
+                "rebuild_sec": rebuild_time,
+                "snapshot_pause_sec": pause_time,
+                "snapshot_write_sec": write_time,
+                "snapshot_bytes": os.path.getsize(snapshot_path),
+                "journal_startup_sec": journal_startup,
+                "snapshot_startup_sec": snapshot_startup,
+            }
+    finally:
+        log.set_level(previous_level)
+
+
+def batch_benchmark(users : int = 1000, rows : int = 100000, columnar : bool = False, journal : bool = False,
+                    seed : int = 1) -> dict:
+    """
+        Виконує однаковий платіжний файл (перекази та поповнення) двома способами: по одній транзакції
+        через Bank.execute та одним викликом Bank.execute_batch, і перевіряє, що баланси збігаються.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів (по одному чековому рахунку на кожного). За замовчуванням 1000.
+            rows (int, optional): Кількість рядків платіжного файлу. За замовчуванням 100000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            journal (bool, optional): Вести журнал операцій (не durable). За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Рядків/с для обох способів, прискорення та кількість виконаних рядків.
+
+        Винятки:
+            RuntimeError: Якщо результати двох способів не збігаються.
+    """
+    rng = random.Random(seed)
+    payments = []
+    for _ in range(rows):
+        source, target = rng.randrange(users), rng.randrange(users)
+        if rng.random() < 0.9:
+            payments.append(("transfer", source, target, rng.randint(1, 10)))
+        else:
+            payments.append(("deposit", None, target, rng.randint(1, 10)))
+
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = {}
+            balances = []
+            for mode in ("single", "batch"):
+                path = os.path.join(directory, mode + ".journal") if journal else None
+                bank = Bank("Benchmark", "Local", columnar=columnar,
+                            journal=Journal(path, durable=False) if path else None)
+                accounts = _open_accounts(bank, users)
+                started = time.perf_counter()
+                if mode == "single":
+                    executed = 0
+                    for kind, source, target, amount in payments:
+                        try:
+                            if kind == "transfer":
+                                bank.execute(TransferTransaction(amount, accounts[source], accounts[target]))
+                            else:
+                                bank.execute(DepositTransaction(amount, accounts[target]))
+                            executed += 1
+                        except Exception:
+                            pass
+                else:
+                    ids = [account._account_id for account in accounts]
+                    status = bank.execute_batch((kind, ids[source] if source is not None else None, ids[target],
+                                                 amount, None) for kind, source, target, amount in payments)
+                    executed = status.count(Bank.BATCH_OK)
+                if journal:
+                    bank._journal.flush()
+                results[mode + "_rows_per_sec"] = rows / (time.perf_counter() - started)
+                results[mode + "_executed"] = executed
+                balances.append([account._balance._minor for account in accounts])
+                bank.close()
+
+            if balances[0] != balances[1] or results["single_executed"] != results["batch_executed"]:
+                raise RuntimeError("Результати пакетного та послідовного виконання не збігаються")
+            results["speedup"] = results["batch_rows_per_sec"] / results["single_rows_per_sec"]
+            return results
+    finally:
+        log.set_level(previous_level)
+
+
+def bulk_benchmark(users : int = 100000, columnar : bool = False, journal : bool = False,
+                   durable : bool = False) -> dict:
+    """
+        Створює однакових користувачів з чековим, ощадним і кредитним рахунком двома способами: викликами
+        Bank.add_user та create_*_account по одному і викликами Bank.bulk_add_users та bulk_create_accounts,
+        і перевіряє, що отримані банки збігаються.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів. За замовчуванням 100000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            journal (bool, optional): Вести журнал операцій. За замовчуванням False.
+            durable (bool, optional): Чекати fsync журналу для кожного виклику (потребує journal). За замовчуванням False.
+
+        Повертає:
+            dict: Об'єктів (користувачів і рахунків) за секунду для обох способів та прискорення.
+
+        Винятки:
+            RuntimeError: Якщо результати двох способів не збігаються.
+    """
+    people = [("Bench", f"User{i}", f"user{i}@bench.local", None) for i in range(users)]
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = {}
+            states = []
+            for mode in ("single", "bulk"):
+                path = os.path.join(directory, mode + ".journal") if journal else None
+                bank = Bank("Benchmark", "Local", columnar=columnar,
+                            journal=Journal(path, durable=durable) if path else None)
+                started = time.perf_counter()
+                if mode == "single":
+                    for first_name, last_name, email, phone_number in people:
+                        user = bank.add_user(first_name, last_name, email, phone_number)
+                        bank.create_checking_account(user)
+                        bank.create_savings_account(user, 12, 5.0, "USD")
+                        bank.create_credit_account(user, 1000.0, 1, 2.5)
+                else:
+                    created = bank.bulk_add_users(people)
+                    rows = []
+                    for user in created:
+                        rows.append(("checking", user, "UAH"))
+                        rows.append(("savings", user, "USD", 12, 5.0))
+                        rows.append(("credit", user, "UAH", 1, 2.5, 1000.0))
+                    bank.bulk_create_accounts(rows)
+                if journal:
+                    bank._journal.flush()
+                results[mode + "_objects_per_sec"] = users * 4 / (time.perf_counter() - started)
+                states.append((len(bank._users), sorted((account._kind, account._currency, account._balance._minor)
+                                                        for account in bank._accounts.values()), bank._stats.totals()))
+                bank.close()
+
+            if states[0] != states[1]:
+                raise RuntimeError("Результати пакетного та послідовного створення не збігаються")
+            results["speedup"] = results["bulk_objects_per_sec"] / results["single_objects_per_sec"]
+            return results
+    finally:
+        log.set_level(previous_level)
+
+
+def _use_suite_rates() -> tuple:
+    """
+        Встановлює для currate курси _SUITE_RATES, щоб заміри не залежали від мережі.
+
+        Повертає:
+            tuple: Попередній стан currate для _restore_rates (курси читаються без завантаження з джерела).
+    """
+    previous = (currate.source, currate._rates, currate._last_usage, currate._load_attempted)
+    currate.set_source(StaticRateSource(_SUITE_RATES))
+    return previous
+
+
+def _restore_rates(previous : tuple):
+    """Відновлює стан currate, збережений _use_suite_rates, без повторного завантаження з джерела."""
+    currate.source, currate.rates, currate._last_usage, currate._load_attempted = previous
+
+
+def _keys(items) -> list:
+    """Повертає ID користувачів або рахунків (для порівняння результатів запитів)."""
+    return [getattr(item, "_account_id", None) or item._user_id for item in items]
+
+
+def _per_call(function, repeat : int) -> float:
+    """Повертає середній час одного виклику function (у мікросекундах)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def query_benchmark(users : int = 100000, columnar : bool = False, seed : int = 1) -> dict:
+    """
+        Порівнює час запитів Bank.find_users та Bank.query з перебором усіх користувачів чи рахунків.
+
+        Банк містить users користувачів (з унікальним email) з чековим рахунком у гривнях і
+        кредитним рахунком у доларах на кожного 100-го; частина рахунків заблокована. Зняття з
+        доларових рахунків конвертуються за курсами _SUITE_RATES, тож мережа не потрібна.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів. За замовчуванням 100000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Час запиту (мкс) через індекс та перебором для кожного запиту.
+
+        Винятки:
+            RuntimeError: Якщо результати індексу та перебору не збігаються.
+    """
+    rng = random.Random(seed)
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    previous = _use_suite_rates()
+    try:
+        bank = Bank("Benchmark", "Local", columnar=columnar)
+        for i in range(users):
+            user = bank.add_user("Bench", f"User{i}", f"user{i}@bank.ua", f"+380{i:09d}")
+            account = bank.create_checking_account(user)
+            if i % 50 == 0:
+                account.block_account()
+            if i % 100 == 0:
+                credit = bank.create_credit_account(user, 1000.0, 1, 0.02, "USD")
+                bank.execute(WithdrawTransaction(rng.randint(1, 999), credit))
+
+        email = f"user{users // 2}@bank.ua"
+        queries = {
+            "email": (lambda: bank.find_users(email=email),
+                      lambda: [user for user in bank._users.values() if user._email == email]),
+            "blocked": (lambda: bank.query(blocked=True),
+                        lambda: [account for account in bank._accounts.values() if account._blocked]),
+            "credit_usd_over_80": (lambda: bank.query(Credit_account, "USD", min_utilization=0.8),
+                                   lambda: [account for account in bank._accounts.values()
+                                            if type(account)._kind == "credit" and account._currency == "USD"
+                                            and account._limit._minor - account._balance._minor
+                                            >= 0.8 * account._limit._minor]),
+        }
+        results = {}
+        for name, (indexed, scan) in queries.items():
+            if _keys(indexed()) != _keys(scan()):
+                raise RuntimeError(f"Результати запиту {name} через індекс та перебором не збігаються")
+            results[name + "_index_us"] = _per_call(indexed, 200)
+            results[name + "_scan_us"] = _per_call(scan, 3)
+        bank.close()
+        return results
+    finally:
+        _restore_rates(previous)
+        log.set_level(previous_level)
+
+
+def stats_benchmark(users : int = 100000, columnar : bool = False) -> dict:
+    """
+        Порівнює час Bank.stats (інкрементні показники) з обчисленням тих самих показників перебором рахунків.
+
+        Аргументи:
+            users (int, optional): Кількість користувачів (чековий і кредитний рахунок на кожного). За замовчуванням 100000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+
+        Повертає:
+            dict: Час (мкс) Bank.stats та перебору.
+
+        Винятки:
+            RuntimeError: Якщо показники не збігаються з перерахунком.
+    """
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        bank = Bank("Benchmark", "Local", columnar=columnar)
+        for i in range(users):
+            user = bank.add_user("Bench", f"User{i}")
+            bank.execute(DepositTransaction(1000, bank.create_checking_account(user)))
+            bank.execute(WithdrawTransaction(100, bank.create_credit_account(user, 1000.0, 1, 0.02)))
+        if bank.check_stats():
+            raise RuntimeError("Агреговані показники банку не збігаються з перерахунком")
+        results = {
+            "stats_us": _per_call(bank.stats, 1000),
+            "scan_us": _per_call(lambda: BankStats.recompute(bank._accounts.values()), 3),
+        }
+        bank.close()
+        return results
+    finally:
+        log.set_level(previous_level)
+
+
+def history_benchmark(accounts : int = 1000, transactions : int = 1000000, columnar : bool = False,
+                      seed : int = 1) -> dict:
+    """
+        Вимірює час запиту сторінки історії рахунку (Cheking_account.history) в міру зростання
+        кількості транзакцій банку та порівнює його з перебором усієї історії банку.
+
+        Транзакції додаються пакетами по 1000 випадкових переказів (Bank.execute_batch); після 1%, 10%
+        та 100% транзакцій вимірюється запит 50 записів одного рахунку, починаючи з середини його історії.
+
+        Аргументи:
+            accounts (int, optional): Кількість рахунків. За замовчуванням 1000.
+            transactions (int, optional): Кількість транзакцій. За замовчуванням 1000000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Час запиту (мкс) через історію рахунку та перебором для кожної кількості транзакцій.
+
+        Винятки:
+            RuntimeError: Якщо результати запиту та перебору не збігаються.
+    """
+    rng = random.Random(seed)
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        bank = Bank("Benchmark", "Local", columnar=columnar)
+        user = bank.add_user("Bench", "User")
+        opened = [bank.create_checking_account(user) for _ in range(accounts)]
+        bank.execute_batch([("deposit", None, item._account_id, 10 ** 6, None) for item in opened])
+        account = opened[accounts // 2]
+        account_id = account._account_id
+        ids = [item._account_id for item in opened]
+
+        results = {}
+        done = 0
+        for checkpoint in (transactions // 100, transactions // 10, transactions):
+            while done < checkpoint:
+                rows = min(1000, checkpoint - done)
+                bank.execute_batch([("transfer", *rng.sample(ids, 2), 1, None) for _ in range(rows)])
+                done += rows
+
+            mine = account.history()[0]
+            since = mine[len(mine) // 2].timestamp
+            indexed = lambda: account.history(since, limit=50)[0]
+            scan = lambda: [record for record in bank.transactions() if account_id in (record.source_id, record.target_id)
+                            and record.timestamp >= since][:50]
+            if indexed() != scan():
+                raise RuntimeError("Результати запиту історії рахунку та перебору не збігаються")
+            results[f"history_{done}_us"] = _per_call(indexed, 1000)
+            results[f"scan_{done}_us"] = _per_call(scan, 3)
+        bank.close()
+        return results
+    finally:
+        log.set_level(previous_level)
+
+
+def shards_benchmark(max_shards : int = None, accounts : int = 1000, rows : int = 200000, cross : float = 0.01,
+                     seed : int = 1) -> dict:
+    """
+        Вимірює пропускну здатність шардованого банку (ShardedBank) для 1, 2, 4, ... шардів.
+
+        Для кожної кількості шардів банк отримує accounts рахунків на шард, а платіжний файл
+        з випадкових переказів (частка cross - між шардами, за двофазним протоколом) виконується
+        пакетами по 10000 рядків. Перевіряється, що сума залишків не змінилась.
+
+        Аргументи:
+            max_shards (int, optional): Найбільша кількість шардів. За замовчуванням - кількість ядер процесора.
+            accounts (int, optional): Кількість рахунків на шард. За замовчуванням 1000.
+            rows (int, optional): Кількість рядків платіжного файлу. За замовчуванням 200000.
+            cross (float, optional): Частка переказів між шардами. За замовчуванням 0.01.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Рядків/с та прискорення відносно одного шарда для кожної кількості шардів.
+
+        Винятки:
+            RuntimeError: Якщо сума залишків змінилась.
+    """
+    max_shards = max_shards or os.cpu_count() or 1
+    counts = sorted({2 ** power for power in range(max_shards.bit_length()) if 2 ** power <= max_shards} | {max_shards})
+    results = {}
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    try:
+        for shards in counts:
+            rng = random.Random(seed)
+            with ShardedBank(shards) as bank:
+                user = bank.add_user("Bench", "User")
+                by_shard = [[] for _ in range(shards)]
+                for _ in range(accounts * shards):
+                    account_id = bank.create_checking_account(user)
+                    by_shard[bank.shard_of(account_id)].append(account_id)
+                bank.execute_batch([("deposit", None, account_id, 1000, None)
+                                    for ids in by_shard for account_id in ids])
+                total = bank.stats()["deposits"]
+
+                payments = []
+                for _ in range(rows):
+                    if shards > 1 and rng.random() < cross:
+                        source_shard, target_shard = rng.sample(range(shards), 2)
+                        payments.append(("transfer", rng.choice(by_shard[source_shard]),
+                                         rng.choice(by_shard[target_shard]), rng.randint(1, 10), None))
+                    else:
+                        ids = by_shard[rng.randrange(shards)]
+                        payments.append(("transfer", *rng.sample(ids, 2), rng.randint(1, 10), None))
+
+                started = time.perf_counter()
+                for start in range(0, rows, 10000):
+                    bank.execute_batch(payments[start:start + 10000])
+                elapsed = time.perf_counter() - started
+                if bank.stats()["deposits"] != total:
+                    raise RuntimeError(f"Сума залишків змінилась у банку з {shards} шардами")
+            results[f"shards_{shards}_rows_per_sec"] = rows / elapsed
+            results[f"shards_{shards}_speedup"] = results[f"shards_{shards}_rows_per_sec"] / results["shards_1_rows_per_sec"]
+        return results
+    finally:
+        log.set_level(previous_level)
+
+
+def _peak_rss_kb() -> int:
+    """
+        Повертає пікову резидентну пам'ять процесу (КБ): VmHWM з /proc/self/status (Linux) або ru_maxrss,
+        або 0, якщо жоден спосіб недоступний.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _reset_peak_rss() -> int:
+    """
+        Скидає пікову пам'ять процесу до поточної (Linux: запис "5" у /proc/self/clear_refs) і повертає
+        точку відліку (КБ) для заміру одного сценарію.
+
+        Де скидання недоступне, пік лише зростає, тож різниця з точкою відліку показує тільки
+        перевищення попереднього піку процесу.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")
+    except OSError:
+        pass
+    return _peak_rss_kb()
+
+
+def _measure(operation, count : int) -> dict:
+    """
+        Виконує operation(i) для i у range(count), вимірюючи кожен виклик окремо.
+
+        Повертає:
+            dict: Операцій/с (за загальним часом циклу), медіана та 99-й перцентиль часу виклику (мкс)
+            і приріст пікової пам'яті процесу за сценарій (КБ).
+    """
+    durations = array("q", bytes(8 * count))
+    baseline_rss = _reset_peak_rss()
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(count):
+        begin = clock()
+        operation(i)
+        durations[i] = clock() - begin
+    elapsed = clock() - started
+    peak_rss = _peak_rss_kb()
+    durations = sorted(durations)
+    return {
+        "ops_per_sec": count / elapsed * 1e9 if elapsed else 0.0,
+        "p50_us": durations[count // 2] / 1000,
+        "p99_us": durations[min(count - 1, count * 99 // 100)] / 1000,
+        "peak_rss_delta_kb": max(0, peak_rss - baseline_rss),
+    }
+
+
+def suite_benchmark(books : tuple = (1000, 10000, 100000), operations : int = 100000, columnar : bool = False,
+                    seed : int = 1) -> dict:
+    """
+        Набір відтворюваних замірів гарячих шляхів для порівняння версій.
+
+        Для кожного розміру книги рахунків вимірюються Bank.create_checking_account (усі рахунки книги),
+        Cheking_account.deposit та withdraw, TransferTransaction.execute на випадкових рахунках; окремо -
+        CurrencyRates.convert та Logger._write (текстовий і jsonl-формат, буферизований запис у тимчасовий файл).
+        Випадкові числа мають фіксоване зерно, а курси на час заміру беруться з StaticRateSource, без мережі.
+
+        Аргументи:
+            books (tuple, optional): Розміри книг рахунків. За замовчуванням (1000, 10000, 100000).
+            operations (int, optional): Кількість викликів у кожному сценарії. За замовчуванням 100000.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: {"meta": параметри запуску, "scenarios": {назва: {"ops_per_sec", "p50_us", "p99_us", "peak_rss_delta_kb"}}}.
+    """
+    previous_level = log.level
+    log.set_level("EXCEPTION")
+    previous = _use_suite_rates()
+    scenarios = {}
+    try:
+        for book in books:
+            rng = random.Random(seed)
+            bank = Bank("Benchmark", "Local", columnar=columnar)
+            users = [bank.add_user("Bench", f"User{i}") for i in range(max(1, book // 10))]
+            accounts = [None] * book
+            def create(i):
+                accounts[i] = bank.create_checking_account(users[i % len(users)])
+            scenarios[f"create_checking_account/{book}"] = _measure(create, book)
+
+            picks = [rng.randrange(book) for _ in range(operations)]
+            scenarios[f"deposit/{book}"] = _measure(lambda i: accounts[picks[i]].deposit(100), operations)
+            scenarios[f"withdraw/{book}"] = _measure(lambda i: accounts[picks[i]].withdraw(50), operations)
+            targets = [rng.randrange(book) for _ in range(operations)]
+            transfers = [TransferTransaction(1, accounts[picks[i]], accounts[targets[i]])
+                         for i in range(operations) if picks[i] != targets[i]]
+            scenarios[f"transfer_execute/{book}"] = _measure(lambda i: transfers[i].execute(), len(transfers))
+            bank.close()
+            del bank, users, accounts, transfers
+            gc.collect()
+
+        rng = random.Random(seed)
+        pairs = [(rng.choice(_SUITE_CURRENCIES), rng.choice(_SUITE_CURRENCIES)) for _ in range(operations)]
+        scenarios["convert"] = _measure(lambda i: currate.convert(100.0, *pairs[i]), operations)
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in ("text", "jsonl"):
+                logger = Logger(os.path.join(directory, f"{fmt}.log"), buffered=True, fmt=fmt)
+                scenarios[f"logger_write_{fmt}"] = _measure(
+                    lambda i: logger._write("INFO", "Переказ виконано", {"transaction_id": i}), operations)
+                logger.close()
+    finally:
+        _restore_rates(previous)
+        log.set_level(previous_level)
+
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "books": list(books),
+                 "operations": operations, "columnar": columnar, "seed": seed, "created": time.time()},
+        "scenarios": scenarios,
+    }
+
+
+def metrics_benchmark(operations : int = 200000) -> dict:
+    """
+        Вимірює накладні витрати метрик: час TransferTransaction.execute, CurrencyRates.convert та
+        Logger._write з вимкненим реєстром, з вимірюванням кожного виклику та кожного сотого.
+
+        Аргументи:
+            operations (int, optional): Кількість викликів у кожному замірі. За замовчуванням 200000.
+
+        Повертає:
+            dict: Час одного виклику (мкс) для кожного шляху та режиму метрик.
+    """
+    previous_level = log.level
+    enabled, sample = metrics.enabled, metrics.sample
+    log.set_level("EXCEPTION")
+    previous = _use_suite_rates()
+    results = {}
+    try:
+        bank = Bank("Benchmark", "Local")
+        user = bank.add_user("Bench", "User")
+        source, target = bank.create_checking_account(user), bank.create_checking_account(user)
+        source.deposit(3 * operations)
+        transfer = TransferTransaction(1, source, target)
+        with tempfile.TemporaryDirectory() as directory:
+            logger = Logger(os.path.join(directory, "bench.log"), buffered=True)
+            paths = {
+                "transfer_execute": transfer.execute,
+                "convert": lambda: currate.convert(100.0, "USD", "UAH"),
+                "logger_write": lambda: logger._write("INFO", "Переказ виконано"),
+            }
+            for mode, every in (("disabled", None), ("sample_1", 1), ("sample_100", 100)):
+                if every is None:
+                    metrics.disable()
+                else:
+                    metrics.enable(every)
+                for name, function in paths.items():
+                    results[f"{name}_{mode}_us"] = _per_call(function, operations)
+            logger.close()
+        bank.close()
+    finally:
+        metrics.enable(sample) if enabled else metrics.disable()
+        _restore_rates(previous)
+        log.set_level(previous_level)
+    return results
+
+
+def profile_benchmark(output : str, users : int = 1000, transactions : int = 10000, rows : int = 100000,
+                      keep : int = 10, seed : int = 1) -> str:
+    """
+        Шукає повільні фази: виконує transactions переказів через Bank.execute з увімкненим трасуванням,
+        а потім платіжний файл з rows рядків через Bank.execute_batch під cProfile та під tracemalloc.
+
+        Рівень логу не змінюється, тож запис логу входить у траси як окрема фаза.
+
+        Аргументи:
+            output (str): Каталог для звітів (traces.txt, batch.prof, batch.prof.txt, batch-memory.txt).
+            users (int, optional): Кількість користувачів (по одному чековому рахунку на кожного). За замовчуванням 1000.
+            transactions (int, optional): Кількість трасованих переказів. За замовчуванням 10000.
+            rows (int, optional): Кількість рядків платіжного файлу. За замовчуванням 100000.
+            keep (int, optional): Кількість найповільніших трас у звіті. За замовчуванням 10.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            str: Звіт про найповільніші траси.
+    """
+    os.makedirs(output, exist_ok=True)
+    rng = random.Random(seed)
+    bank = Bank("Benchmark", "Local")
+    accounts = _open_accounts(bank, users)
+    tracer.clear()
+    tracer.enable(keep)
+    try:
+        _transfer(bank, accounts, transactions, rng)
+    finally:
+        tracer.disable()
+    report = tracer.report(keep)
+    with open(os.path.join(output, "traces.txt"), "w", encoding="utf-8") as file:
+        file.write(report)
+
+    ids = [account._account_id for account in accounts]
+    payments = [("transfer", *rng.sample(ids, 2), rng.randint(1, 10), None) for _ in range(rows)]
+    profile_call(os.path.join(output, "batch.prof"), bank.execute_batch, payments)
+    trace_memory(os.path.join(output, "batch-memory.txt"), bank.execute_batch, payments)
+    bank.close()
+    return report
+
+
+def import_benchmark(modules : tuple = ("accounts", "bank"), repeat : int = 5, budget_ms : float = 20.0) -> dict:
+    """
+        Вимірює час імпорту модулів у нових процесах (python -X importtime) у порожньому тимчасовому каталозі.
+
+        Імпорт не повинен мати побічних ефектів: створювати файл логу, звертатися до мережі чи
+        імпортувати requests. Перший запуск кожного модуля не враховується (компіляція байткоду).
+
+        Аргументи:
+            modules (tuple, optional): Модулі. За замовчуванням ("accounts", "bank").
+            repeat (int, optional): Кількість вимірювань кожного модуля. За замовчуванням 5.
+            budget_ms (float, optional): Допустимий час імпорту (медіана, мс). За замовчуванням 20.
+
+        Повертає:
+            dict: Медіанний час імпорту кожного модуля (мс).
+
+        Винятки:
+            RuntimeError: Якщо імпорт має побічні ефекти або перевищує budget_ms.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for module in modules:
+            code = f"import sys, {module}; print('requests' in sys.modules)"
+            times = []
+            for attempt in range(repeat + 1):
+                completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=directory, env=env,
+                                           capture_output=True, text=True, check=True)
+                if completed.stdout.strip() != "False":
+                    failures.append(f"імпорт {module} завантажує requests")
+                if attempt:
+                    times.extend(int(line.split("|")[1]) / 1000 for line in completed.stderr.splitlines()
+                                 if line.split("|")[-1] == f" {module}")
+            results[f"{module}_import_ms"] = sorted(times)[len(times) // 2]
+            if results[f"{module}_import_ms"] > budget_ms:
+                failures.append(f"імпорт {module} триває {results[f'{module}_import_ms']:.1f} мс (бюджет {budget_ms} мс)")
+            if os.listdir(directory):
+                failures.append(f"імпорт {module} створює файли: {', '.join(os.listdir(directory))}")
+    if failures:
+        raise RuntimeError("; ".join(dict.fromkeys(failures)))
+    return results
+
+
+def compare_results(baseline : dict, current : dict, threshold : float = 0.1) -> list:
+    """
+        Порівнює результати suite_benchmark з базовими.
+
+        Сценарій вважається регресією, якщо його операцій/с менше за базові більш ніж на threshold
+        або 99-й перцентиль часу виклику більший за базовий більш ніж на threshold. Сценарій з базових
+        результатів, якого немає серед поточних, також повертається (показник "missing", поточне значення None).
+
+        Аргументи:
+            baseline (dict): Базові результати (JSON попереднього запуску).
+            current (dict): Поточні результати.
+            threshold (float, optional): Допустиме відносне погіршення. За замовчуванням 0.1 (10%).
+
+        Повертає:
+            list: Рядки (назва сценарію, показник, базове значення, поточне значення) для кожної регресії.
+    """
+    regressions = []
+    for name, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(name)
+        if after is None:
+            regressions.append((name, "missing", before["ops_per_sec"], None))
+            continue
+        if after["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+            regressions.append((name, "ops_per_sec", before["ops_per_sec"], after["ops_per_sec"]))
+        if after["p99_us"] > before["p99_us"] * (1 + threshold):
+            regressions.append((name, "p99_us", before["p99_us"], after["p99_us"]))
+    return regressions
+
+
+def stress_test(accounts : int = 50, transactions : int = 20000, threads : int = 16, columnar : bool = False,
+                journal : bool = False, seed : int = 1) -> dict:
+    """
+        Виконує випадкові перекази, складені транзакції (частина з них неможлива і має бути
+        повністю скасована) та поповнення у TransactionExecutor з багатьох потоків
+        (з частим перемиканням потоків) паралельно зі створенням нових рахунків і перевіряє, що:
+        баланси кожного рахунку збігаються з сумою успішних операцій, загальна сума збережена,
+        ID транзакцій і рахунків унікальні, а агреговані показники (Bank.stats) збігаються
+        з повним перерахунком. З journal=True також перевіряється, що банк,
+        відновлений з журналу, має ті самі баланси.
+
+        Аргументи:
+            accounts (int, optional): Кількість рахунків (мала кількість - більше конфліктів). За замовчуванням 50.
+            transactions (int, optional): Кількість транзакцій. За замовчуванням 20000.
+            threads (int, optional): Кількість потоків. За замовчуванням 16.
+            columnar (bool, optional): Використовувати колонкове сховище рахунків. За замовчуванням False.
+            journal (bool, optional): Вести журнал операцій (durable). За замовчуванням False.
+            seed (int, optional): Зерно генератора випадкових чисел. За замовчуванням 1.
+
+        Повертає:
+            dict: Кількість виконаних і відхилених транзакцій, транзакцій/с.
+
+        Винятки:
+            RuntimeError: Якщо виявлено втрачене оновлення, повторний ID або розбіжність агрегованих показників.
+    """
+    rng = random.Random(seed)
+    previous_level = log.level
+    previous_interval = sys.getswitchinterval()
+    log.set_level("EXCEPTION")
+    sys.setswitchinterval(1e-6)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stress.journal") if journal else None
+            bank = Bank("Stress", "Local", columnar=columnar, journal=path)
+            opened = _open_accounts(bank, accounts)
+            expected = {account._account_id: account._balance._minor for account in opened}
+            total = sum(expected.values())
+
+            batch = []
+            for _ in range(transactions):
+                choice = rng.random()
+                if choice < 0.7:
+                    source, target = rng.sample(opened, 2)
+                    batch.append(TransferTransaction(rng.randint(1, 10), source, target))
+                elif choice < 0.9:
+                    legs = [(rng.randint(1, 10), *rng.sample(opened, 2)) for _ in range(3)]
+                    if rng.random() < 0.3:
+                        legs.append((10 ** 6, *rng.sample(opened, 2)))
+                    batch.append(CompositeTransaction(legs))
+                else:
+                    batch.append(DepositTransaction(rng.randint(1, 10), rng.choice(opened)))
+
+            created = []
+
+            def create_accounts():
+                user = bank.add_user("Stress", "Creator")
+                for _ in range(200):
+                    created.append(bank.create_checking_account(user)._account_id)
+
+            creators = [threading.Thread(target=create_accounts) for _ in range(4)]
+            started = time.perf_counter()
+            for creator in creators:
+                creator.start()
+            with TransactionExecutor(bank, threads) as executor:
+                results = executor.run(batch)
+            for creator in creators:
+                creator.join()
+            elapsed = time.perf_counter() - started
+
+            failed = 0
+            for result in results:
+                if isinstance(result, Exception):
+                    failed += 1
+                    continue
+                for record in (result if isinstance(result, list) else (result,)):
+                    if record.source_id is not None:
+                        expected[record.source_id] -= record.amount
+                    else:
+                        total += record.amount
+                    expected[record.target_id] += record.amount
+
+            actual = {account_id: bank.get_account(account_id)._balance._minor for account_id in expected}
+            if actual != expected or sum(actual.values()) != total:
+                lost = {account_id: (expected[account_id], actual[account_id])
+                        for account_id in expected if actual[account_id] != expected[account_id]}
+                raise RuntimeError(f"Втрачені оновлення балансів: {lost}")
+
+            ids = [record.transaction_id for record in bank.transactions()]
+            if len(set(ids)) != len(ids) or len(set(created)) != len(created) or set(created) & set(expected):
+                raise RuntimeError("Виявлено повторні ID транзакцій або рахунків")
+            if bank.check_stats():
+                raise RuntimeError("Агреговані показники банку не збігаються з перерахунком")
+            bank.close()
+
+            if journal:
+                restored = Bank("Stress", "Local", columnar=columnar, journal=path)
+                restored.close()
+                if {account_id: restored.get_account(account_id)._balance._minor for account_id in expected} != actual:
+                    raise RuntimeError("Стан відновленого з журналу банку не збігається з початковим")
+
+            return {
+                "executed": transactions - failed,
+                "rejected": failed,
+                "accounts_created": len(created),
+                "transactions_per_sec": transactions / elapsed,
+            }
+    finally:
+        sys.setswitchinterval(previous_interval)
+        log.set_level(previous_level)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Заміри продуктивності банківської системи")
+    commands = parser.add_subparsers(dest="command", required=True)
+    memory = commands.add_parser("memory", help="пам'ять на об'єкт до та після __slots__")
+    memory.add_argument("--count", type=int, default=10000)
+    journal = commands.add_parser("journal", help="запис журналу та відновлення банку з нього")
+    journal.add_argument("--users", type=int, default=1000)
+    journal.add_argument("--transactions", type=int, default=100000)
+    journal.add_argument("--durable", action="store_true", help="чекати fsync для кожної транзакції")
+    snapshot = commands.add_parser("snapshot", help="запуск банку зі знімка та хвоста журналу")
+    snapshot.add_argument("--users", type=int, default=100000)
+    snapshot.add_argument("--transactions", type=int, default=100000)
+    snapshot.add_argument("--tail", type=int, default=1000)
+    snapshot.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    stress = commands.add_parser("stress", help="перевірка паралельного виконання транзакцій")
+    stress.add_argument("--accounts", type=int, default=50)
+    stress.add_argument("--transactions", type=int, default=20000)
+    stress.add_argument("--threads", type=int, default=16)
+    stress.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    stress.add_argument("--journal", action="store_true", help="вести durable журнал операцій")
+    batch = commands.add_parser("batch", help="пакетне виконання платіжного файлу")
+    batch.add_argument("--users", type=int, default=1000)
+    batch.add_argument("--rows", type=int, default=100000)
+    batch.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    batch.add_argument("--journal", action="store_true", help="вести журнал операцій")
+    bulk = commands.add_parser("bulk", help="пакетне створення користувачів і рахунків")
+    bulk.add_argument("--users", type=int, default=100000)
+    bulk.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    bulk.add_argument("--journal", action="store_true", help="вести журнал операцій")
+    bulk.add_argument("--durable", action="store_true", help="чекати fsync журналу для кожного виклику")
+    query = commands.add_parser("query", help="пошук через вторинні індекси та перебором")
+    query.add_argument("--users", type=int, default=100000)
+    query.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    stats = commands.add_parser("stats", help="агреговані показники банку інкрементно та перебором")
+    stats.add_argument("--users", type=int, default=100000)
+    stats.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    shards = commands.add_parser("shards", help="масштабування шардованого банку за кількістю процесів")
+    shards.add_argument("--max-shards", type=int, default=None)
+    shards.add_argument("--accounts", type=int, default=1000, help="рахунків на шард")
+    shards.add_argument("--rows", type=int, default=200000)
+    shards.add_argument("--cross", type=float, default=0.01, help="частка переказів між шардами")
+    history = commands.add_parser("history", help="запит історії рахунку при зростанні кількості транзакцій")
+    history.add_argument("--accounts", type=int, default=1000)
+    history.add_argument("--transactions", type=int, default=1000000)
+    history.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    suite = commands.add_parser("suite", help="набір замірів гарячих шляхів з результатами у JSON")
+    suite.add_argument("--books", default="1000,10000,100000", help="розміри книг рахунків через кому")
+    suite.add_argument("--operations", type=int, default=100000)
+    suite.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    suite.add_argument("--seed", type=int, default=1)
+    suite.add_argument("--output", help="файл для результатів у форматі JSON")
+    metrics_parser = commands.add_parser("metrics", help="накладні витрати метрик на гарячих шляхах")
+    metrics_parser.add_argument("--operations", type=int, default=200000)
+    profile = commands.add_parser("profile", help="трасування повільних транзакцій та профілювання пакета")
+    profile.add_argument("--users", type=int, default=1000)
+    profile.add_argument("--transactions", type=int, default=10000)
+    profile.add_argument("--rows", type=int, default=100000)
+    profile.add_argument("--keep", type=int, default=10, help="кількість найповільніших трас")
+    profile.add_argument("--output", default="profile", help="каталог для звітів")
+    imports = commands.add_parser("imports", help="час імпорту модулів та відсутність побічних ефектів")
+    imports.add_argument("--modules", default="accounts,bank", help="модулі через кому")
+    imports.add_argument("--repeat", type=int, default=5)
+    imports.add_argument("--budget-ms", type=float, default=20.0, help="допустимий час імпорту (медіана)")
+    compare = commands.add_parser("compare", help="порівняння результатів suite з базовими")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.1, help="допустиме відносне погіршення")
+    args = parser.parse_args(argv)
+
+    if args.command == "memory":
+        print(f"{'object':<22}{'__dict__, B':>14}{'__slots__, B':>14}{'saved':>8}")
+        for name, sizes in memory_benchmark(args.count).items():
+            saved = 1 - sizes["slots"] / sizes["dict"]
+            print(f"{name:<22}{sizes['dict']:>14.1f}{sizes['slots']:>14.1f}{saved:>8.0%}")
+    elif args.command == "journal":
+        for name, value in journal_benchmark(args.users, args.transactions, args.durable).items():
+            print(f"{name:<24}{value:>18,.3f}")
+    elif args.command == "snapshot":
+        results = snapshot_benchmark(args.users, args.transactions, args.tail, args.columnar)
+        for name, value in results.items():
+            print(f"{name:<24}{value:>18,.3f}")
+    elif args.command == "stress":
+        results = stress_test(args.accounts, args.transactions, args.threads, args.columnar, args.journal)
+        for name, value in results.items():
+            print(f"{name:<24}{value:>18,.3f}")
+        print("OK: втрачених оновлень і повторних ID не виявлено")
+    elif args.command == "batch":
+        results = batch_benchmark(args.users, args.rows, args.columnar, args.journal)
+        for name, value in results.items():
+            print(f"{name:<24}{value:>18,.3f}")
+    elif args.command == "bulk":
+        for name, value in bulk_benchmark(args.users, args.columnar, args.journal, args.durable).items():
+            print(f"{name:<24}{value:>18,.3f}")
+    elif args.command == "query":
+        for name, value in query_benchmark(args.users, args.columnar).items():
+            print(f"{name:<28}{value:>14,.3f}")
+    elif args.command == "stats":
+        for name, value in stats_benchmark(args.users, args.columnar).items():
+            print(f"{name:<28}{value:>14,.3f}")
+    elif args.command == "shards":
+        for name, value in shards_benchmark(args.max_shards, args.accounts, args.rows, args.cross).items():
+            print(f"{name:<28}{value:>14,.3f}")
+    elif args.command == "history":
+        for name, value in history_benchmark(args.accounts, args.transactions, args.columnar).items():
+            print(f"{name:<28}{value:>14,.3f}")
+    elif args.command == "suite":
+        books = tuple(int(book) for book in args.books.split(","))
+        results = suite_benchmark(books, args.operations, args.columnar, args.seed)
+        print(f"{'scenario':<36}{'ops/s':>14}{'p50, us':>10}{'p99, us':>10}{'RSS +KB':>12}")
+        for name, values in results["scenarios"].items():
+            print(f"{name:<36}{values['ops_per_sec']:>14,.0f}{values['p50_us']:>10.2f}{values['p99_us']:>10.2f}"
+                  f"{values['peak_rss_delta_kb']:>12,}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+    elif args.command == "metrics":
+        for name, value in metrics_benchmark(args.operations).items():
+            print(f"{name:<36}{value:>10,.3f}")
+    elif args.command == "profile":
+        print(profile_benchmark(args.output, args.users, args.transactions, args.rows, args.keep), end="")
+        print(f"Звіти cProfile та tracemalloc записано у {args.output}")
+    elif args.command == "imports":
+        for name, value in import_benchmark(tuple(args.modules.split(",")), args.repeat, args.budget_ms).items():
+            print(f"{name:<28}{value:>14,.3f}")
+        print(f"OK: імпорт у межах {args.budget_ms} мс без побічних ефектів")
+    elif args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        with open(args.current, encoding="utf-8") as file:
+            current = json.load(file)
+        regressions = compare_results(baseline, current, args.threshold)
+        for name, metric, before, after in regressions:
+            if after is None:
+                print(f"REGRESSION {name:<36}{metric:<12}сценарій відсутній у поточних результатах")
+            else:
+                print(f"REGRESSION {name:<36}{metric:<12}{before:>14,.2f} -> {after:,.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"OK: регресій понад {args.threshold:.0%} не виявлено")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import os
+import threading
+from logger import log
+
+"""
+Модуль concurrency містить засоби для безпечного паралельного виконання транзакцій.
+
+Класи:
+- IdAllocator: Потокобезпечний генератор зростаючих ID.
+- AccountLocks: Блокування рахунків, що завжди захоплюються у порядку зростання ID.
+- TransactionExecutor: Виконує транзакції у пулі потоків.
+
+Об'єкти:
+- account_locks: Спільна таблиця блокувань рахунків, яку використовують транзакції та банк.
+"""
+
+
+class IdAllocator:
+    """
+        Потокобезпечний генератор зростаючих ID.
+
+        За замовчуванням ID послідовні; після stride генератор видає лише ID з заданою остачею
+        від ділення на крок, тож кілька процесів (шардів) можуть видавати ID без перетинів.
+
+        Методи:
+        - next: Повертає наступний ID.
+        - reserve: Резервує діапазон ID.
+        - advance: Гарантує, що наступні ID будуть більшими за вже використаний.
+        - peek: Повертає ID, який буде видано наступним.
+        - stride: Задає крок та остачу ID.
+    """
+    __slots__ = ("_next", "_step", "_lock")
+
+    def __init__(self, start : int = 1) -> None:
+        """
+            Ініціалізує генератор.
+
+            Аргументи:
+                start (int, optional): Перший ID. За замовчуванням 1.
+        """
+        self._next = start
+        self._step = 1
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        """
+            Повертає наступний ID.
+
+            Повертає:
+                int: Новий ID.
+        """
+        with self._lock:
+            value = self._next
+            self._next = value + self._step
+        return value
+
+    def reserve(self, count : int) -> range:
+        """
+            Резервує count наступних ID однією операцією.
+
+            Аргументи:
+                count (int): Кількість ID.
+
+            Повертає:
+                range: Зарезервовані ID (з кроком генератора).
+        """
+        with self._lock:
+            start = self._next
+            self._next = start + count * self._step
+        return range(start, self._next, self._step)
+
+    def advance(self, used_id : int):
+        """
+            Гарантує, що наступні ID будуть більшими за used_id.
+
+            Аргументи:
+                used_id (int): Вже використаний ID.
+        """
+        with self._lock:
+            if used_id >= self._next:
+                self._next = used_id + 1 + (self._next - used_id - 1) % self._step
+
+    def peek(self) -> int:
+        """Повертає ID, який буде видано наступним."""
+        return self._next
+
+    def stride(self, step : int, offset : int):
+        """
+            Задає крок ID: далі видаються лише ID, що дають остачу offset від ділення на step.
+
+            Аргументи:
+                step (int): Крок (наприклад, кількість шардів).
+                offset (int): Остача (наприклад, номер шарда), 0 <= offset < step.
+
+            Винятки:
+                ValueError: Якщо step не є додатним або offset поза межами [0, step).
+        """
+        if not isinstance(step, int) or not isinstance(offset, int) or step < 1 or not 0 <= offset < step:
+            e = ValueError(f"Неможливий крок ID {step} з остачею {offset}")
+            log.exception("Неможливо змінити крок ID", e)
+            raise e
+        with self._lock:
+            self._step = step
+            self._next += (offset - self._next) % step
+
+
+class _HeldLocks:
+    """Контекстний менеджер, що захоплює блокування у заданому порядку та звільняє у зворотному."""
+    __slots__ = ("_locks",)
+
+    def __init__(self, locks : list) -> None:
+        self._locks = locks
+
+    def __enter__(self):
+        for lock in self._locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for lock in reversed(self._locks):
+            lock.release()
+        return False
+
+
+class AccountLocks:
+    """
+        Блокування рахунків.
+
+        Блокування розділені на фіксовану кількість смуг (stripes): рахунок блокується реентерабельним
+        блокуванням смуги account_id % stripes, тож пам'ять не зростає з кількістю рахунків, а блокування
+        працює і для представлень колонкового сховища. Смуги кількох рахунків (без повторів) завжди
+        захоплюються у порядку зростання номера, тому дві транзакції не можуть взаємно заблокуватися.
+
+        Методи:
+        - hold: Повертає контекстний менеджер, що блокує вказані рахунки.
+        - lock_for: Повертає блокування смуги рахунку за ID.
+    """
+
+    def __init__(self, stripes : int = 1024) -> None:
+        """
+            Створює блокування смуг.
+
+            Аргументи:
+                stripes (int, optional): Кількість смуг. За замовчуванням 1024.
+
+            Винятки:
+                ValueError: Якщо stripes не є додатним цілим числом.
+        """
+        if not isinstance(stripes, int) or stripes < 1:
+            e = ValueError(f"stripes повинно бути додатним цілим числом, а не {stripes!r}")
+            log.exception("Неможливо створити блокування рахунків", e)
+            raise e
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+
+    def lock_for(self, account_id : int) -> threading.RLock:
+        """
+            Повертає блокування смуги рахунку.
+
+            Аргументи:
+                account_id (int): ID рахунку.
+
+            Повертає:
+                threading.RLock: Блокування смуги account_id % stripes.
+        """
+        return self._locks[account_id % len(self._locks)]
+
+    def hold(self, *accounts) -> _HeldLocks:
+        """
+            Повертає контекстний менеджер, що блокує смуги вказаних рахунків у порядку зростання номера смуги.
+
+            Аргументи:
+                *accounts: Рахунки (None ігноруються, рахунки однієї смуги блокуються один раз).
+
+            Повертає:
+                _HeldLocks: Контекстний менеджер для with.
+        """
+        locks = self._locks
+        stripes = sorted({account._account_id % len(locks) for account in accounts if account is not None})
+        return _HeldLocks([locks[stripe] for stripe in stripes])
+
+
+account_locks = AccountLocks()
+
+
+class TransactionExecutor:
+    """
+        Виконує транзакції у пулі потоків.
+
+        Транзакції, що не мають спільних рахунків, виконуються паралельно; транзакції зі
+        спільними рахунками серіалізуються блокуваннями рахунків, але порядок їх виконання
+        не гарантується (для залежних транзакцій слід чекати на результат попередньої).
+        Якщо вказано банк, транзакції виконуються через Bank.execute (з історією та журналом),
+        тож очікування фіксації журналу різними потоками об'єднується в спільні fsync.
+
+        Методи:
+        - submit: Надсилає транзакцію на виконання.
+        - run: Виконує набір транзакцій та повертає результати.
+        - shutdown: Зупиняє пул потоків.
+    """
+
+    def __init__(self, bank = None, workers : int = None) -> None:
+        """
+            Ініціалізує пул потоків.
+
+            Аргументи:
+                bank (Bank, optional): Банк, через який виконуються транзакції. За замовчуванням None.
+                workers (int, optional): Кількість потоків. За замовчуванням - кількість процесорів.
+
+            Винятки:
+                ValueError: Якщо workers не є додатним цілим числом.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if not isinstance(workers, int) or workers < 1:
+            e = ValueError(f"workers повинно бути додатним цілим числом, а не {workers!r}")
+            log.exception("Неможливо створити пул транзакцій", e)
+            raise e
+
+        # concurrent.futures імпортується лише при створенні пулу, а не під час імпорту модуля.
+        from concurrent.futures import ThreadPoolExecutor
+        self._bank = bank
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transaction")
+
+    def _run_one(self, transaction):
+        """Виконує одну транзакцію (у потоці пулу)."""
+        if self._bank is not None:
+            return self._bank.execute(transaction)
+        return transaction.execute()
+
+    def submit(self, transaction):
+        """
+            Надсилає транзакцію на виконання.
+
+            Аргументи:
+                transaction (Transaction): Транзакція.
+
+            Повертає:
+                concurrent.futures.Future: Результат Bank.execute (або Transaction.execute без банку).
+        """
+        return self._pool.submit(self._run_one, transaction)
+
+    def run(self, transactions) -> list:
+        """
+            Виконує набір транзакцій та чекає на завершення всіх.
+
+            Аргументи:
+                transactions (iterable): Транзакції.
+
+            Повертає:
+                list: Для кожної транзакції - результат виконання або виняток, якщо вона завершилась помилкою.
+        """
+        futures = [self.submit(transaction) for transaction in transactions]
+        results = []
+        for future in futures:
+            error = future.exception()
+            results.append(error if error is not None else future.result())
+        return results
+
+    def shutdown(self, wait : bool = True):
+        """
+            Зупиняє пул потоків.
+
+            Аргументи:
+                wait (bool, optional): Дочекатися завершення надісланих транзакцій. За замовчуванням True.
+        """
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.shutdown()
+        return False
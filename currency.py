@@ -1,52 +1,398 @@
-import requests
-import datetime
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from array import array
 from logger import log
+from metrics import metrics
 
 """
-Модуль currency містить клас для роботи з курсами валют.
+Модуль currency містить класи для роботи з курсами валют.
 
 Класи:
+- RateSource: Базовий клас джерела курсів валют.
+- HttpRateSource: Джерело курсів з API ПриватБанку.
+- FileRateSource: Джерело курсів з локального JSON або CSV файлу.
+- StaticRateSource: Джерело курсів з пам'яті (для тестів та офлайн-роботи).
 - CurrencyRates: Клас для отримання та конвертації валютних курсів.
 """
 
+_refreshes = metrics.counter("bank_rates_refreshes_total", "Завантаження курсів валют з джерела")
+_refresh_errors = metrics.counter("bank_rates_refresh_errors_total", "Невдалі завантаження курсів валют")
+_refresh_seconds = metrics.histogram("bank_rates_refresh_seconds", "Час завантаження курсів валют з джерела")
+_refreshed_at = metrics.gauge("bank_rates_updated_timestamp_seconds", "Час останнього успішного оновлення курсів")
+_background_refreshes = metrics.counter("bank_rates_background_refreshes_total",
+                                        "Фонові оновлення застарілих курсів (update_rates)")
+
+class RateSource:
+    """
+    Базовий клас джерела курсів валют.
+
+    Методи:
+    - fetch: Повертає курси у форматі {валюта: {'buy': float, 'sale': float}} відносно гривні.
+    """
+
+    def fetch(self) -> dict:
+        """
+        Отримує актуальні курси валют.
+
+        Повертає:
+            dict: Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _parse_items(items) -> dict:
+        """
+        Перетворює записи у форматі ПриватБанку (ccy, buy, sale) у словник курсів.
+
+        Аргументи:
+            items (iterable): Записи зі значеннями ccy, buy, sale.
+
+        Повертає:
+            dict: Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+        """
+        return {item['ccy']: {'buy': float(item['buy']), 'sale': float(item['sale'])} for item in items}
+
+
+class HttpRateSource(RateSource):
+    """
+    Джерело курсів з API ПриватБанку.
+
+    Атрибути:
+    - url: Адреса API.
+    - timeout: Тайм-аут запиту (у секундах).
+    """
+
+    def __init__(self, url : str = 'https://api.privatbank.ua/p24api/pubinfo?json&exchange&coursid=5',
+                 timeout : float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self) -> dict:
+        # requests імпортується лише при першому запиті, а не під час імпорту модуля.
+        import requests
+        response = requests.get(self.url, timeout=self.timeout)
+        return self._parse_items(response.json())
+
+
+class FileRateSource(RateSource):
+    """
+    Джерело курсів з локального файлу.
+
+    Підтримуються JSON (список записів ПриватБанку або словник {валюта: {'buy', 'sale'}})
+    та CSV з колонками ccy, buy, sale.
+
+    Атрибути:
+    - path: Шлях до файлу.
+    """
+
+    def __init__(self, path : str):
+        if not isinstance(path, str):
+            raise TypeError("path повинен бути рядком")
+        self.path = path
+
+    def fetch(self) -> dict:
+        with open(self.path, newline="", encoding="utf-8") as file:
+            if self.path.lower().endswith(".csv"):
+                return self._parse_items(csv.DictReader(file))
+            data = json.load(file)
+        if isinstance(data, dict):
+            return {ccy: {'buy': float(rate['buy']), 'sale': float(rate['sale'])} for ccy, rate in data.items()}
+        return self._parse_items(data)
+
+
+class StaticRateSource(RateSource):
+    """
+    Джерело курсів з пам'яті.
+
+    Атрибути:
+    - rates: Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+    """
+
+    def __init__(self, rates : dict):
+        if not isinstance(rates, dict):
+            raise TypeError("rates повинен бути словником")
+        self.rates = {ccy: dict(rate) for ccy, rate in rates.items()}
+
+    def fetch(self) -> dict:
+        return {ccy: dict(rate) for ccy, rate in self.rates.items()}
+
+
+def _default_source() -> RateSource:
+    """
+    Повертає джерело курсів за замовчуванням.
+
+    Якщо задано змінну середовища BANKSYSTEM_RATES_FILE, курси читаються з цього файлу,
+    інакше - з API ПриватБанку.
+    """
+    path = os.environ.get("BANKSYSTEM_RATES_FILE")
+    if path:
+        return FileRateSource(path)
+    return HttpRateSource()
+
+
 class CurrencyRates:
     """
     Клас для роботи з курсами валют.
 
+    Курси завантажуються при першому зверненні (конвертації чи читанні rates), а не під час
+    створення об'єкта, тож імпорт модуля не звертається до мережі. Курси кешуються на ttl секунд. Після завершення ttl convert продовжує використовувати
+    збережені курси, а оновлення виконується у фоновому потоці (stale-while-revalidate),
+    тому конвертація не чекає на мережу.
+
+    При кожній зміні курсів будується таблиця крос-курсів N×N для всіх підтримуваних валют,
+    тож конвертація зводиться до одного пошуку в таблиці та одного множення.
+
+    Атрибути класу:
+    - _suported_currency: Список підтримуваних валют.
+
     Атрибути:
-    - rates: Словник з курсами валют.
-    - _last_usage: Час останнього оновлення курсів.
+    - rates: Словник з курсами валют (присвоєння перебудовує таблицю крос-курсів).
+    - source: Джерело курсів (RateSource).
+    - ttl: Час актуальності курсів (у секундах).
+    - retry: Затримка (у секундах) перед повторним фоновим оновленням після помилки; подвоюється
+      з кожною наступною помилкою поспіль, але не перевищує ttl.
+    - _last_usage: Момент (time.monotonic) останнього успішного оновлення курсів.
+    - _failed_at: Момент (time.monotonic) останньої невдалої спроби завантаження або None.
+    - _failures: Кількість невдалих спроб завантаження поспіль.
+    - _load_attempted: Чи запущено (або не потрібне) перше завантаження курсів.
+    - _cross: Таблиця крос-курсів {(з валюти, у валюту): множник}.
 
     Методи:
-    - __init__: Ініціалізує об'єкт та оновлює курси.
-    - update_rates: Оновлює курси валют через API.
+    - __init__: Ініціалізує об'єкт (без завантаження курсів).
+    - set_source: Змінює джерело курсів.
+    - refresh: Синхронно завантажує курси з джерела.
+    - preload: Синхронно завантажує курси, якщо їх ще немає (для коду запуску).
+    - update_rates: Запускає фонове оновлення, якщо курси застаріли.
+    - cross_rate: Повертає множник конвертації між двома валютами.
     - convert: Конвертує суму з однієї валюти в іншу.
+    - convert_many: Конвертує масив сум за один виклик.
     """
+    _suported_currency = ("UAH", "USD", "EUR")
+
+    def __init__(self, source : RateSource = None, ttl : float = 3600, retry : float = 30):
+        """
+        Ініціалізує об'єкт CurrencyRates. Курси завантажуються у фоні при першому зверненні до них
+        або синхронно - викликом preload().
+
+        Аргументи:
+            source (RateSource, optional): Джерело курсів. За замовчуванням - файл з BANKSYSTEM_RATES_FILE або API ПриватБанку.
+            ttl (float, optional): Час актуальності курсів у секундах. За замовчуванням 3600.
+            retry (float, optional): Затримка перед повторним фоновим оновленням після помилки у секундах. За замовчуванням 30.
+
+        Винятки:
+            TypeError: Якщо source не є RateSource, ttl або retry не є числом.
+            ValueError: Якщо ttl або retry не додатні.
+        """
+        if source is not None and not isinstance(source, RateSource):
+            raise TypeError("source повинен бути об'єктом RateSource")
+        if not isinstance(ttl, (int, float)) or not isinstance(retry, (int, float)):
+            raise TypeError("ttl та retry повинні бути числами")
+        if ttl <= 0:
+            raise ValueError("ttl повинен бути додатним числом")
+        if retry <= 0:
+            raise ValueError("retry повинен бути додатним числом")
+
+        self._rates = {}
+        self._cross = {}
+        self.source = source if source is not None else _default_source()
+        self.ttl = ttl
+        self.retry = retry
+        self._last_usage = None
+        self._failed_at = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._load_attempted = False
+        self._refreshing = False
 
-    def __init__(self):
+    def _ensure_loaded(self):
         """
-        Ініціалізує об'єкт CurrencyRates та оновлює курси валют.
+        Запускає перше завантаження курсів у фоні (update_rates) при першому зверненні до них.
+
+        Звернення не чекає на джерело: поки курсів немає, конвертація одразу завершується помилкою
+        "Курси валют ще не завантажено". Щоб курси були з першої операції, код запуску викликає preload().
         """
-        self.rates = {}
+        with self._load_lock:
+            if self._load_attempted:
+                return
+            self._load_attempted = True
         self.update_rates()
-        self._last_usage = datetime.datetime.now()
+
+    def preload(self):
+        """
+        Синхронно завантажує курси з джерела, якщо їх ще не завантажено.
+
+        Призначено для коду запуску (до перших конвертацій); вже завантажені курси не перечитуються.
+
+        Винятки:
+            Exception: Помилка завантаження курсів з джерела.
+        """
+        with self._load_lock:
+            self._load_attempted = True
+            if self._last_usage is None:
+                self.refresh()
+
+    @property
+    def rates(self) -> dict:
+        """Словник з курсами валют (перше звернення запускає завантаження у фоні й не чекає на нього, див. _ensure_loaded)."""
+        if not self._load_attempted:
+            self._ensure_loaded()
+        return self._rates
+
+    @rates.setter
+    def rates(self, rates : dict):
+        # Присвоєння курсів вважається їх оновленням: без нього перша конвертація замінила б їх курсами з джерела.
+        self._rates = rates
+        self._cross = self._build_cross(rates)
+        self._last_usage = time.monotonic()
+        self._load_attempted = True
+
+    @classmethod
+    def _build_cross(cls, rates : dict) -> dict:
+        """
+        Будує таблицю крос-курсів для всіх пар підтримуваних валют.
+
+        Пари, для яких немає курсу, до таблиці не потрапляють.
+
+        Аргументи:
+            rates (dict): Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+
+        Повертає:
+            dict: Таблиця {(з валюти, у валюту): множник}.
+        """
+        sale = {"UAH": 1.0}
+        buy = {"UAH": 1.0}
+        for ccy in cls._suported_currency:
+            if ccy in rates:
+                sale[ccy] = rates[ccy]['sale']
+                buy[ccy] = rates[ccy]['buy']
+
+        cross = {}
+        for fr in cls._suported_currency:
+            for to in cls._suported_currency:
+                if fr == to:
+                    cross[fr, to] = 1
+                elif fr in sale and to in buy:
+                    cross[fr, to] = sale[fr] / buy[to]
+        return cross
+
+    def set_source(self, source : RateSource):
+        """
+        Змінює джерело курсів та одразу завантажує з нього курси.
+
+        Аргументи:
+            source (RateSource): Нове джерело курсів.
+
+        Винятки:
+            TypeError: Якщо source не є RateSource.
+        """
+        if not isinstance(source, RateSource):
+            raise TypeError("source повинен бути об'єктом RateSource")
+        self.source = source
+        self.refresh()
+
+    @metrics.timed(_refresh_seconds, _refreshes, _refresh_errors)
+    def refresh(self):
+        """
+        Синхронно завантажує курси з джерела та замінює ними поточні.
+
+        Кількість завантажень, помилок і час завантаження записуються у метрики bank_rates_* (див. metrics.py),
+        а момент невдалої спроби - у _failed_at (для затримки наступного фонового оновлення).
+        """
+        try:
+            rates = self.source.fetch()
+        except Exception:
+            self._failures += 1
+            self._failed_at = time.monotonic()
+            raise
+        self._failures = 0
+        self._failed_at = None
+        self.rates = rates
+        _refreshed_at.set(time.time())
+
+    def _due(self) -> bool:
+        """
+        Перевіряє, чи потрібне фонове оновлення курсів.
+
+        Повертає:
+            bool: True, якщо курси застаріли і після останньої невдалої спроби минула затримка
+            retry * 2 ** (кількість помилок поспіль - 1), але не більше ttl.
+        """
+        now = time.monotonic()
+        if self._last_usage is not None and now - self._last_usage < self.ttl:
+            return False
+        failed_at = self._failed_at
+        return failed_at is None or now - failed_at >= min(self.retry * 2 ** (self._failures - 1), self.ttl)
+
+    def _refresh_in_background(self):
+        """Оновлює курси у фоновому потоці, зберігаючи старі курси у разі помилки."""
+        try:
+            self.refresh()
+        except Exception as e:
+            log.exception("Не вдалося оновити курси валют", e)
+        finally:
+            self._refreshing = False
 
     def update_rates(self):
         """
-        Оновлює курси валют через API ПриватБанку.
+        Оновлює курси валют, якщо вони застаріли.
+
+        Оновлення виконується у фоновому потоці, одночасно не більше одного. Після невдалої
+        спроби наступна запускається не раніше ніж через затримку (див. _due).
+        """
+        if not self._due():
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        _background_refreshes.inc()
+        threading.Thread(target=self._refresh_in_background, name="currency-refresh", daemon=True).start()
+
+    def _unknown_pair(self, from_currency, to_currency):
+        """
+        Формує виняток для пари валют, якої немає в таблиці крос-курсів.
 
-        Оновлює дані кожну годину.
+        Повертає:
+            Exception: Виняток (вже записаний у лог).
         """
-        now = datetime.datetime.now()
-        if now - self._last_usage > datetime.timedelta(hours=1):
-            url = 'https://api.privatbank.ua/p24api/pubinfo?json&exchange&coursid=5'
-            response = requests.get(url)
-            data = response.json()
-            for item in data:
-                self.rates[item['ccy']] = {
-                    'buy': float(item['buy']),
-                    'sale': float(item['sale'])
-                }
+        if from_currency not in self._suported_currency:
+            e = Exception(f"from_currency : {from_currency} - невідоме значення")
+            log.exception("Невідома стартова валюта", e)
+        elif to_currency not in self._suported_currency:
+            e = Exception(f"to_currency : {to_currency} - невідоме значення")
+            log.exception("Невідома стартова валюта", e)
+        else:
+            e = Exception("Курси валют ще не завантажено")
+            log.exception("Конвертація неможлива", e)
+        return e
+
+    def cross_rate(self, from_currency, to_currency):
+        """
+        Повертає множник конвертації між двома валютами.
+
+        Аргументи:
+            from_currency (str): Валюта, з якої конвертуємо.
+            to_currency (str): Валюта, в яку конвертуємо.
+
+        Повертає:
+            float: Множник, на який потрібно помножити суму.
+
+        Винятки:
+            Exception: Якщо валюта не підтримується або курси ще не завантажено.
+        """
+        if not self._load_attempted:
+            self._ensure_loaded()
+        if self._last_usage is None or time.monotonic() - self._last_usage >= self.ttl:
+            self.update_rates()
+        try:
+            return self._cross[from_currency, to_currency]
+        except KeyError:
+            raise self._unknown_pair(from_currency, to_currency) from None
 
     def convert(self, amount, from_currency, to_currency):
         """
@@ -61,24 +407,37 @@ class CurrencyRates:
             float: Конвертована сума.
 
         Винятки:
-            Exception: Якщо валюта не підтримується.
+            Exception: Якщо валюта не підтримується або курси ще не завантажено.
         """
-        if from_currency not in ["UAH", "USD", "EUR"]:
-            e = Exception(f"from_currency : {from_currency} - невідоме значення")
-            log.exception("Невідома стартова валюта", e)
-            raise e
-        if to_currency not in ["UAH", "USD", "EUR"]:
-            e = Exception(f"to_currency : {to_currency} - невідоме значення")
-            log.exception("Невідома стартова валюта", e)
-            raise e
+        return amount * self.cross_rate(from_currency, to_currency)
 
-        self.update_rates()
-        if from_currency == to_currency:
-            return amount
-        if from_currency != 'UAH':
-            amount = amount * self.rates[from_currency]['sale']
-        if to_currency != 'UAH':
-            amount = amount / self.rates[to_currency]['buy']
-        return amount
-
-currate = CurrencyRates()
\ No newline at end of file
+    def convert_many(self, amounts, from_currency, to_currency):
+        """
+        Конвертує масив сум з однієї валюти в іншу за один виклик.
+
+        Крос-курс визначається один раз. Векторне множення - лише для numpy.ndarray; array та інші
+        ітеровані об'єкти множаться поелементно одним проходом на Python (генератор списку швидший
+        за map з operator.mul).
+
+        Аргументи:
+            amounts (numpy.ndarray, array, list): Суми для конвертації.
+            from_currency (str): Валюта, з якої конвертуємо.
+            to_currency (str): Валюта, в яку конвертуємо.
+
+        Повертає:
+            numpy.ndarray, array, list: Конвертовані суми того ж типу контейнера
+            (для array - array('d')).
+
+        Винятки:
+            Exception: Якщо валюта не підтримується або курси ще не завантажено.
+        """
+        factor = self.cross_rate(from_currency, to_currency)
+        # numpy.ndarray можливий лише якщо NumPy вже імпортовано, тож модуль не імпортує його сам.
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(amounts, numpy.ndarray):
+            return amounts * factor
+        if isinstance(amounts, array):
+            return array('d', [amount * factor for amount in amounts])
+        return [amount * factor for amount in amounts]
+
+currate = CurrencyRates()
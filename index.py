@@ -0,0 +1,281 @@
+from array import array
+from bisect import bisect_left
+from accounts import observe_blocking, register_history
+
+"""
+Модуль index містить вторинні індекси банку для пошуку користувачів і рахунків без перебору.
+
+Класи:
+- BankIndex: Хеш-індекси користувачів за email і телефоном та індекси-множини рахунків за типом, валютою і блокуванням.
+- HistoryIndex: Історія транзакцій кожного рахунку з пошуком за часом та посторінковим читанням.
+"""
+
+
+def _add(index : dict, key, value):
+    """Додає value до множини index[key]."""
+    if key is not None:
+        bucket = index.get(key)
+        if bucket is None:
+            bucket = index[key] = set()
+        bucket.add(value)
+
+
+class BankIndex:
+    """
+        Вторинні індекси банку.
+
+        Індекси оновлюються інкрементно: під час додавання користувачів і рахунків та при зміні
+        статусу блокування рахунку (індекс підписаний на block_account та unblock_account,
+        тож враховує і прямі виклики цих методів, і закриття рахунку банком).
+
+        Методи:
+        - add_user: Додає користувача до індексів.
+        - add_account: Додає рахунок до індексів.
+        - add_states: Додає пакет нових рахунків до індексів за їхніми станами.
+        - rebuild: Перебудовує індекси з усіх користувачів і рахунків банку.
+        - users: ID користувачів з вказаним email та/або телефоном.
+        - accounts: ID рахунків, що відповідають усім фільтрам.
+        - blocked_count: Кількість заблокованих рахунків.
+    """
+    __slots__ = ("_emails", "_phones", "_kinds", "_currencies", "_blocked", "_accounts", "__weakref__")
+
+    def __init__(self) -> None:
+        """Ініціалізує порожні індекси та підписується на зміни блокування рахунків."""
+        self._emails = {}
+        self._phones = {}
+        self._kinds = {}
+        self._currencies = {}
+        self._blocked = set()
+        self._accounts = set()
+        observe_blocking(self)
+
+    def add_user(self, user):
+        """
+            Додає користувача до індексів email і телефону.
+
+            Аргументи:
+                user (User): Користувач.
+        """
+        _add(self._emails, user._email, user._user_id)
+        _add(self._phones, user._phone_number, user._user_id)
+
+    def add_account(self, account):
+        """
+            Додає рахунок до індексів типу, валюти та блокування.
+
+            Аргументи:
+                account (Cheking_account, Savings_account, Credit_account): Рахунок.
+        """
+        account_id = account._account_id
+        self._accounts.add(account_id)
+        _add(self._kinds, account._kind, account_id)
+        _add(self._currencies, account._currency, account_id)
+        if account._blocked:
+            self._blocked.add(account_id)
+
+    def add_states(self, states : list):
+        """
+            Додає пакет нових рахунків до індексів за їхніми станами (без читання властивостей рахунків).
+
+            ID рахунків групуються за типом і валютою, тож кожна множина індексу доповнюється одним викликом update.
+
+            Аргументи:
+                states (list): Стани рахунків у форматі _dump (ключі id, type, currency, blocked).
+        """
+        groups = {}
+        for state in states:
+            key = (state["type"], state["currency"])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = []
+            group.append(state["id"])
+        for (kind, currency), ids in groups.items():
+            self._accounts.update(ids)
+            for index, key in ((self._kinds, kind), (self._currencies, currency)):
+                bucket = index.get(key)
+                if bucket is None:
+                    bucket = index[key] = set()
+                bucket.update(ids)
+        self._blocked.update(state["id"] for state in states if state["blocked"])
+
+    def rebuild(self, users : dict, accounts):
+        """
+            Перебудовує індекси з усіх користувачів і рахунків (після відновлення стану банку).
+
+            Аргументи:
+                users (dict): Користувачі банку.
+                accounts (dict, AccountStore): Рахунки банку.
+        """
+        for index in (self._emails, self._phones, self._kinds, self._currencies):
+            index.clear()
+        self._blocked.clear()
+        self._accounts.clear()
+        for user in users.values():
+            self.add_user(user)
+        for account in accounts.values():
+            self.add_account(account)
+
+    def _blocked_changed(self, account):
+        """Оновлює індекс блокування (викликається з block_account та unblock_account)."""
+        account_id = account._account_id
+        if account_id in self._accounts:
+            if account._blocked:
+                self._blocked.add(account_id)
+            else:
+                self._blocked.discard(account_id)
+
+    def blocked_count(self) -> int:
+        """Повертає кількість заблокованих рахунків (за O(1))."""
+        return len(self._blocked)
+
+    def users(self, email : str = None, phone_number : str = None) -> set:
+        """
+            Повертає ID користувачів з вказаним email та телефоном (за O(1)).
+
+            Аргументи:
+                email (str, optional): Email.
+                phone_number (str, optional): Номер телефону.
+
+            Повертає:
+                set: ID користувачів, що відповідають усім вказаним значенням.
+        """
+        found = None
+        for index, key in ((self._emails, email), (self._phones, phone_number)):
+            if key is not None:
+                bucket = index.get(key, set())
+                found = set(bucket) if found is None else found & bucket
+        return found if found is not None else set()
+
+    def accounts(self, kind : str = None, currency : str = None, blocked : bool = None) -> set:
+        """
+            Повертає ID рахунків, що відповідають усім фільтрам.
+
+            Множини перетинаються, починаючи з найменшої, тож вартість залежить від розміру
+            найменшої з них (k), а не від кількості рахунків банку. Лише blocked=False без інших
+            фільтрів потребує різниці з усіма рахунками.
+
+            Аргументи:
+                kind (str, optional): Тип рахунку ("checking", "savings", "credit").
+                currency (str, optional): Валюта рахунку.
+                blocked (bool, optional): Статус блокування.
+
+            Повертає:
+                set: ID рахунків.
+        """
+        sets = []
+        if kind is not None:
+            sets.append(self._kinds.get(kind, set()))
+        if currency is not None:
+            sets.append(self._currencies.get(currency, set()))
+        if blocked:
+            sets.append(self._blocked)
+        if not sets:
+            sets.append(self._accounts)
+
+        sets.sort(key=len)
+        found = set(sets[0])
+        for other in sets[1:]:
+            found &= other
+        if blocked is False:
+            found -= self._blocked
+        return found
+
+
+class HistoryIndex:
+    """
+        Історія транзакцій кожного рахунку.
+
+        Для кожного рахунку зберігаються два масиви array('q'), що лише доповнюються в кінець:
+        час записів (наносекунди, не спадає) та позиції записів у списку транзакцій банку.
+        Записи одного рахунку додаються під блокуванням цього рахунку, тож упорядковані за часом,
+        і пошук періоду виконується бінарним пошуком: вартість запиту залежить від кількості
+        повернутих записів, а не від кількості транзакцій банку.
+
+        Методи:
+        - add: Додає записи транзакцій до історії їхніх рахунків.
+        - rebuild: Перебудовує історію з усіх записів банку.
+        - has: Чи є в історії записи рахунку.
+        - page: Сторінка історії рахунку за період.
+    """
+    __slots__ = ("_records", "_times", "_positions", "__weakref__")
+
+    def __init__(self, records : list) -> None:
+        """
+            Ініціалізує порожню історію та підписує її на запити історії рахунків (Cheking_account.history).
+
+            Аргументи:
+                records (list): Список записів транзакцій банку (TransactionRecord), що лише доповнюється.
+        """
+        self._records = records
+        self._times = {}
+        self._positions = {}
+        register_history(self)
+
+    def _append(self, account_id : int, timestamp : int, position : int):
+        """Додає запис до історії рахунку (час не може бути меншим за час попереднього запису)."""
+        times = self._times.get(account_id)
+        if times is None:
+            times = self._times[account_id] = array("q")
+            self._positions[account_id] = array("q")
+        elif timestamp < times[-1]:
+            timestamp = times[-1]
+        times.append(timestamp)
+        self._positions[account_id].append(position)
+
+    def add(self, records, start : int):
+        """
+            Додає записи транзакцій до історії їхніх рахунків.
+
+            Аргументи:
+                records (iterable): Записи транзакцій (TransactionRecord).
+                start (int): Позиція першого запису у списку транзакцій банку.
+        """
+        append = self._append
+        for position, record in enumerate(records, start):
+            source_id, target_id = record.source_id, record.target_id
+            if source_id is not None:
+                append(source_id, record.timestamp, position)
+            if target_id is not None and target_id != source_id:
+                append(target_id, record.timestamp, position)
+
+    def rebuild(self):
+        """Перебудовує історію з усіх записів банку (після відновлення стану банку)."""
+        self._times.clear()
+        self._positions.clear()
+        self.add(self._records, 0)
+
+    def has(self, account_id : int) -> bool:
+        """Повертає True, якщо в історії є записи рахунку."""
+        return account_id in self._positions
+
+    def page(self, account_id : int, since : int = None, until : int = None, limit : int = None, cursor : int = None) -> tuple:
+        """
+            Повертає сторінку історії рахунку за період (аргументи перевіряє Cheking_account.history).
+
+            Аргументи:
+                account_id (int): ID рахунку.
+                since (int, optional): Початок періоду (включно), наносекунди від епохи.
+                until (int, optional): Кінець періоду (не включно).
+                limit (int, optional): Максимальна кількість записів. За замовчуванням - усі.
+                cursor (int, optional): Курсор, повернутий попередньою сторінкою того самого запиту.
+
+            Повертає:
+                tuple: (список TransactionRecord у порядку виконання, курсор наступної сторінки або None).
+        """
+        positions = self._positions.get(account_id)
+        if positions is None:
+            return [], None
+        times = self._times[account_id]
+        # Позиції додаються після часу, тож їхня довжина - кількість повних записів.
+        end = len(positions)
+        if cursor is not None:
+            start = cursor
+        elif since is not None:
+            start = bisect_left(times, since, 0, end)
+        else:
+            start = 0
+        if until is not None:
+            end = bisect_left(times, until, min(start, end), end)
+        stop = end if limit is None else min(end, start + limit)
+        records = self._records
+        return [records[position] for position in positions[start:stop]], (stop if stop < end else None)
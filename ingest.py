@@ -0,0 +1,379 @@
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from bank import Bank
+from currency import currate
+from logger import log
+
+"""
+Модуль ingest містить потоковий конвеєр завантаження платіжних файлів (CSV або JSONL) у банк.
+
+Етапи конвеєра - генератори, що передають дані частинами (чанками) рядків: читання, розбір
+і перевірка, виконання через Bank.execute_batch та запис результатів. Кожен етап бере наступний
+чанк лише тоді, коли попередній оброблено, тож пам'ять обмежена розміром чанка (та кількістю
+чанків, що розбираються паралельно), а не розміром файлу.
+
+Формат рядка: kind, source_id, target_id, amount, currency (див. Bank.execute_batch).
+CSV-файл повинен мати заголовок з цими назвами колонок; кожен запис - один рядок файлу.
+
+Запуск:
+    python ingest.py payments.csv --journal bank.journal [--results results.csv] [--checkpoint ingest.ckpt]
+        [--chunk N] [--processes N] [--columnar] [--snapshot bank.snapshot]
+
+Класи:
+- Ingestor: Завантажує платіжний файл у банк з чекпойнтами та звітом про швидкість.
+
+Функції:
+- read_chunks: Читає файл чанками повних рядків, починаючи зі зміщення.
+- parse_chunk: Розбирає та перевіряє чанк рядків.
+"""
+
+_FIELDS = ("kind", "source_id", "target_id", "amount", "currency")
+_STATUS = ("ok", "invalid", "no_account", "blocked", "funds")
+
+
+def read_chunks(path : str, chunk_rows : int = 10000, offset : int = 0):
+    """
+        Читає файл чанками повних рядків.
+
+        Аргументи:
+            path (str): Шлях до файлу.
+            chunk_rows (int, optional): Кількість рядків у чанку. За замовчуванням 10000.
+            offset (int, optional): Зміщення (у байтах) початку рядка, з якого починати читання. За замовчуванням 0.
+
+        Повертає:
+            generator: Пари (зміщення після чанка, список рядків bytes). Останній рядок без символу
+            нового рядка вважається повним.
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        lines = []
+        for line in file:
+            offset += len(line)
+            lines.append(line)
+            if len(lines) >= chunk_rows:
+                yield offset, lines
+                lines = []
+        if lines:
+            yield offset, lines
+
+
+def _optional(value, convert):
+    """Повертає None для порожнього значення, інакше - convert(value)."""
+    if value is None or value == "":
+        return None
+    return convert(value)
+
+
+def parse_chunk(lines : list, fmt : str = "csv", columns : tuple = _FIELDS) -> list:
+    """
+        Розбирає та перевіряє чанк рядків.
+
+        Функція не залежить від стану банку, тому може виконуватись в окремому процесі.
+
+        Аргументи:
+            lines (list): Рядки файлу (bytes).
+            fmt (str, optional): Формат: "csv" або "jsonl". За замовчуванням "csv".
+            columns (tuple, optional): Назви колонок CSV у порядку файлу. За замовчуванням _FIELDS.
+
+        Повертає:
+            list: Для кожного рядка - кортеж (kind, source_id, target_id, amount, currency)
+            або None, якщо рядок неможливо розібрати.
+    """
+    rows = []
+    for line in lines:
+        try:
+            if fmt == "csv":
+                record = dict(zip(columns, next(csv.reader([line.decode("utf-8")]))))
+            else:
+                record = json.loads(line)
+            amount = float(record["amount"])
+            if not math.isfinite(amount):
+                raise ValueError(amount)
+            rows.append((record["kind"], _optional(record.get("source_id"), int), _optional(record.get("target_id"), int),
+                         amount, _optional(record.get("currency"), str)))
+        except (KeyError, TypeError, ValueError, AttributeError, StopIteration, csv.Error):
+            rows.append(None)
+    return rows
+
+
+class Ingestor:
+    """
+        Завантажує платіжний файл у банк.
+
+        Чанки виконуються через Bank.execute_batch (один запис журналу на чанк). Разом з пакетом
+        у тому самому записі журналу фіксується позначка чанка: шлях до файлу, зміщення після чанка,
+        номер першого рядка та коди результатів. Після запису результатів зберігається чекпойнт -
+        зміщення у файлі, розмір файлу результатів та позиція журналу. Після перезапуску завантажувач
+        обрізає файл результатів до збереженого розміру, переглядає журнал від збереженої позиції
+        і пропускає чанки, позначки яких уже є у журналі (дописуючи їхні результати), тож кожен чанк
+        виконується рівно один раз. Для цього банк повинен мати журнал.
+
+        Атрибути:
+        - bank: Банк, у який завантажуються операції.
+        - chunk_rows: Кількість рядків у чанку.
+        - processes: Кількість процесів для розбору (0 - розбір у поточному процесі).
+        - rows, executed, rejected: Кількість оброблених, виконаних та відхилених рядків.
+
+        Методи:
+        - run: Завантажує файл та повертає звіт.
+        - report: Повертає звіт про швидкість завантаження.
+    """
+
+    def __init__(self, bank : Bank, chunk_rows : int = 10000, processes : int = 0) -> None:
+        """
+            Ініціалізує завантажувач.
+
+            Аргументи:
+                bank (Bank): Банк, у який завантажуються операції.
+                chunk_rows (int, optional): Кількість рядків у чанку. За замовчуванням 10000.
+                processes (int, optional): Кількість процесів для розбору (0 - без окремих процесів). За замовчуванням 0.
+
+            Винятки:
+                TypeError: Якщо bank не є об'єктом Bank.
+                ValueError: Якщо chunk_rows не є додатним цілим числом або processes від'ємне.
+        """
+        if not isinstance(bank, Bank):
+            e = TypeError(f"bank повинен бути об'єктом Bank, а не {bank!r}")
+            log.exception("Неможливо створити завантажувач", e)
+            raise e
+
+        if not isinstance(chunk_rows, int) or chunk_rows < 1 or not isinstance(processes, int) or processes < 0:
+            e = ValueError("chunk_rows повинно бути додатним, а processes - невід'ємним цілим числом")
+            log.exception("Неможливо створити завантажувач", e)
+            raise e
+
+        self.bank = bank
+        self.chunk_rows = chunk_rows
+        self.processes = processes
+        self.rows = self.executed = self.rejected = 0
+        self._bytes = 0
+        self._elapsed = 0.0
+
+    @staticmethod
+    def _format(path : str) -> str:
+        """Визначає формат файлу за розширенням."""
+        return "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+
+    @staticmethod
+    def _load_checkpoint(checkpoint : str) -> dict:
+        """Повертає збережений чекпойнт або None."""
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return None
+        with open(checkpoint, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @staticmethod
+    def _save_checkpoint(checkpoint : str, state : dict):
+        """Атомарно зберігає чекпойнт (запис у тимчасовий файл та os.replace)."""
+        temporary = checkpoint + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, checkpoint)
+
+    def _parsed(self, chunks, fmt : str, columns : tuple):
+        """
+            Етап розбору: повертає (зміщення, кількість байтів, рядки) для кожного чанка.
+
+            З processes > 0 чанки розбираються у пулі процесів, але одночасно в обробці
+            не більше 2 * processes чанків, тож читання не випереджає виконання.
+        """
+        if not self.processes:
+            for offset, lines in chunks:
+                yield offset, sum(map(len, lines)), parse_chunk(lines, fmt, columns)
+            return
+
+        window = deque()
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            for offset, lines in chunks:
+                window.append((offset, sum(map(len, lines)), pool.submit(parse_chunk, lines, fmt, columns)))
+                if len(window) >= 2 * self.processes:
+                    offset, size, future = window.popleft()
+                    yield offset, size, future.result()
+            while window:
+                offset, size, future = window.popleft()
+                yield offset, size, future.result()
+
+    def _executed(self, parsed, path : str, line : int):
+        """
+            Етап виконання: виконує розібрані рядки чанка пакетом та повертає (зміщення, розмір, коди результатів).
+
+            Пакет записується до журналу з позначкою чанка (див. _mark), навіть якщо всі рядки чанка невірні.
+        """
+        for offset, size, rows in parsed:
+            valid = [row for row in rows if row is not None]
+            mark = self._mark(path, offset, line, rows)
+            if valid or mark is not None:
+                status = iter(self.bank.execute_batch(valid, mark))
+            else:
+                status = iter(())
+            line += len(rows)
+            yield offset, size, [next(status) if row is not None else Bank.BATCH_INVALID for row in rows]
+
+    def _mark(self, path : str, offset : int, line : int, rows : list) -> dict:
+        """Повертає позначку чанка для журналу або None, якщо банк не має журналу."""
+        if self.bank._journal is None:
+            return None
+        return {"ingest": path, "offset": offset, "line": line,
+                "invalid": [index for index, row in enumerate(rows) if row is None]}
+
+    def _recovered(self, path : str, state : dict):
+        """
+            Повертає чанки файлу, що були зафіксовані у журналі після чекпойнта, як (зміщення, коди результатів).
+
+            Коди невірних рядків відновлюються з позначки, решта - з кодів результатів пакета.
+        """
+        journal = self.bank._journal
+        if journal is None or "journal" not in state:
+            return
+        for entry in journal.entries(state["journal"]):
+            mark = entry.get("mark")
+            if entry.get("op") != "batch" or mark is None or mark.get("ingest") != path or \
+                    mark["offset"] <= state["offset"]:
+                continue
+            codes = iter(map(int, entry["status"]))
+            invalid = set(mark["invalid"])
+            rows = len(entry["status"]) + len(invalid)
+            yield mark["offset"], [Bank.BATCH_INVALID if index in invalid else next(codes) for index in range(rows)]
+
+    def _checkpoint(self, checkpoint : str, offset : int, line : int, output):
+        """Фіксує журнал на диску та зберігає чекпойнт з позицією журналу і розміром файлу результатів."""
+        journal = self.bank._journal
+        if journal is not None and not journal.durable:
+            journal.flush()
+        self._save_checkpoint(checkpoint, {
+            "offset": offset,
+            "line": line,
+            "journal": journal.position()[1] if journal is not None else 0,
+            "results": output.tell() if output is not None else 0,
+        })
+
+    def run(self, path : str, results : str = None, checkpoint : str = None) -> dict:
+        """
+            Завантажує файл у банк.
+
+            Аргументи:
+                path (str): Шлях до платіжного файлу (.csv, .jsonl).
+                results (str, optional): Файл результатів (CSV: номер рядка файлу, результат). За замовчуванням None.
+                checkpoint (str, optional): Файл чекпойнта; якщо він існує, завантаження продовжується з нього.
+
+            Повертає:
+                dict: Звіт (див. report).
+
+            Винятки:
+                FileNotFoundError: Якщо файл не існує.
+                ValueError: Якщо у заголовку CSV бракує колонок.
+        """
+        if not os.path.exists(path):
+            e = FileNotFoundError(f"Файл {path} не знайдено")
+            log.exception("Неможливо завантажити платіжний файл", e)
+            raise e
+
+        fmt = self._format(path)
+        state = self._load_checkpoint(checkpoint) or {"offset": 0, "line": 0}
+        offset, line = state["offset"], state["line"]
+        columns = _FIELDS
+        if fmt == "csv":
+            with open(path, "rb") as file:
+                header = file.readline()
+            columns = tuple(name.strip() for name in next(csv.reader([header.decode("utf-8-sig")])))
+            if not {"kind", "amount"} <= set(columns):
+                e = ValueError(f"У заголовку {path} повинні бути колонки kind та amount")
+                log.exception("Неможливо завантажити платіжний файл", e)
+                raise e
+            if offset == 0:
+                offset, line = len(header), 1
+
+        source = os.path.abspath(path)
+        output = None
+        if results is not None:
+            output = open(results, "a" if state["offset"] else "w", encoding="utf-8", newline="")
+            if "results" in state:
+                output.truncate(min(state["results"], output.tell()))
+        started = time.perf_counter()
+        try:
+            if checkpoint is not None:
+                for end, status in self._recovered(source, state):
+                    self._written(output, line, end - offset, status)
+                    offset, line = end, line + len(status)
+                self._checkpoint(checkpoint, offset, line, output)
+            chunks = read_chunks(path, self.chunk_rows, offset)
+            for offset, size, status in self._executed(self._parsed(chunks, fmt, columns), source, line):
+                self._written(output, line, size, status)
+                line += len(status)
+                if checkpoint is not None:
+                    self._checkpoint(checkpoint, offset, line, output)
+        finally:
+            self._elapsed += time.perf_counter() - started
+            if output is not None:
+                output.close()
+
+        report = self.report()
+        log.info("Завантажено %s: %s рядків (%s виконано, %s відхилено), %.0f рядків/с", path, report["rows"],
+                 report["executed"], report["rejected"], report["rows_per_sec"])
+        return report
+
+    def _written(self, output, line : int, size : int, status : list):
+        """Записує результати чанка, що починається після рядка line, та оновлює лічильники."""
+        if output is not None:
+            output.write("".join(f"{line + index + 1},{_STATUS[code]}\n" for index, code in enumerate(status)))
+            output.flush()
+        self.rows += len(status)
+        self._bytes += size
+        ok = status.count(Bank.BATCH_OK)
+        self.executed += ok
+        self.rejected += len(status) - ok
+
+    def report(self) -> dict:
+        """
+            Повертає звіт про завантаження.
+
+            Повертає:
+                dict: Кількість рядків (усього, виконаних, відхилених), байтів, час (с), рядків/с та МБ/с.
+        """
+        elapsed = self._elapsed or float("inf")
+        return {
+            "rows": self.rows,
+            "executed": self.executed,
+            "rejected": self.rejected,
+            "bytes": self._bytes,
+            "seconds": self._elapsed,
+            "rows_per_sec": self.rows / elapsed,
+            "mb_per_sec": self._bytes / elapsed / 2 ** 20,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Завантаження платіжного файлу у банк")
+    parser.add_argument("path", help="платіжний файл (.csv або .jsonl)")
+    parser.add_argument("--journal", required=True, help="журнал операцій банку")
+    parser.add_argument("--snapshot", help="знімок стану банку")
+    parser.add_argument("--columnar", action="store_true", help="колонкове сховище рахунків")
+    parser.add_argument("--results", help="файл результатів (CSV)")
+    parser.add_argument("--checkpoint", help="файл чекпойнта для продовження завантаження")
+    parser.add_argument("--chunk", type=int, default=10000, help="кількість рядків у чанку")
+    parser.add_argument("--processes", type=int, default=0, help="кількість процесів для розбору")
+    args = parser.parse_args(argv)
+
+    try:
+        currate.preload()
+    except Exception as e:
+        log.exception("Не вдалося завантажити курси валют", e)
+    bank = Bank("Ingest", "Local", columnar=args.columnar, journal=args.journal, snapshot=args.snapshot)
+    try:
+        report = Ingestor(bank, args.chunk, args.processes).run(args.path, args.results, args.checkpoint)
+    finally:
+        bank.close()
+    for name, value in report.items():
+        print(f"{name:<24}{value:>18,.3f}")
+
+
+if __name__ == "__main__":
+    main()
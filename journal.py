@@ -0,0 +1,311 @@
+import atexit
+import json
+import os
+import threading
+import time
+from logger import log
+
+"""
+Модуль journal містить журнал операцій банку, з якого відновлюється стан після перезапуску.
+
+Класи:
+- Journal: Журнал з дописуванням у кінець файлу та груповою фіксацією (group commit).
+
+Функції:
+- iter_entries: Потоково читає записи журналу.
+"""
+
+
+def _recover_tail(path : str) -> int:
+    """
+        Обрізає недописаний останній рядок журналу (наслідок аварійного завершення)
+        та повертає номер останнього повного запису.
+
+        Читається лише кінець файлу, тому вартість не залежить від розміру журналу.
+
+        Аргументи:
+            path (str): Шлях до журналу.
+
+        Повертає:
+            int: Номер (seq) останнього запису або 0 для порожнього журналу.
+    """
+    try:
+        file = open(path, "r+b")
+    except FileNotFoundError:
+        return 0
+
+    with file:
+        position = file.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0 and tail.count(b"\n") < 2:
+            step = min(65536, position)
+            position -= step
+            file.seek(position)
+            tail = file.read(step) + tail
+
+        end = tail.rfind(b"\n")
+        if end + 1 != len(tail):
+            file.truncate(position + end + 1)
+            log.warning("Журнал %s містив недописаний запис, його відкинуто", path)
+        if end < 0:
+            return 0
+        start = tail.rfind(b"\n", 0, end) + 1
+        return json.loads(tail[start:end])["seq"]
+
+
+def iter_entries(path : str = "banksystem.journal", offset : int = 0):
+    """
+        Потоково читає записи журналу.
+
+        Файл читається рядок за рядком, тому пам'ять не залежить від розміру журналу.
+        Недописаний останній рядок ігнорується.
+
+        Аргументи:
+            path (str, optional): Шлях до журналу. За замовчуванням "banksystem.journal".
+            offset (int, optional): Зміщення (у байтах) початку запису, з якого починати читання. За замовчуванням 0.
+
+        Повертає:
+            generator: Записи журналу (словники з ключами seq, op та полями операції).
+    """
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return
+
+    with file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            yield json.loads(line)
+
+
+class Journal:
+    """
+        Журнал операцій з дописуванням у кінець файлу.
+
+        Кожен запис - один JSON-рядок з номером seq. Записи з усіх потоків накопичуються
+        у черзі, а фоновий потік записує їх пакетом і виконує один os.fsync на пакет
+        (group commit): поки диск підтверджує попередній пакет, у черзі збирається наступний.
+
+        Якщо запис пакета чи os.fsync не вдався, файл обрізається до кінця останнього зафіксованого
+        пакета (тож частково записаний рядок не лишається посередині журналу) і пакет записується
+        повторно із затримкою. Якщо всі спроби невдалі, фоновий потік зупиняється: записи, починаючи
+        з першого незафіксованого, отримують OSError, а нові записи не приймаються - у журналі
+        не буває пропусків між зафіксованими записами.
+
+        Атрибути:
+        - path: Шлях до файлу журналу.
+        - durable: Чи чекає append, доки запис не буде зафіксовано на диску.
+        - commits: Кількість виконаних os.fsync (пакетів).
+
+        Методи:
+        - append: Додає запис до журналу.
+        - wait: Чекає фіксації запису на диску.
+        - flush: Чекає, доки всі додані записи буде зафіксовано на диску.
+        - position: Повертає номер останнього запису та зміщення кінця журналу.
+        - close: Фіксує записи та закриває журнал.
+        - entries: Потоково читає записи журналу.
+    """
+    _RETRIES = 3
+    _RETRY_DELAY = 0.05
+
+    def __init__(self, path : str = "banksystem.journal", durable : bool = True) -> None:
+        """
+            Відкриває (або створює) журнал для дописування.
+
+            Аргументи:
+                path (str, optional): Шлях до файлу журналу. За замовчуванням "banksystem.journal".
+                durable (bool, optional): Чекати у append фіксації запису на диску. За замовчуванням True.
+
+            Винятки:
+                TypeError: Якщо path не є рядком.
+        """
+        if not isinstance(path, str):
+            e = TypeError("path повинен бути рядком")
+            log.exception("Неможливо відкрити журнал", e)
+            raise e
+
+        self.path = path
+        self.durable = durable
+        self.commits = 0
+        self._seq = self._synced_seq = _recover_tail(path)
+        self._end = self._synced_end = os.path.getsize(path) if os.path.exists(path) else 0
+        self._pending = []
+        self._error = None
+        self._failed_seq = None
+        self._closed = False
+        self._condition = threading.Condition()
+        # Без буфера Python: після помилки в буфері не лишається даних, що дописалися б пізніше.
+        self._file = open(path, "ab", buffering=0)
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @property
+    def seq(self) -> int:
+        """Номер останнього доданого запису."""
+        return self._seq
+
+    def position(self) -> tuple:
+        """
+            Повертає номер останнього доданого запису та зміщення (у байтах), з якого почнеться наступний.
+
+            Повертає:
+                tuple: (seq, offset).
+        """
+        with self._condition:
+            return self._seq, self._end
+
+    def append(self, entry : dict, wait : bool = None) -> int:
+        """
+            Додає запис до журналу.
+
+            Аргументи:
+                entry (dict): Запис (повинен містити ключ op та серіалізуватися у JSON).
+                wait (bool, optional): Чекати фіксації запису на диску. За замовчуванням - значення durable.
+
+            Повертає:
+                int: Номер запису (seq).
+
+            Винятки:
+                ValueError: Якщо журнал закрито.
+                OSError: Якщо не вдалося записати журнал на диск (у режимі durable) або запис журналу
+                    зупинено після помилки.
+        """
+        body = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._condition:
+            if self._closed:
+                e = ValueError("Журнал закрито")
+                log.exception("Неможливо додати запис до журналу %s", e, self.path)
+                raise e
+            if self._failed_seq is not None:
+                e = OSError(f"Запис журналу {self.path} зупинено після помилки: {self._error}")
+                log.exception("Неможливо додати запис до журналу %s", e, self.path)
+                raise e
+            self._seq += 1
+            seq = self._seq
+            line = (b'{"seq":%d,%s\n' % (seq, body[1:])) if len(body) > 2 else (b'{"seq":%d}\n' % seq)
+            self._pending.append(line)
+            self._end += len(line)
+            self._condition.notify_all()
+            if self.durable if wait is None else wait:
+                self._wait(seq)
+        return seq
+
+    def wait(self, seq : int):
+        """
+            Чекає, доки запис seq (та всі попередні) буде зафіксовано на диску.
+
+            Аргументи:
+                seq (int): Номер запису, повернутий append.
+
+            Винятки:
+                OSError: Якщо не вдалося записати журнал на диск.
+        """
+        with self._condition:
+            self._wait(seq)
+
+    def _wait(self, seq : int):
+        """Чекає (під self._condition) фіксації запису seq на диску."""
+        while self._synced_seq < seq and (self._failed_seq is None or seq < self._failed_seq):
+            self._condition.wait()
+        if self._synced_seq < seq:
+            raise self._error
+
+    def _write_loop(self):
+        """
+            Фоновий цикл, що записує накопичені записи пакетами з одним os.fsync на пакет.
+
+            Невдалий пакет записується повторно (до _RETRIES разів) після обрізання файлу до кінця
+            останнього зафіксованого пакета; якщо всі спроби невдалі, цикл зупиняється.
+        """
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                last_seq = self._seq
+
+            data = b"".join(batch)
+            error = self._write_batch(data)
+            with self._condition:
+                if error is not None:
+                    self._error = error
+                    self._failed_seq = last_seq - len(batch) + 1
+                    self._pending = []
+                    self._end = self._synced_end
+                    self._condition.notify_all()
+                    log.exception("Запис журналу %s зупинено: записи з #%s не зафіксовано", error, self.path,
+                                  self._failed_seq)
+                    return
+                self._synced_seq = last_seq
+                self._synced_end += len(data)
+                self.commits += 1
+                self._condition.notify_all()
+
+    def _write_batch(self, data : bytes) -> OSError:
+        """
+            Записує пакет у кінець файлу та виконує os.fsync, повторюючи спробу після помилки.
+
+            Аргументи:
+                data (bytes): Записи пакета.
+
+            Повертає:
+                OSError: Остання помилка, якщо пакет не вдалося зафіксувати, або None.
+        """
+        error = None
+        for attempt in range(self._RETRIES + 1):
+            if attempt:
+                time.sleep(self._RETRY_DELAY * 2 ** (attempt - 1))
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[self._file.write(view):]
+                os.fsync(self._file.fileno())
+                return None
+            except OSError as e:
+                error = e
+                log.exception("Не вдалося записати журнал %s (спроба %s)", e, self.path, attempt + 1)
+            try:
+                # Частково записаний пакет відкидається, щоб повторний запис не залишив обірваний рядок.
+                os.ftruncate(self._file.fileno(), self._synced_end)
+            except OSError as e:
+                log.exception("Не вдалося обрізати журнал %s", e, self.path)
+                return error
+        return error
+
+    def flush(self):
+        """
+            Чекає, доки всі додані записи буде зафіксовано на диску.
+
+            Винятки:
+                OSError: Якщо не вдалося записати журнал на диск.
+        """
+        with self._condition:
+            self._wait(self._seq)
+
+    def close(self):
+        """Фіксує всі додані записи, зупиняє фоновий потік та закриває файл журналу."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+        self._file.close()
+        atexit.unregister(self.close)
+
+    def entries(self, offset : int = 0):
+        """
+            Потоково читає записи журналу.
+
+            Аргументи:
+                offset (int, optional): Зміщення (у байтах) початку запису, з якого починати читання. За замовчуванням 0.
+
+            Повертає:
+                generator: Записи журналу у порядку seq.
+        """
+        return iter_entries(self.path, offset)
@@ -1,5 +1,15 @@
-import datetime
+import atexit
+import json
 import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from metrics import metrics
+
+_records = metrics.counter("bank_log_records_total", "Записи логу за рівнем", ("level",))
+_write_seconds = metrics.histogram("bank_log_write_seconds", "Час запису повідомлення у лог (Logger._write)", ("level",))
 
 class Logger:
     """
@@ -7,18 +17,45 @@ class Logger:
 
     Класи:
     - Logger: Клас для запису логів у файл.
+
+    Функції:
+    - log_segments: Повертає ротовані сегменти логу у хронологічному порядку.
+    - iter_records: Потоково читає записи з усіх сегментів логу.
     """
 
-    def __init__(self, filename : str= "banksystem.log", create : bool = True) -> None:
+    _levels = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "EXCEPTION": 50}
+    _formats = ("text", "jsonl")
+
+    def __init__(self, filename : str= "banksystem.log", create : bool = True, buffered : bool = False,
+                 buffer_size : int = 512, flush_interval : float = 1.0, durable : bool = True,
+                 level : str = "INFO", fmt : str = "text", max_bytes : int = 0, rotate_interval : float = 0,
+                 backup_count : int = 0, compress : bool = False) -> None:
         """
             Клас для логування подій у файл.
 
             Атрибути:
             - filename: Ім'я файлу для логування.
+            - buffered: Чи увімкнено буферизований режим запису.
+            - buffer_size: Кількість записів у буфері, після якої виконується скидання у файл.
+            - flush_interval: Максимальний час (у секундах) між скиданнями буфера.
+            - durable: Чи скидати буфер на диск одразу після запису рівня EXCEPTION.
+            - level: Мінімальний рівень повідомлень, що потрапляють у лог.
+            - suppressed: Лічильник відфільтрованих записів (ключ - (файл, рядок, рівень) місця виклику).
+            - fmt: Формат запису: "text" (людиночитний) або "jsonl" (JSON-рядок із часом у наносекундах).
+            - max_bytes: Розмір файлу (у байтах), після якого виконується ротація (0 - без ротації за розміром).
+            - rotate_interval: Час життя сегмента (у секундах), після якого виконується ротація (0 - без ротації за часом).
+            - backup_count: Кількість ротованих сегментів, що зберігаються (0 - зберігати всі).
+            - compress: Чи стискати ротовані сегменти у gzip.
 
             Методи:
             - __init__: Ініціалізує об'єкт логера.
+            - configure_buffer: Вмикає або вимикає буферизований режим.
+            - set_level: Встановлює мінімальний рівень логування.
+            - is_enabled: Перевіряє, чи буде записано повідомлення вказаного рівня.
             - _write: Записує повідомлення у файл.
+            - _rotate: Виконує ротацію файлу логу.
+            - flush: Скидає накопичені записи у файл.
+            - close: Скидає буфер та закриває файл логу.
             - info: Записує інформаційне повідомлення.
             - warning: Записує попередження.
             - error: Записує повідомлення про помилку.
@@ -27,61 +64,445 @@ class Logger:
         if not isinstance(filename, str) or not isinstance(create, bool):
             raise TypeError("Неправильні типи даних: назва файлу має бути рядком, а create — логічним значенням (bool).")
 
+        if fmt not in self._formats:
+            raise ValueError(f"Невідомий формат логу: {fmt}, допустимі значення: {self._formats}")
+        if not isinstance(max_bytes, int) or not isinstance(backup_count, int) or max_bytes < 0 or backup_count < 0 \
+                or not isinstance(rotate_interval, (int, float)) or rotate_interval < 0 or not isinstance(compress, bool):
+            raise TypeError("Неправильні параметри ротації: max_bytes, backup_count, rotate_interval повинні бути невід'ємними числами, compress — bool.")
+
         self.filename = filename
-        if create and not os.path.exists(filename):
-            with open(filename, "w") as file:
-                file.write("=== Bank System Log ===\n")
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compress = compress
+        # Файл (із заголовком, якщо create) створюється під час першого запису, а не при створенні логера.
+        self._create = create
+
+        self._ts_second = None
+        self._ts_text = ""
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._file = None
+        self._size = None
+        self._segment_started = time.time()
+        self._worker = None
+        self.buffered = False
+        self.suppressed = Counter()
+        self.set_level(level)
+        self.configure_buffer(buffered, buffer_size, flush_interval, durable)
+
+    def set_level(self, level : str) -> None:
+        """
+            Встановлює мінімальний рівень логування.
+
+            Повідомлення нижчого рівня відкидаються ще до форматування тексту.
+
+            Аргументи:
+                level (str): Рівень (DEBUG, INFO, WARNING, ERROR, EXCEPTION).
+
+            Винятки:
+                ValueError: Якщо рівень невідомий.
+        """
+        if not isinstance(level, str) or level.upper() not in self._levels:
+            raise ValueError(f"Невідомий рівень логування: {level}")
+        self.level = level.upper()
+        self._min_level = self._levels[self.level]
+
+    def is_enabled(self, level : str) -> bool:
+        """
+            Перевіряє, чи буде записано повідомлення вказаного рівня.
+
+            Аргументи:
+                level (str): Рівень логу.
+
+            Повертає:
+                bool: True, якщо рівень не нижчий за мінімальний.
+        """
+        return self._levels.get(level.upper(), 0) >= self._min_level
+
+    def _suppress(self, level : str):
+        """
+            Враховує відфільтрований запис у лічильнику місця виклику.
+
+            Аргументи:
+                level (str): Рівень відфільтрованого запису.
+        """
+        frame = sys._getframe(2)
+        self.suppressed[(frame.f_code.co_filename, frame.f_lineno, level)] += 1
+
+    @staticmethod
+    def _format(message, args) -> str:
+        """
+            Формує текст повідомлення лише тоді, коли його буде записано.
 
-    def _write(self, level : str, message : str):
+            Аргументи:
+                message (str, callable): Шаблон у %-стилі або функція без аргументів, що повертає текст.
+                args (tuple): Аргументи для шаблону.
+
+            Повертає:
+                str: Готовий текст повідомлення.
+        """
+        if callable(message):
+            message = message()
+        if args:
+            return message % args
+        return message
+
+    def configure_buffer(self, buffered : bool = True, buffer_size : int = 512, flush_interval : float = 1.0,
+                         durable : bool = True) -> None:
         """
-            Записує повідомлення у файл логу.
+            Вмикає або вимикає буферизований режим запису.
+
+            У буферизованому режимі файл логу відкривається один раз, записи накопичуються
+            у пам'яті та скидаються фоновим потоком при досягненні buffer_size записів
+            або через flush_interval секунд.
+
+            Аргументи:
+                buffered (bool, optional): Чи увімкнути буферизацію. За замовчуванням True.
+                buffer_size (int, optional): Поріг кількості записів для скидання. За замовчуванням 512.
+                flush_interval (float, optional): Поріг часу для скидання (у секундах). За замовчуванням 1.0.
+                durable (bool, optional): Скидати буфер на диск після записів EXCEPTION. За замовчуванням True.
+
+            Винятки:
+                TypeError: Якщо параметри мають невірний тип.
+                ValueError: Якщо buffer_size або flush_interval не додатні.
+        """
+        if not isinstance(buffered, bool) or not isinstance(durable, bool) or not isinstance(buffer_size, int) \
+                or not isinstance(flush_interval, (int, float)):
+            raise TypeError("Неправильні типи даних для параметрів буферизації логера.")
+        if buffer_size <= 0 or flush_interval <= 0:
+            raise ValueError("buffer_size та flush_interval повинні бути більше 0.")
+
+        if self.buffered and not buffered:
+            self.close()
+
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self.buffered = buffered
+
+        if buffered and (self._worker is None or not self._worker.is_alive()):
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._flush_loop, name="logger-flush", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def _timestamp(self) -> str:
+        """
+            Повертає відформатований час запису.
+
+            Рядок часу кешується в межах однієї секунди, тож strftime
+            виконується не частіше одного разу на секунду.
+
+            Повертає:
+                str: Час у форматі "%Y-%m-%d %H:%M:%S".
+        """
+        now = time.time()
+        second = int(now)
+        if second != self._ts_second:
+            self._ts_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+            self._ts_second = second
+        return self._ts_text
+
+    def _header(self) -> bytes:
+        """
+            Повертає заголовок нового файлу логу.
+
+            Повертає:
+                bytes: Заголовок для текстового формату або порожній рядок для jsonl.
+        """
+        return b"=== Bank System Log ===\n" if self.fmt == "text" else b""
+
+    @metrics.timed(_write_seconds, _records, labels=lambda self, level, *args, **kwargs: (level.upper(),))
+    def _write(self, level : str, message : str, fields : dict = None):
+        """
+            Записує повідомлення у файл логу (кількість записів і час запису - у метриках bank_log_*).
 
             Аргументи:
                 level (str): Рівень логу (INFO, WARNING, ERROR, EXCEPTION).
                 message (str): Текст повідомлення.
+                fields (dict, optional): Додаткові поля запису (наприклад, transaction_id, account_id).
+                    Зберігаються лише у форматі jsonl.
+        """
+        if self.fmt == "jsonl":
+            record = {"ts": time.time_ns(), "level": level.upper(), "msg": message}
+            if fields:
+                record.update(fields)
+            entry = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        else:
+            entry = f"{self._timestamp()} [{level.upper()}] {message}\n".encode("utf-8")
+
+        # Режим перевіряється під _buffer_lock: close() вимикає буферизацію під тим самим блокуванням,
+        # тож запис або потрапляє до буфера до його останнього скидання, або пишеться напряму після нього.
+        with self._buffer_lock:
+            buffered = self.buffered
+            if buffered:
+                self._buffer.append(entry)
+                pending = len(self._buffer)
+        if not buffered:
+            with self._io_lock:
+                self._emit(entry)
+                self._file.close()
+                self._file = None
+            return
+
+        if self.durable and level == "EXCEPTION":
+            self.flush(sync=True)
+        elif pending >= self.buffer_size:
+            self._wakeup.set()
+
+    def _emit(self, data : bytes):
+        """
+            Дописує дані у поточний сегмент логу, за потреби виконуючи ротацію.
+
+            Викликається під self._io_lock.
+
+            Аргументи:
+                data (bytes): Закодовані записи.
+        """
+        if self._file is None:
+            self._file = open(self.filename, "ab")
+            self._size = self._file.tell()
+            if not self._size and self._create:
+                header = self._header()
+                self._file.write(header)
+                self._size = len(header)
+
+        if (self.max_bytes and self._size and self._size + len(data) > self.max_bytes) or \
+                (self.rotate_interval and time.time() - self._segment_started >= self.rotate_interval):
+            self._rotate()
+
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self):
+        """
+            Закриває поточний файл, перейменовує його у сегмент з міткою часу
+            та відкриває новий файл логу. Викликається під self._io_lock.
+
+            Сегменти називаються "<filename>.<час у наносекундах>" і за потреби
+            стискаються у gzip фоновим потоком.
+        """
+        self._file.close()
+        self._file = None
+        segment = f"{self.filename}.{time.time_ns():020d}"
+        os.replace(self.filename, segment)
+
+        if self.compress:
+            threading.Thread(target=self._compress_segment, args=(segment,), name="logger-gzip", daemon=True).start()
+        if self.backup_count:
+            for old in log_segments(self.filename)[:-self.backup_count]:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+
+        self._file = open(self.filename, "ab")
+        header = self._header() if self._create else b""
+        self._file.write(header)
+        self._size = len(header)
+        self._segment_started = time.time()
+
+    @staticmethod
+    def _compress_segment(segment : str):
+        """
+            Стискає ротований сегмент у gzip та видаляє оригінал.
+
+            Аргументи:
+                segment (str): Шлях до сегмента.
+        """
+        import gzip
+        tmp = segment + ".gz.tmp"
+        try:
+            with open(segment, "rb") as src, gzip.open(tmp, "wb") as dst:
+                while chunk := src.read(1 << 20):
+                    dst.write(chunk)
+            os.replace(tmp, segment + ".gz")
+            os.remove(segment)
+        except FileNotFoundError:
+            # сегмент уже видалено через backup_count
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _flush_loop(self):
+        """Фоновий цикл, що періодично скидає буфер у файл."""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self, sync : bool = False):
+        """
+            Скидає накопичені записи у файл логу.
+
+            Буфер забирається під _io_lock, тож пакети з одночасних викликів потрапляють у файл
+            у тому самому порядку, в якому їх забрано з буфера.
+
+            Аргументи:
+                sync (bool, optional): Додатково виконати os.fsync для файлу. За замовчуванням False.
+        """
+        if not self._buffer and not sync:
+            return
+        with self._io_lock:
+            with self._buffer_lock:
+                entries, self._buffer = self._buffer, []
+            if entries:
+                self._emit(b"".join(entries))
+            elif self._file is None:
+                return
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
         """
-        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = f"{now} [{level.upper()}] {message}\n"
-        with open(self.filename, "a") as file:
-            file.write(entry)
+            Зупиняє фоновий потік, скидає буфер та закриває файл логу.
 
+            Буферизація вимикається разом із забиранням буфера під _io_lock, тож записи, зроблені
+            під час закриття, потрапляють у файл після всіх раніше накопичених.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join()
+        self._worker = None
+        with self._io_lock:
+            with self._buffer_lock:
+                self.buffered = False
+                entries, self._buffer = self._buffer, []
+            if entries:
+                self._emit(b"".join(entries))
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        atexit.unregister(self.close)
 
-    def info(self, message: str):
+    def info(self, message: str, *args, **fields):
         """
             Записує інформаційне повідомлення та вказує рівень логу.
 
             Аргументи:
-                message (str): Текст повідомлення.
+                message (str, callable): Текст повідомлення, шаблон у %-стилі або функція, що повертає текст.
+                *args: Аргументи шаблону, підставляються лише якщо запис не відфільтровано.
+                **fields: Додаткові поля запису для формату jsonl (наприклад, transaction_id, account_id).
         """
-        self._write("INFO", message)
+        if self._min_level > 20:
+            self._suppress("INFO")
+            return
+        self._write("INFO", self._format(message, args), fields)
 
-    def warning(self, message: str):
+    def warning(self, message: str, *args, **fields):
         """
             Записує інформаційне повідомлення та вказує рівень логу.
 
             Аргументи:
-                message (str): Текст повідомлення.
+                message (str, callable): Текст повідомлення, шаблон у %-стилі або функція, що повертає текст.
+                *args: Аргументи шаблону, підставляються лише якщо запис не відфільтровано.
+                **fields: Додаткові поля запису для формату jsonl (наприклад, transaction_id, account_id).
         """
-        self._write("WARNING", message)
+        if self._min_level > 30:
+            self._suppress("WARNING")
+            return
+        self._write("WARNING", self._format(message, args), fields)
 
-    def error(self, message: str):
+    def error(self, message: str, *args, **fields):
         """
             Записує інформаційне повідомлення та вказує рівень логу.
 
             Аргументи:
-                message (str): Текст повідомлення.
+                message (str, callable): Текст повідомлення, шаблон у %-стилі або функція, що повертає текст.
+                *args: Аргументи шаблону, підставляються лише якщо запис не відфільтровано.
+                **fields: Додаткові поля запису для формату jsonl (наприклад, transaction_id, account_id).
         """
-        self._write("ERROR", message)
+        if self._min_level > 40:
+            self._suppress("ERROR")
+            return
+        self._write("ERROR", self._format(message, args), fields)
 
-    def exception(self, message: str, exc: Exception):
+    def exception(self, message: str, exc: Exception, *args, **fields):
         """
             Записує інформаційне повідомлення та вказує рівень логу.
 
             Аргументи:
-                message (str): Текст повідомлення.
+                message (str, callable): Текст повідомлення, шаблон у %-стилі або функція, що повертає текст.
                 exc (Exception): Об'єкт винятку.
+                *args: Аргументи шаблону, підставляються лише якщо запис не відфільтровано.
+                **fields: Додаткові поля запису для формату jsonl (наприклад, transaction_id, account_id).
         """
-        self._write("EXCEPTION", f"{message}: {type(exc).__name__} - {exc}")
+        if self._min_level > 50:
+            self._suppress("EXCEPTION")
+            return
+        fields["exc_type"] = type(exc).__name__
+        self._write("EXCEPTION", f"{self._format(message, args)}: {type(exc).__name__} - {exc}", fields)
+
+
+_segment_suffix = re.compile(r"\.(\d{20})(\.gz)?$")
+_text_entry = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \[(\w+)\] (.*)$")
+
+
+def log_segments(filename : str = "banksystem.log") -> list:
+    """
+        Повертає ротовані сегменти логу у хронологічному порядку (без поточного файлу).
+
+        Якщо сегмент ще стискається і існує у двох варіантах, повертається нестиснутий.
+
+        Аргументи:
+            filename (str, optional): Ім'я основного файлу логу. За замовчуванням "banksystem.log".
+
+        Повертає:
+            list: Шляхи до сегментів, від найстарішого до найновішого.
+    """
+    directory = os.path.dirname(filename) or "."
+    base = os.path.basename(filename)
+    found = {}
+    for name in os.listdir(directory):
+        if not name.startswith(base):
+            continue
+        match = _segment_suffix.match(name[len(base):])
+        if match is None:
+            continue
+        stamp = match.group(1)
+        if stamp not in found or not match.group(2):
+            found[stamp] = os.path.join(directory, name)
+    return [found[stamp] for stamp in sorted(found)]
+
+
+def iter_records(filename : str = "banksystem.log"):
+    """
+        Потоково читає записи з усіх сегментів логу (включно з gzip) та поточного файлу.
+
+        Файли читаються рядок за рядком, тому пам'ять не залежить від розміру логу.
+
+        Аргументи:
+            filename (str, optional): Ім'я основного файлу логу. За замовчуванням "banksystem.log".
+
+        Повертає:
+            generator: Словники з ключами ts, level, msg (та додатковими полями для jsonl).
+    """
+    import gzip
+    paths = log_segments(filename)
+    if os.path.exists(filename):
+        paths.append(filename)
+
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            file = opener(path, "rb")
+        except FileNotFoundError:
+            continue
+        with file:
+            for raw in file:
+                line = raw.decode("utf-8", errors="replace").rstrip("\n")
+                if line.startswith("{"):
+                    yield json.loads(line)
+                    continue
+                match = _text_entry.match(line)
+                if match is not None:
+                    yield {"ts": match.group(1), "level": match.group(2), "msg": match.group(3)}
 
 log = Logger()
 
@@ -0,0 +1,494 @@
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+"""
+Модуль metrics містить легкий реєстр метрик для інструментування гарячих шляхів системи.
+
+Метрики (лічильники, показники та гістограми затримок з фіксованими межами кошиків) записуються
+лише коли реєстр увімкнено; вимкнений реєстр коштує одну перевірку атрибута на виклик. Затримки
+можна вимірювати вибірково (кожен N-й виклик). Модуль не залежить від інших модулів системи
+(їх інструментують через нього, зокрема logger), тому помилки не записуються у лог, а лише піднімаються
+(крім помилок фонового експорту).
+
+Класи:
+- Counter: Лічильник, що лише зростає.
+- Gauge: Показник, що може як зростати, так і зменшуватись.
+- Histogram: Гістограма значень з фіксованими межами кошиків.
+- MetricsRegistry: Реєстр метрик зі знімком стану та експортом у текстовому форматі Prometheus.
+
+Змінні:
+- metrics: Спільний реєстр метрик системи (за замовчуванням вимкнений).
+"""
+
+LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_name_pattern = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+def _format_value(value) -> str:
+    """Форматує значення метрики для текстового формату Prometheus."""
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value : str) -> str:
+    """Екранує значення мітки для текстового формату Prometheus."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names : tuple, values : tuple, extra : str = None) -> str:
+    """Повертає мітки у форматі {name="value",...} (порожній рядок, якщо міток немає)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """
+        Базовий клас метрики.
+
+        Атрибути:
+        - name: Назва метрики.
+        - help: Опис метрики.
+        - labels: Назви міток.
+        - _values: Значення за кортежами значень міток.
+    """
+    __slots__ = ("name", "help", "labels", "_registry", "_values", "_lock")
+    _type = None
+
+    def __init__(self, registry, name : str, help : str, labels : tuple = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._registry = registry
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labels : tuple):
+        """Перевіряє кількість значень міток (лише для нового набору міток)."""
+        if len(labels) != len(self.labels):
+            raise ValueError(f"Метрика {self.name} очікує мітки {self.labels}, а не {labels!r}")
+
+    def value(self, labels : tuple = ()):
+        """Повертає поточне значення метрики для вказаних міток (None, якщо значення ще немає)."""
+        with self._lock:
+            value = self._values.get(tuple(labels))
+            return self._copy(value) if value is not None else None
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            return {labels: self._copy(value) for labels, value in self._values.items()}
+
+    def _reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """
+        Лічильник, що лише зростає (наприклад, кількість виконаних транзакцій).
+
+        Методи:
+        - inc: Збільшує лічильник.
+        - value: Поточне значення.
+    """
+    __slots__ = ()
+    _type = "counter"
+
+    def inc(self, amount = 1, labels : tuple = ()):
+        """
+            Збільшує лічильник (якщо реєстр увімкнено).
+
+            Аргументи:
+                amount (int, float, optional): Приріст. За замовчуванням 1.
+                labels (tuple, optional): Значення міток.
+
+            Винятки:
+                ValueError: Якщо amount від'ємний або кількість значень міток не збігається з назвами.
+        """
+        if not self._registry.enabled:
+            return
+        if amount < 0:
+            raise ValueError(f"Лічильник {self.name} не може зменшуватись")
+        with self._lock:
+            values = self._values
+            if labels not in values:
+                self._check(labels)
+                values[labels] = 0
+            values[labels] += amount
+
+
+class Gauge(_Metric):
+    """
+        Показник, що може як зростати, так і зменшуватись (наприклад, час останнього оновлення курсів).
+
+        Методи:
+        - set: Встановлює значення.
+        - inc: Змінює значення на amount.
+        - value: Поточне значення.
+    """
+    __slots__ = ()
+    _type = "gauge"
+
+    def set(self, value, labels : tuple = ()):
+        """
+            Встановлює значення показника (якщо реєстр увімкнено).
+
+            Аргументи:
+                value (int, float): Значення.
+                labels (tuple, optional): Значення міток.
+        """
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            if labels not in self._values:
+                self._check(labels)
+            self._values[labels] = value
+
+    def inc(self, amount = 1, labels : tuple = ()):
+        """
+            Змінює значення показника на amount (якщо реєстр увімкнено).
+
+            Аргументи:
+                amount (int, float, optional): Приріст (може бути від'ємним). За замовчуванням 1.
+                labels (tuple, optional): Значення міток.
+        """
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            values = self._values
+            if labels not in values:
+                self._check(labels)
+                values[labels] = 0
+            values[labels] += amount
+
+
+class Histogram(_Metric):
+    """
+        Гістограма значень з фіксованими межами кошиків (наприклад, затримки у секундах).
+
+        Для кожного набору міток зберігаються кількості значень у кошиках (без накопичення),
+        сума та кількість значень; запис - бінарний пошук кошика та три додавання.
+
+        Атрибути:
+        - buckets: Верхні межі кошиків (за зростанням, без +Inf).
+
+        Методи:
+        - observe: Додає значення.
+        - value: Поточний стан ({"buckets": {межа: кількість з накопиченням}, "sum", "count"}).
+    """
+    __slots__ = ("buckets",)
+    _type = "histogram"
+
+    def __init__(self, registry, name : str, help : str, labels : tuple = (), buckets : tuple = LATENCY_BUCKETS) -> None:
+        buckets = tuple(float(bound) for bound in buckets)
+        if not buckets or any(lower >= upper for lower, upper in zip(buckets, buckets[1:])):
+            raise ValueError(f"Межі кошиків гістограми {name} повинні бути непорожніми та зростаючими")
+        super().__init__(registry, name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value : float, labels : tuple = ()):
+        """
+            Додає значення до гістограми (якщо реєстр увімкнено).
+
+            Аргументи:
+                value (float): Значення (для затримок - у секундах).
+                labels (tuple, optional): Значення міток.
+        """
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                self._check(labels)
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, state) -> dict:
+        counts, total, count = state
+        cumulative = itertools.accumulate(counts)
+        return {"buckets": dict(zip(self.buckets + (float("inf"),), cumulative)), "sum": total, "count": count}
+
+
+class MetricsRegistry:
+    """
+        Реєстр метрик.
+
+        Метрики створюються один раз (зазвичай на рівні модуля, що їх записує) і записують значення
+        лише коли реєстр увімкнено. Гістограми, заповнені через timed, отримують лише кожен sample-й виклик,
+        тож їхня кількість значень - вибірка (загальна кількість приблизно count * sample).
+
+        Атрибути:
+        - enabled: Чи записуються метрики.
+        - sample: Кожен котрий виклик вимірюється декоратором timed.
+
+        Методи:
+        - counter, gauge, histogram: Створюють метрику або повертають вже створену.
+        - enable, disable: Вмикають та вимикають запис метрик.
+        - sampled: Чи вимірювати поточний виклик.
+        - timed: Декоратор, що вимірює час виконання функції.
+        - snapshot: Знімок значень усіх метрик.
+        - reset: Очищує значення всіх метрик.
+        - to_prometheus: Значення метрик у текстовому форматі Prometheus.
+        - export: Записує метрики у файл та/або надсилає у локальний сокет.
+        - export_every: Періодично експортує метрики у фоновому потоці.
+    """
+
+    def __init__(self, enabled : bool = False, sample : int = 1) -> None:
+        """
+            Ініціалізує порожній реєстр.
+
+            Аргументи:
+                enabled (bool, optional): Чи записувати метрики. За замовчуванням False.
+                sample (int, optional): Вимірювати кожен котрий виклик. За замовчуванням 1 (кожен).
+        """
+        self.enabled = False
+        self.sample = 1
+        self._ticks = itertools.count()
+        self._metrics = {}
+        self._lock = threading.Lock()
+        if enabled:
+            self.enable(sample)
+
+    def _register(self, cls, name : str, help : str, labels : tuple, **options):
+        if not isinstance(name, str) or not _name_pattern.match(name):
+            raise ValueError(f"Недопустима назва метрики: {name!r}")
+        labels = tuple(labels)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help, labels, **options)
+            elif type(metric) is not cls or metric.labels != labels:
+                raise ValueError(f"Метрику {name} вже створено з іншим типом або мітками")
+            return metric
+
+    def counter(self, name : str, help : str, labels : tuple = ()) -> Counter:
+        """
+            Створює лічильник або повертає вже створений.
+
+            Аргументи:
+                name (str): Назва (за правилами Prometheus, для лічильників - із суфіксом _total).
+                help (str): Опис.
+                labels (tuple, optional): Назви міток.
+
+            Повертає:
+                Counter: Лічильник.
+
+            Винятки:
+                ValueError: Якщо назва недопустима або метрику з цією назвою створено з іншим типом чи мітками.
+        """
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name : str, help : str, labels : tuple = ()) -> Gauge:
+        """
+            Створює показник або повертає вже створений (див. counter).
+
+            Повертає:
+                Gauge: Показник.
+        """
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name : str, help : str, labels : tuple = (), buckets : tuple = LATENCY_BUCKETS) -> Histogram:
+        """
+            Створює гістограму або повертає вже створену (див. counter).
+
+            Аргументи:
+                buckets (tuple, optional): Верхні межі кошиків за зростанням. За замовчуванням - LATENCY_BUCKETS
+                    (від 1 мкс до 2.5 с).
+
+            Повертає:
+                Histogram: Гістограма.
+        """
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def enable(self, sample : int = 1):
+        """
+            Вмикає запис метрик.
+
+            Аргументи:
+                sample (int, optional): Вимірювати час кожного котрого виклику. За замовчуванням 1 (кожного).
+
+            Винятки:
+                ValueError: Якщо sample не є додатним цілим числом.
+        """
+        if not isinstance(sample, int) or sample < 1:
+            raise ValueError(f"sample повинно бути додатним цілим числом, а не {sample!r}")
+        self.sample = sample
+        self.enabled = True
+
+    def disable(self):
+        """Вимикає запис метрик (накопичені значення зберігаються)."""
+        self.enabled = False
+
+    def sampled(self) -> bool:
+        """Повертає True, якщо поточний виклик потрапляє у вибірку (кожен sample-й)."""
+        return self.sample == 1 or next(self._ticks) % self.sample == 0
+
+    def timed(self, histogram : Histogram, calls : Counter = None, errors : Counter = None, labels = None):
+        """
+            Декоратор, що записує час виконання функції у гістограму.
+
+            Поки реєстр вимкнено, обгортка лише викликає функцію. Час вимірюється для вибірки викликів
+            (див. sampled), а calls та errors рахують кожен виклик.
+
+            Аргументи:
+                histogram (Histogram): Гістограма затримок (у секундах).
+                calls (Counter, optional): Лічильник усіх викликів.
+                errors (Counter, optional): Лічильник викликів, що завершились винятком.
+                labels (callable, optional): Функція, що за аргументами виклику повертає значення міток
+                    (однакові для всіх трьох метрик).
+
+            Повертає:
+                callable: Декоратор.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                key = labels(*args, **kwargs) if labels is not None else ()
+                if calls is not None:
+                    calls.inc(labels=key)
+                started = time.perf_counter() if self.sampled() else None
+                try:
+                    return function(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.inc(labels=key)
+                    raise
+                finally:
+                    if started is not None:
+                        histogram.observe(time.perf_counter() - started, labels=key)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        """
+            Повертає знімок значень усіх метрик.
+
+            Повертає:
+                dict: {назва: {"type", "help", "labels", "values": {кортеж значень міток: значення}}}, де значення
+                гістограми - {"buckets": {межа: кількість з накопиченням}, "sum", "count"}.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {"type": metric._type, "help": metric.help, "labels": metric.labels,
+                              "values": metric._snapshot()} for metric in metrics}
+
+    def reset(self):
+        """Очищує значення всіх метрик (самі метрики залишаються зареєстрованими)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric._reset()
+
+    def to_prometheus(self) -> str:
+        """
+            Повертає значення метрик у текстовому форматі Prometheus (версія 0.0.4).
+
+            Повертає:
+                str: Текст для експорту.
+        """
+        lines = []
+        for name, data in sorted(self.snapshot().items()):
+            help = data["help"].replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            names = data["labels"]
+            for labels, value in sorted(data["values"].items()):
+                if data["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+                    continue
+                for bound, count in value["buckets"].items():
+                    le = _format_labels(names, labels, f'le="{_format_value(bound)}"')
+                    lines.append(f"{name}_bucket{le} {count}")
+                lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(names, labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path : str = None, address = None):
+        """
+            Експортує метрики у текстовому форматі Prometheus.
+
+            Файл записується атомарно (через тимчасовий файл і заміну), тож збирач метрик
+            (наприклад, textfile collector node_exporter) ніколи не читає частково записаний файл.
+
+            Аргументи:
+                path (str, optional): Шлях до файлу.
+                address (str, tuple, optional): Локальний сокет: шлях Unix-сокета або (host, port) TCP.
+
+            Винятки:
+                ValueError: Якщо не вказано ні path, ні address.
+                OSError: Помилки запису файлу чи з'єднання.
+        """
+        if path is None and address is None:
+            raise ValueError("Потрібно вказати path або address для експорту метрик")
+        data = self.to_prometheus().encode("utf-8")
+        if path is not None:
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        if address is not None:
+            import socket
+            if isinstance(address, str):
+                connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                connection.connect(address)
+            else:
+                connection = socket.create_connection(address)
+            with connection:
+                connection.sendall(data)
+
+    def export_every(self, interval : float, path : str = None, address = None) -> threading.Event:
+        """
+            Запускає фоновий потік, що експортує метрики кожні interval секунд (див. export).
+
+            Помилки окремого експорту (наприклад, недоступний сокет) записуються у лог і не зупиняють потік.
+
+            Аргументи:
+                interval (float): Період експорту у секундах.
+                path (str, optional): Шлях до файлу.
+                address (str, tuple, optional): Локальний сокет.
+
+            Повертає:
+                threading.Event: Подія, встановлення якої зупиняє потік.
+
+            Винятки:
+                ValueError: Якщо interval не додатний або не вказано ні path, ні address.
+        """
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError(f"interval повинен бути додатним числом, а не {interval!r}")
+        if path is None and address is None:
+            raise ValueError("Потрібно вказати path або address для експорту метрик")
+        stopped = threading.Event()
+
+        def loop():
+            while not stopped.wait(interval):
+                try:
+                    self.export(path, address)
+                except OSError as e:
+                    from logger import log
+                    log.exception("Не вдалося експортувати метрики", e)
+
+        threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+        return stopped
+
+
+metrics = MetricsRegistry()
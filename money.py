@@ -0,0 +1,282 @@
+from decimal import Decimal
+from currency import currate
+
+"""
+Модуль money містить тип для точного представлення грошових сум.
+
+Класи:
+- Money: Сума у цілих мінорних одиницях (копійках, центах) разом з валютою.
+
+Константи режимів округлення:
+- ROUND_HALF_EVEN: До найближчого, при рівності - до парного (банківське округлення).
+- ROUND_HALF_UP: До найближчого, при рівності - від нуля.
+- ROUND_DOWN: До нуля (відкидання).
+- ROUND_UP: Від нуля.
+"""
+
+ROUND_HALF_EVEN = "ROUND_HALF_EVEN"
+ROUND_HALF_UP = "ROUND_HALF_UP"
+ROUND_DOWN = "ROUND_DOWN"
+ROUND_UP = "ROUND_UP"
+
+
+def _round_div(numerator : int, denominator : int, rounding : str) -> int:
+    """
+    Ділить ціле число на ціле додатне з округленням у вказаному режимі.
+
+    Аргументи:
+        numerator (int): Ділене.
+        denominator (int): Дільник (більше 0).
+        rounding (str): Режим округлення.
+
+    Повертає:
+        int: Округлена частка.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    if not remainder:
+        return quotient
+    if rounding == ROUND_HALF_EVEN:
+        twice = remainder * 2
+        if twice > denominator or (twice == denominator and quotient & 1):
+            return quotient + 1
+        return quotient
+    if rounding == ROUND_HALF_UP:
+        twice = remainder * 2
+        if twice > denominator or (twice == denominator and numerator >= 0):
+            return quotient + 1
+        return quotient
+    if rounding == ROUND_DOWN:
+        return quotient + 1 if numerator < 0 else quotient
+    if rounding == ROUND_UP:
+        return quotient + 1 if numerator > 0 else quotient
+    raise ValueError(f"Невідомий режим округлення: {rounding}")
+
+
+class Money:
+    """
+        Грошова сума у цілих мінорних одиницях разом з валютою.
+
+        Уся арифметика виконується над цілими числами, тож суми не накопичують похибок
+        float, а множення на дробові коефіцієнти (відсотки, курси) округлюється
+        у явно вказаному режимі.
+
+        Атрибути класу:
+        - _scale: Кількість мінорних одиниць в одній основній (100).
+        - default_rounding: Режим округлення за замовчуванням.
+
+        Атрибути екземпляра:
+        - _minor: Сума у мінорних одиницях (int).
+        - _currency: Валюта суми.
+
+        Методи:
+        - of: Створює суму з int, float, str, Decimal або Money.
+        - amount: Повертає суму в основних одиницях (float).
+        - multiply: Множить суму на коефіцієнт з округленням.
+        - convert: Конвертує суму в іншу валюту.
+    """
+    __slots__ = ("_minor", "_currency")
+    _scale = 100
+    default_rounding = ROUND_HALF_EVEN
+
+    def __init__(self, minor : int = 0, currency : str = "UAH") -> None:
+        """
+            Ініціалізує суму з мінорних одиниць.
+
+            Аргументи:
+                minor (int, optional): Сума у мінорних одиницях. За замовчуванням 0.
+                currency (str, optional): Валюта суми. За замовчуванням "UAH".
+
+            Винятки:
+                TypeError: Якщо minor не є цілим числом.
+        """
+        if type(minor) is not int:
+            raise TypeError(f"Сума в мінорних одиницях повинна бути цілим числом, а не {minor!r}")
+        self._minor = minor
+        self._currency = currency
+
+    @classmethod
+    def of(cls, amount, currency : str = "UAH", rounding : str = None):
+        """
+            Створює суму з числа в основних одиницях.
+
+            Аргументи:
+                amount (int, float, str, Decimal, Money): Сума в основних одиницях.
+                currency (str, optional): Валюта суми (ігнорується для Money). За замовчуванням "UAH".
+                rounding (str, optional): Режим округлення дробових мінорних одиниць.
+
+            Повертає:
+                Money: Нова сума.
+
+            Винятки:
+                TypeError: Якщо amount має невірний тип.
+        """
+        if isinstance(amount, Money):
+            return amount
+        if type(amount) is int:
+            return cls(amount * cls._scale, currency)
+        if isinstance(amount, str):
+            amount = Decimal(amount)
+        if isinstance(amount, (float, Decimal)):
+            numerator, denominator = amount.as_integer_ratio()
+            return cls(_round_div(numerator * cls._scale, denominator, rounding or cls.default_rounding), currency)
+        raise TypeError(f"Неможливо створити грошову суму з {amount!r}")
+
+    @property
+    def amount(self) -> float:
+        """Сума в основних одиницях (float)."""
+        return self._minor / self._scale
+
+    @property
+    def currency(self) -> str:
+        """Валюта суми."""
+        return self._currency
+
+    def to_decimal(self) -> Decimal:
+        """Повертає точну суму в основних одиницях як Decimal."""
+        return Decimal(self._minor).scaleb(-2)
+
+    def _coerce(self, other) -> int:
+        """
+            Повертає мінорні одиниці іншого операнда у валюті цієї суми.
+
+            Винятки:
+                ValueError: Якщо валюти не збігаються.
+        """
+        if other.__class__ is Money:
+            if other._currency != self._currency:
+                raise ValueError(f"Неможливо поєднати суми у різних валютах: {self._currency} та {other._currency}")
+            return other._minor
+        return Money.of(other, self._currency)._minor
+
+    def __add__(self, other):
+        if other.__class__ is Money and other._currency == self._currency:
+            return _money(self._minor + other._minor, self._currency)
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return _money(self._minor + self._coerce(other), self._currency)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if other.__class__ is Money and other._currency == self._currency:
+            return _money(self._minor - other._minor, self._currency)
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return _money(self._minor - self._coerce(other), self._currency)
+
+    def __rsub__(self, other):
+        if not isinstance(other, (int, float)):
+            return NotImplemented
+        return _money(self._coerce(other) - self._minor, self._currency)
+
+    def multiply(self, factor, rounding : str = None):
+        """
+            Множить суму на коефіцієнт з округленням до мінорних одиниць.
+
+            Аргументи:
+                factor (int, float, Decimal): Коефіцієнт.
+                rounding (str, optional): Режим округлення. За замовчуванням default_rounding.
+
+            Повертає:
+                Money: Результат множення.
+        """
+        if type(factor) is int:
+            return _money(self._minor * factor, self._currency)
+        numerator, denominator = factor.as_integer_ratio()
+        return _money(_round_div(self._minor * numerator, denominator, rounding or self.default_rounding), self._currency)
+
+    def __mul__(self, factor):
+        if not isinstance(factor, (int, float, Decimal)) or isinstance(factor, bool):
+            return NotImplemented
+        return self.multiply(factor)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return _money(-self._minor, self._currency)
+
+    def __abs__(self):
+        return _money(abs(self._minor), self._currency)
+
+    def __bool__(self):
+        return self._minor != 0
+
+    def __eq__(self, other):
+        # Рівність лише між Money: число не має валюти, а рівність з ним не узгоджувалася б з __hash__.
+        if other.__class__ is Money:
+            return self._minor == other._minor and self._currency == other._currency
+        return NotImplemented
+
+    def __lt__(self, other):
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return self._minor < self._coerce(other)
+
+    def __le__(self, other):
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return self._minor <= self._coerce(other)
+
+    def __gt__(self, other):
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return self._minor > self._coerce(other)
+
+    def __ge__(self, other):
+        if not isinstance(other, (Money, int, float)):
+            return NotImplemented
+        return self._minor >= self._coerce(other)
+
+    def __hash__(self):
+        return hash((self._minor, self._currency))
+
+    def __float__(self):
+        return self._minor / self._scale
+
+    def convert(self, to_currency : str, rounding : str = None):
+        """
+            Конвертує суму в іншу валюту за поточними курсами currate.
+
+            Аргументи:
+                to_currency (str): Валюта, в яку конвертуємо.
+                rounding (str, optional): Режим округлення. За замовчуванням default_rounding.
+
+            Повертає:
+                Money: Сума у новій валюті.
+
+            Винятки:
+                Exception: Якщо валюта не підтримується або курси ще не завантажено.
+        """
+        if to_currency == self._currency:
+            return self
+        factor = currate.cross_rate(self._currency, to_currency)
+        numerator, denominator = factor.as_integer_ratio()
+        return _money(_round_div(self._minor * numerator, denominator, rounding or self.default_rounding), to_currency)
+
+    def __str__(self):
+        sign = "-" if self._minor < 0 else ""
+        units, cents = divmod(abs(self._minor), self._scale)
+        return f"{sign}{units}.{cents:02d} {self._currency}"
+
+    def __repr__(self):
+        return f"Money({self._minor}, '{self._currency}')"
+
+
+_new = object.__new__
+
+
+def _money(minor : int, currency : str) -> Money:
+    """
+    Швидко створює Money без перевірок (для внутрішньої арифметики).
+
+    Аргументи:
+        minor (int): Сума у мінорних одиницях.
+        currency (str): Валюта.
+
+    Повертає:
+        Money: Нова сума.
+    """
+    money = _new(Money)
+    money._minor = minor
+    money._currency = currency
+    return money
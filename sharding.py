@@ -0,0 +1,724 @@
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+from user import User
+from accounts import Cheking_account
+from transaction import Transaction, TransactionRecord
+from journal import Journal
+from bank import Bank
+from concurrency import account_locks
+from currency import CurrencyRates, RateSource, currate
+from money import Money, _money
+from logger import log
+
+"""
+Модуль sharding містить шардований режим банку: рахунки розподілені між процесами-обробниками
+(по одному банку Bank на процес), а маршрутизатор ShardedBank надсилає операції процесу,
+якому належить рахунок. Процеси не поділяють GIL, тож транзакції різних шардів виконуються
+паралельно на різних ядрах.
+
+Рахунок належить шарду account_id % shards: кожен шард видає ID рахунків і транзакцій лише
+з власною остачею (IdAllocator.stride), тож ID не перетинаються і маршрут визначається за ID
+без таблиці відповідності. Перекази між шардами виконуються за двофазним протоколом, а курси
+валют передаються процесам через спільну пам'ять.
+
+Класи:
+- SharedRates: Курси валют у спільній пам'яті процесів.
+- SharedRateSource: Джерело курсів зі спільної пам'яті.
+- Shard: Банк шарда у процесі-обробнику (операції та учасник двофазного переказу).
+- ShardedBank: Маршрутизатор операцій між процесами шардів.
+"""
+
+_RATES_TTL = 1.0
+
+
+class SharedRates:
+    """
+        Курси валют у спільній пам'яті (multiprocessing.shared_memory).
+
+        Блок містить лічильник версії та курси купівлі й продажу кожної підтримуваної валюти
+        (NaN - курсу немає). Записує лише процес, що створив блок; під час запису лічильник
+        непарний, тож читач повторює читання, якщо застав запис, і не бачить частково оновлених курсів.
+
+        Атрибути:
+        - name: Ім'я блоку спільної пам'яті (для підключення з інших процесів).
+
+        Методи:
+        - publish: Записує нові курси.
+        - read: Читає поточні курси.
+        - close: Від'єднується від блоку (власник також видаляє його).
+    """
+    _currencies = CurrencyRates._suported_currency
+
+    def __init__(self, name : str = None, rates : dict = None) -> None:
+        """
+            Створює новий блок курсів або підключається до існуючого.
+
+            Аргументи:
+                name (str, optional): Ім'я існуючого блоку. За замовчуванням - створити новий блок.
+                rates (dict, optional): Початкові курси нового блоку у форматі {валюта: {'buy': float, 'sale': float}}.
+        """
+        self._owner = name is None
+        self._memory = shared_memory.SharedMemory(name=name, create=self._owner,
+                                                  size=8 * (1 + 2 * len(self._currencies)))
+        self._values = self._memory.buf.cast("d")
+        if self._owner:
+            self._values[0] = 0.0
+            self.publish(rates or {})
+
+    @property
+    def name(self) -> str:
+        """Ім'я блоку спільної пам'яті."""
+        return self._memory.name
+
+    def publish(self, rates : dict):
+        """
+            Записує нові курси (лише у процесі, що створив блок).
+
+            Аргументи:
+                rates (dict): Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+        """
+        values = self._values
+        values[0] += 1
+        for index, currency in enumerate(self._currencies):
+            rate = rates.get(currency)
+            values[1 + 2 * index] = rate['buy'] if rate else math.nan
+            values[2 + 2 * index] = rate['sale'] if rate else math.nan
+        values[0] += 1
+
+    def read(self) -> dict:
+        """
+            Читає поточні курси.
+
+            Повертає:
+                dict: Курси у форматі {валюта: {'buy': float, 'sale': float}}.
+        """
+        values = self._values
+        while True:
+            version = values[0]
+            if version % 2 == 0:
+                data = values.tolist()
+                if values[0] == version:
+                    break
+            time.sleep(0)
+        return {currency: {'buy': data[1 + 2 * index], 'sale': data[2 + 2 * index]}
+                for index, currency in enumerate(self._currencies) if not math.isnan(data[1 + 2 * index])}
+
+    def close(self):
+        """Від'єднується від блоку; процес, що створив блок, також видаляє його."""
+        self._values.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+class SharedRateSource(RateSource):
+    """
+        Джерело курсів зі спільної пам'яті.
+
+        Атрибути:
+        - shared: Блок курсів SharedRates.
+    """
+
+    def __init__(self, shared : SharedRates):
+        self.shared = shared
+
+    def fetch(self) -> dict:
+        return self.shared.read()
+
+
+class Shard:
+    """
+        Банк шарда у процесі-обробнику.
+
+        Виконує операції, надіслані маршрутизатором, над рахунками свого банку. Для переказу
+        між шардами є учасником двофазного протоколу: prepare перевіряє свою частину переказу,
+        не змінюючи баланс, commit застосовує її та записує до історії і журналу, abort - скасовує.
+        Маршрутизатор не надсилає шарду інших операцій між prepare та commit/abort, тож
+        перевірений на першій фазі стан рахунку не змінюється до другої.
+
+        Атрибути:
+        - index: Номер шарда.
+        - bank: Банк шарда.
+
+        Методи:
+        - ensure_user: Додає копію користувача, якщо її ще немає.
+        - create_account: Створює рахунок.
+        - balance: Повертає баланс рахунку.
+        - execute_batch: Виконує пакет операцій над рахунками шарда.
+        - prepare, commit, abort: Фази переказу між шардами.
+        - stats: Агреговані показники банку шарда.
+        - users: Дані всіх користувачів шарда.
+        - reload_rates: Перечитує курси зі спільної пам'яті.
+    """
+
+    def __init__(self, index : int, bank : Bank) -> None:
+        """
+            Ініціалізує шард.
+
+            Аргументи:
+                index (int): Номер шарда.
+                bank (Bank): Банк шарда.
+        """
+        self.index = index
+        self.bank = bank
+        self._create = {"checking": bank.create_checking_account, "savings": bank.create_savings_account,
+                        "credit": bank.create_credit_account}
+        self._pending = {}
+
+    def ensure_user(self, data : dict) -> User:
+        """
+            Додає копію користувача (з його ID) до банку шарда, якщо її ще немає.
+
+            Аргументи:
+                data (dict): Дані користувача (User._dump).
+
+            Повертає:
+                User: Користувач банку шарда.
+        """
+        bank = self.bank
+        with bank._lock:
+            user = bank._users.get(data["id"])
+            if user is not None:
+                return user
+            user = User._restore(data)
+            bank._users[user._user_id] = user
+            bank._index.add_user(user)
+            seq = bank._commit({"op": "user", **data})
+        bank._await_commit(seq)
+        return user
+
+    def create_account(self, kind : str, user_data : dict, args : tuple) -> int:
+        """
+            Створює рахунок власника user_data (див. Bank.create_*_account).
+
+            Повертає:
+                int: ID рахунку (з остачею номера шарда).
+        """
+        return self._create[kind](self.ensure_user(user_data), *args)._account_id
+
+    def balance(self, account_id : int) -> Money:
+        """Повертає баланс рахунку або None, якщо рахунку немає."""
+        account = self.bank.get_account(account_id)
+        return account._balance if account is not None else None
+
+    def execute_batch(self, rows : list) -> array:
+        """Виконує пакет операцій (див. Bank.execute_batch)."""
+        return self.bank.execute_batch(rows)
+
+    def prepare(self, token : int, side : str, account_id : int, remote_id : int, amount, currency : str) -> tuple:
+        """
+            Перша фаза переказу між шардами: перевіряє свою частину переказу, не змінюючи баланс.
+
+            Аргументи:
+                token (int): Ідентифікатор переказу у маршрутизаторі.
+                side (str): "debit" - списання з рахунку шарда, "credit" - зарахування на нього.
+                account_id (int): ID рахунку шарда.
+                remote_id (int): ID рахунку іншого шарда.
+                amount (int, float, Money): Сума переказу.
+                currency (str): Валюта суми (None - валюта вихідного рахунку).
+
+            Повертає:
+                tuple: (код результату Bank.BATCH_*, сума Money або None).
+        """
+        account = self.bank._accounts.get(account_id) if isinstance(account_id, int) else None
+        if account is None:
+            return Bank.BATCH_NO_ACCOUNT, None
+        if currency is None:
+            currency = amount._currency if isinstance(amount, Money) else account._currency
+        try:
+            if not isinstance(currency, str) or currency not in Cheking_account._suported_currency or \
+                    isinstance(amount, bool) or not isinstance(amount, (int, float, Money)) or amount <= 0:
+                return Bank.BATCH_INVALID, None
+            amount = Money.of(amount, currency)
+        except (TypeError, ValueError, OverflowError):
+            return Bank.BATCH_INVALID, None
+
+        with account_locks.hold(account):
+            if account._blocked:
+                return Bank.BATCH_BLOCKED, None
+            if side == "debit":
+                change = -amount.convert(account._currency)._minor
+                if account._balance._minor + change < 0:
+                    return Bank.BATCH_FUNDS, None
+            else:
+                change = amount.convert(account._currency)._minor
+                if change <= 5:
+                    return Bank.BATCH_INVALID, None
+        self._pending[token] = (side, account, remote_id, amount, change)
+        return Bank.BATCH_OK, amount
+
+    def commit(self, token : int, record : tuple = None) -> tuple:
+        """
+            Друга фаза переказу: застосовує підготовлену частину та записує переказ до історії і журналу шарда.
+
+            Аргументи:
+                token (int): Ідентифікатор переказу.
+                record (tuple, optional): (ID транзакції, час) від шарда-відправника. За замовчуванням - новий ID.
+
+            Повертає:
+                tuple: (ID транзакції, час у наносекундах).
+        """
+        side, account, remote_id, amount, change = self._pending.pop(token)
+        bank = self.bank
+        with account_locks.hold(account):
+            before = bank._stats.capture((account,))
+            account._balance = _money(account._balance._minor + change, account._currency)
+            bank._stats.update(before, (account,))
+            transaction_id, timestamp = record if record is not None else (Transaction.change_id(), time.time_ns())
+            source_id, target_id = (account._account_id, remote_id) if side == "debit" \
+                else (remote_id, account._account_id)
+            record = TransactionRecord(transaction_id, "transfer", source_id, target_id,
+                                       amount._minor, amount._currency, timestamp)
+            entry = None
+            if bank._journal is not None:
+                entry = {"op": "tx", **record._asdict(), "accounts": [dict(account._state(), id=account._account_id)]}
+            seq = bank._commit(entry, [record])
+        bank._await_commit(seq)
+        return transaction_id, timestamp
+
+    def abort(self, token : int):
+        """Скасовує підготовлену частину переказу (баланс на першій фазі не змінювався)."""
+        self._pending.pop(token, None)
+
+    def stats(self) -> dict:
+        """Повертає агреговані показники банку шарда (див. Bank.stats)."""
+        return self.bank.stats()
+
+    def users(self) -> list:
+        """Повертає дані (User._dump) усіх користувачів шарда."""
+        return [user._dump() for user in self.bank._users.values()]
+
+    def reload_rates(self):
+        """Перечитує курси зі спільної пам'яті, не чекаючи, доки застаріють поточні."""
+        currate.refresh()
+
+
+def _serve(index : int, shards : int, connection, options : dict, rates_name : str):
+    """
+        Цикл процесу-обробника: відкриває банк шарда та виконує запити маршрутизатора.
+
+        Аргументи:
+            index (int): Номер шарда.
+            shards (int): Кількість шардів.
+            connection: Кінець каналу multiprocessing.Pipe.
+            options (dict): Параметри банку шарда (columnar, journal, durable).
+            rates_name (str): Ім'я блоку курсів у спільній пам'яті.
+    """
+    Cheking_account._stride_ids(shards, index)
+    Transaction._stride_ids(shards, index)
+    rates = SharedRates(rates_name)
+    currate.set_source(SharedRateSource(rates))
+    currate.ttl = _RATES_TTL
+    journal = Journal(options["journal"], durable=options["durable"]) if options["journal"] else None
+    shard = Shard(index, Bank(f"Shard {index}", "Local", columnar=options["columnar"], journal=journal))
+    try:
+        while True:
+            op, args = connection.recv()
+            if op == "close":
+                break
+            try:
+                reply = True, getattr(shard, op)(*args)
+            except Exception as e:
+                log.exception("Помилка операції %s у шарді %s", e, op, index)
+                reply = False, e
+            connection.send(reply)
+    finally:
+        shard.bank.close()
+        rates.close()
+        connection.send((True, None))
+        connection.close()
+
+
+class _Worker:
+    """Процес шарда, його канал та блокування каналу (запит і відповідь не перемежовуються)."""
+    __slots__ = ("process", "connection", "lock")
+
+    def __init__(self, process, connection) -> None:
+        self.process = process
+        self.connection = connection
+        self.lock = threading.Lock()
+
+
+class ShardedBank:
+    """
+        Шардований банк: маршрутизатор операцій між процесами шардів.
+
+        Кожен процес-обробник має власний банк з частиною рахунків; нові рахунки розподіляються
+        між шардами по черзі. Операції над рахунками одного шарда (зокрема пакети execute_batch,
+        розділені за шардами) виконуються у процесі шарда паралельно з іншими шардами; переказ
+        між шардами виконується після попередніх рядків обох своїх шардів, тож порядок рядків пакета зберігається.
+
+        Переказ між шардами виконується за двофазним протоколом: маршрутизатор блокує канали
+        обох шардів, шард-відправник перевіряє списання (prepare), шард-отримувач - зарахування;
+        якщо обидва погодились, обидва застосовують свою частину (commit) з одним ID транзакції,
+        інакше підготовлена частина скасовується (abort). Рішення координатора не журналюється,
+        тож після аварії між фіксаціями двох шардів переказ потребує звірки.
+
+        Курси валют маршрутизатора публікуються у спільній пам'яті (SharedRates); процеси шардів
+        читають їх звідти, не завантажуючи курси самостійно.
+
+        Атрибути:
+        - shards: Кількість шардів.
+
+        Методи:
+        - shard_of: Повертає номер шарда рахунку.
+        - add_user, get_user: Додає та повертає користувача.
+        - create_checking_account, create_savings_account, create_credit_account: Створюють рахунок і повертають його ID.
+        - balance: Повертає баланс рахунку.
+        - deposit, withdraw, transfer: Виконують операцію та повертають код результату.
+        - execute_batch: Виконує пакет операцій, розділений за шардами.
+        - stats: Агреговані показники всіх шардів.
+        - refresh_rates: Оновлює курси валют та публікує їх для шардів.
+        - close: Закриває банки шардів та зупиняє процеси.
+    """
+
+    def __init__(self, shards : int = None, columnar : bool = False, directory : str = None,
+                 durable : bool = True) -> None:
+        """
+            Запускає процеси шардів.
+
+            Аргументи:
+                shards (int, optional): Кількість шардів. За замовчуванням - кількість ядер процесора.
+                columnar (bool, optional): Колонкове сховище рахунків у шардах. За замовчуванням False.
+                directory (str, optional): Каталог журналів шардів (shard-N.journal); якщо журнали існують,
+                    стан шардів відновлюється з них. За замовчуванням - без журналів.
+                durable (bool, optional): Чекати фіксації журналів на диску. За замовчуванням True.
+
+            Шардам публікуються вже завантажені курси маршрутизатора (без запиту до джерела). Якщо курси
+            ще не завантажувались, refresh_rates() виконується у фоновому потоці, тож запуск не чекає на мережу,
+            а конвертація валют у шардах стає можливою після публікації курсів.
+
+            Винятки:
+                ValueError: Якщо shards не є додатним цілим числом.
+        """
+        shards = shards if shards is not None else os.cpu_count() or 1
+        if not isinstance(shards, int) or shards < 1:
+            e = ValueError(f"shards повинно бути додатним цілим числом, а не {shards!r}")
+            log.exception("Неможливо створити шардований банк", e)
+            raise e
+
+        self.shards = shards
+        self._rates = SharedRates(rates=currate._rates)
+        self._users = {}
+        self._users_lock = threading.Lock()
+        self._placement = itertools.count()
+        self._tokens = itertools.count(1)
+        self._workers = []
+        context = multiprocessing.get_context("spawn")
+        try:
+            for index in range(shards):
+                connection, child = context.Pipe()
+                options = {"columnar": columnar, "durable": durable,
+                           "journal": os.path.join(directory, f"shard-{index}.journal") if directory else None}
+                process = context.Process(target=_serve, args=(index, shards, child, options, self._rates.name),
+                                          name=f"bank-shard-{index}", daemon=True)
+                process.start()
+                child.close()
+                self._workers.append(_Worker(process, connection))
+
+            for users in self._call_all("users"):
+                for data in users:
+                    if data["id"] not in self._users:
+                        self._users[data["id"]] = User._restore(data)
+            if not currate._load_attempted:
+                threading.Thread(target=self._refresh_in_background, name="shard-rates", daemon=True).start()
+        except Exception as e:
+            log.exception("Не вдалося запустити процеси шардів", e)
+            for worker in self._workers:
+                worker.process.terminate()
+                worker.connection.close()
+            self._workers = []
+            self._rates.close()
+            raise e
+        log.info("Запущено шардований банк: %s шардів, %s користувачів", shards, len(self._users))
+
+    def shard_of(self, account_id : int) -> int:
+        """
+            Повертає номер шарда, якому належить рахунок.
+
+            Аргументи:
+                account_id (int): ID рахунку.
+
+            Повертає:
+                int: Номер шарда.
+        """
+        return account_id % self.shards
+
+    def _request(self, shard : int, op : str, *args):
+        """Надсилає запит шарду та чекає відповіді (канал шарда повинен бути заблокований)."""
+        connection = self._workers[shard].connection
+        connection.send((op, args))
+        ok, value = connection.recv()
+        if not ok:
+            raise value
+        return value
+
+    def _call(self, shard : int, op : str, *args):
+        """Виконує запит у шарді."""
+        with self._workers[shard].lock:
+            return self._request(shard, op, *args)
+
+    def _call_many(self, requests : dict) -> dict:
+        """
+            Надсилає запити кільком шардам одночасно та чекає на всі відповіді.
+
+            Аргументи:
+                requests (dict): {номер шарда: (op, args)}.
+
+            Повертає:
+                dict: {номер шарда: результат}.
+
+            Винятки:
+                Exception: Перша помилка шардів (після отримання всіх відповідей).
+        """
+        shards = sorted(requests)
+        for shard in shards:
+            self._workers[shard].lock.acquire()
+        try:
+            for shard in shards:
+                self._workers[shard].connection.send(requests[shard])
+            replies = {shard: self._workers[shard].connection.recv() for shard in shards}
+        finally:
+            for shard in reversed(shards):
+                self._workers[shard].lock.release()
+        for ok, value in replies.values():
+            if not ok:
+                raise value
+        return {shard: value for shard, (_, value) in replies.items()}
+
+    def _call_all(self, op : str, *args) -> list:
+        """Виконує запит в усіх шардах паралельно та повертає результати у порядку шардів."""
+        results = self._call_many({shard: (op, args) for shard in range(self.shards)})
+        return [results[shard] for shard in range(self.shards)]
+
+    def add_user(self, first_name : str, last_name : str, email : str = None, phone_number : str = None) -> User:
+        """
+            Додає нового користувача (див. Bank.add_user).
+
+            Користувач зберігається у шарді user_id % shards, а його копія додається до кожного шарда,
+            у якому він відкриває рахунок.
+
+            Повертає:
+                User: Створений користувач.
+        """
+        user = User(first_name, last_name, email, phone_number)
+        with self._users_lock:
+            self._users[user._user_id] = user
+        self._call(user._user_id % self.shards, "ensure_user", user._dump())
+        log.info("Додано нового користувача шардованого банку: %s", user)
+        return user
+
+    def get_user(self, user_id : int) -> User:
+        """Повертає користувача за ID або None."""
+        return self._users.get(user_id)
+
+    def _create_account(self, kind : str, user : User, *args) -> int:
+        """Створює рахунок у наступному по черзі шарді та повертає його ID."""
+        if not isinstance(user, User) or self._users.get(user._user_id) is not user:
+            e = TypeError(f"user повинен бути користувачем цього банку, а не {user!r}")
+            log.exception("Неможливо створити рахунок", e)
+            raise e
+        return self._call(next(self._placement) % self.shards, "create_account", kind, user._dump(), args)
+
+    def create_checking_account(self, user : User, currency : str = "UAH") -> int:
+        """
+            Створює чековий рахунок (див. Bank.create_checking_account).
+
+            Повертає:
+                int: ID рахунку.
+        """
+        return self._create_account("checking", user, currency)
+
+    def create_savings_account(self, user : User, period : int, percent : float, currency : str = "UAH") -> int:
+        """
+            Створює ощадний рахунок (див. Bank.create_savings_account).
+
+            Повертає:
+                int: ID рахунку.
+        """
+        return self._create_account("savings", user, period, percent, currency)
+
+    def create_credit_account(self, user : User, limit : float, period : int, percent : float,
+                              currency : str = "UAH") -> int:
+        """
+            Створює кредитний рахунок (див. Bank.create_credit_account).
+
+            Повертає:
+                int: ID рахунку.
+        """
+        return self._create_account("credit", user, limit, period, percent, currency)
+
+    def balance(self, account_id : int) -> Money:
+        """
+            Повертає баланс рахунку.
+
+            Аргументи:
+                account_id (int): ID рахунку.
+
+            Повертає:
+                Money: Баланс або None, якщо рахунку немає.
+        """
+        return self._call(self.shard_of(account_id), "balance", account_id)
+
+    def deposit(self, account_id : int, amount, currency : str = None) -> int:
+        """
+            Поповнює рахунок.
+
+            Повертає:
+                int: Код результату (Bank.BATCH_*).
+        """
+        return self.execute_batch([("deposit", None, account_id, amount, currency)])[0]
+
+    def withdraw(self, account_id : int, amount, currency : str = None) -> int:
+        """
+            Знімає кошти з рахунку.
+
+            Повертає:
+                int: Код результату (Bank.BATCH_*).
+        """
+        return self.execute_batch([("withdraw", account_id, None, amount, currency)])[0]
+
+    def transfer(self, source_id : int, target_id : int, amount, currency : str = None) -> int:
+        """
+            Переказує кошти між рахунками (між шардами - за двофазним протоколом).
+
+            Повертає:
+                int: Код результату (Bank.BATCH_*).
+        """
+        return self.execute_batch([("transfer", source_id, target_id, amount, currency)])[0]
+
+    def _transfer(self, source_id : int, target_id : int, amount, currency : str) -> int:
+        """
+            Виконує переказ між шардами за двофазним протоколом.
+
+            Повертає:
+                int: Код результату (Bank.BATCH_*).
+        """
+        source, target = self.shard_of(source_id), self.shard_of(target_id)
+        token = next(self._tokens)
+        first, second = sorted((source, target))
+        with self._workers[first].lock, self._workers[second].lock:
+            code, amount = self._request(source, "prepare", token, "debit", source_id, target_id, amount, currency)
+            if code != Bank.BATCH_OK:
+                return code
+            try:
+                code, _ = self._request(target, "prepare", token, "credit", target_id, source_id, amount, None)
+            except Exception:
+                self._request(source, "abort", token)
+                raise
+            if code != Bank.BATCH_OK:
+                self._request(source, "abort", token)
+                return code
+            record = self._request(source, "commit", token, None)
+            self._request(target, "commit", token, record)
+        return Bank.BATCH_OK
+
+    def execute_batch(self, rows) -> array:
+        """
+            Виконує пакет операцій (див. Bank.execute_batch).
+
+            Рядки розділяються за шардами рахунків і виконуються пакетами в усіх шардах паралельно
+            (у межах шарда - у порядку пакета). Перед переказом між шардами виконуються накопичені рядки
+            двох задіяних шардів, а сам переказ - за двофазним протоколом до наступних рядків цих шардів.
+            Тож кожен рядок бачить результати всіх попередніх рядків, що стосуються його рахунків, як у Bank.execute_batch.
+
+            Аргументи:
+                rows (iterable): Рядки (kind, source_id, target_id, amount, currency).
+
+            Повертає:
+                array: Код результату для кожного рядка (array('b'), див. Bank.BATCH_*).
+        """
+        rows = list(rows)
+        status = array("b", bytes(len(rows)))
+        shards = self.shards
+        local = {}
+        for position, row in enumerate(rows):
+            if not isinstance(row, (tuple, list)) or len(row) != 5:
+                status[position] = Bank.BATCH_INVALID
+                continue
+            kind, source_id, target_id = row[0], row[1], row[2]
+            if kind == "transfer" and isinstance(source_id, int) and isinstance(target_id, int) \
+                    and source_id % shards != target_id % shards:
+                involved = {shard: local.pop(shard) for shard in (source_id % shards, target_id % shards) if shard in local}
+                self._execute_local(involved, status)
+                status[position] = self._transfer(source_id, target_id, row[3], row[4])
+                continue
+            account_id = source_id if isinstance(source_id, int) else target_id
+            positions, batch = local.setdefault(account_id % shards if isinstance(account_id, int) else 0, ([], []))
+            positions.append(position)
+            batch.append(row)
+        self._execute_local(local, status)
+        return status
+
+    def _execute_local(self, local : dict, status : array):
+        """
+            Виконує рядки сегмента пакета в усіх шардах паралельно та записує їхні коди у status.
+
+            Аргументи:
+                local (dict): {номер шарда: (позиції рядків у пакеті, рядки)}.
+                status (array): Коди результатів усього пакета.
+        """
+        if not local:
+            return
+        results = self._call_many({shard: ("execute_batch", (batch,)) for shard, (_, batch) in local.items()})
+        for shard, codes in results.items():
+            for position, code in zip(local[shard][0], codes):
+                status[position] = code
+
+    def stats(self) -> dict:
+        """
+            Повертає агреговані показники всіх шардів (див. Bank.stats).
+
+            Повертає:
+                dict: {"accounts", "blocked", "deposits": {валюта: Money}, "exposure": {валюта: Money}}.
+        """
+        result = {"accounts": 0, "blocked": 0, "deposits": {}, "exposure": {}}
+        for stats in self._call_all("stats"):
+            result["accounts"] += stats["accounts"]
+            result["blocked"] += stats["blocked"]
+            for name in ("deposits", "exposure"):
+                for currency, amount in stats[name].items():
+                    result[name][currency] = result[name].get(currency, Money(0, currency)) + amount
+        return result
+
+    def refresh_rates(self):
+        """
+            Завантажує курси валют у процесі маршрутизатора, публікує їх у спільній пам'яті
+            та повідомляє шарди, щоб вони одразу перечитали курси.
+        """
+        currate.refresh()
+        self._rates.publish(currate.rates)
+        self._call_all("reload_rates")
+
+    def _refresh_in_background(self):
+        """Завантажує та публікує курси у фоновому потоці, записуючи помилку в лог."""
+        try:
+            self.refresh_rates()
+        except Exception as e:
+            log.exception("Не вдалося завантажити курси валют для шардів", e)
+
+    def close(self):
+        """Закриває банки шардів (з фіксацією журналів) та зупиняє процеси."""
+        if not self._workers:
+            return
+        for worker in self._workers:
+            with worker.lock:
+                worker.connection.send(("close", ()))
+                worker.connection.recv()
+                worker.connection.close()
+            worker.process.join()
+        self._workers = []
+        self._rates.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
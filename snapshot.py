@@ -0,0 +1,286 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from concurrency import account_locks
+from store import AccountStore
+from transaction import TransactionRecord
+from logger import log
+
+"""
+Модуль snapshot містить компактні знімки стану банку.
+
+Знімок - бінарний файл з заголовком, таблицею секцій та колонками (масивами фіксованої ширини,
+вирівняними на 8 байтів), тож його можна відобразити у пам'ять (mmap) і завантажити
+кожну колонку одним копіюванням, без розбору окремих записів.
+
+Класи:
+- Snapshot: Знімок користувачів, рахунків, історії транзакцій та лічильників ID.
+"""
+
+_MAGIC = b"BANKSNP1"
+_HEADER = struct.Struct("<8sB7xqqqqqI4x")
+_SECTION = struct.Struct("<16s1s7xqq")
+_KINDS = ("transaction", "deposit", "transfer", "withdraw", "interest")
+
+
+def _align(offset : int) -> int:
+    """Вирівнює зміщення на 8 байтів."""
+    return (offset + 7) & ~7
+
+
+class Snapshot:
+    """
+        Знімок стану банку.
+
+        Знімок створюється у два етапи: capture швидко копіює змінний стан (колонки рахунків)
+        у потоці, що обробляє транзакції, а write кодує користувачів та історію транзакцій
+        і записує файл - його можна виконувати у фоновому потоці. Для рахунків-об'єктів capture
+        може лише зафіксувати список рахунків, а їх стан прочитати у write (defer_accounts).
+
+        Атрибути:
+        - seq: Номер останнього запису журналу, врахованого у знімку.
+        - offset: Зміщення у журналі, з якого починаються записи після знімка.
+        - counters: Наступні ID (користувача, рахунку, транзакції).
+        - columns: Колонки знімка {назва: array}.
+
+        Методи:
+        - capture: Створює знімок зі стану банку (класовий метод).
+        - write: Записує знімок у файл.
+        - load: Завантажує знімок з файлу (класовий метод).
+        - users: Дані користувачів для User._restore.
+        - account_store: Колонкове сховище рахунків зі знімка.
+        - transactions: Записи транзакцій.
+    """
+    __slots__ = ("seq", "offset", "counters", "columns", "_users", "_accounts", "_transactions", "_transaction_count")
+
+    def __init__(self, seq : int, offset : int, counters : tuple, columns : dict) -> None:
+        """
+            Ініціалізує знімок.
+
+            Аргументи:
+                seq (int): Номер останнього запису журналу, врахованого у знімку.
+                offset (int): Зміщення у журналі, з якого починаються записи після знімка.
+                counters (tuple): Наступні ID (користувача, рахунку, транзакції).
+                columns (dict): Колонки знімка {назва: array}.
+        """
+        self.seq = seq
+        self.offset = offset
+        self.counters = counters
+        self.columns = columns
+        self._users = None
+        self._accounts = None
+        self._transactions = None
+        self._transaction_count = 0
+
+    @classmethod
+    def capture(cls, users : dict, accounts, transactions : list, seq : int = 0, offset : int = 0,
+                counters : tuple = (1, 1, 1), defer_accounts : bool = False):
+        """
+            Копіює стан банку для подальшого запису.
+
+            Змінний стан рахунків копіюється одразу (для AccountStore - копіюванням колонок),
+            а користувачі та історія транзакцій, які після створення не змінюються,
+            лише фіксуються (список користувачів та довжина історії) і кодуються у write.
+
+            З defer_accounts для рахунків-об'єктів фіксується лише їх список, а стан читається у write
+            під блокуванням кожного рахунку. Прочитаний стан може бути новішим за seq; його виправляє
+            відтворення журналу після seq (записи журналу містять повний стан рахунків після операції),
+            тому defer_accounts використовується лише для банку з журналом.
+
+            Аргументи:
+                users (dict): Користувачі банку {user_id: User}.
+                accounts (dict, AccountStore): Рахунки банку.
+                transactions (list): Історія транзакцій (TransactionRecord), до якої лише дописують.
+                seq (int, optional): Номер останнього запису журналу. За замовчуванням 0.
+                offset (int, optional): Зміщення журналу після цього запису. За замовчуванням 0.
+                counters (tuple, optional): Наступні ID (користувача, рахунку, транзакції).
+                defer_accounts (bool, optional): Читати стан рахунків-об'єктів у write. За замовчуванням False.
+
+            Повертає:
+                Snapshot: Знімок, готовий до запису.
+        """
+        deferred = None
+        if isinstance(accounts, AccountStore):
+            columns = accounts.columns()
+        elif defer_accounts:
+            columns = {}
+            deferred = list(accounts.values())
+        else:
+            store = AccountStore()
+            for account in accounts.values():
+                store.add(account)
+            columns = {name: getattr(store, "_" + name) for name in AccountStore._columns}
+
+        snapshot = cls(seq, offset, tuple(counters), columns)
+        snapshot._accounts = deferred
+        snapshot._users = list(users.values())
+        snapshot._transactions = transactions
+        snapshot._transaction_count = len(transactions)
+        return snapshot
+
+    def _encode(self):
+        """Кодує зафіксованих у capture користувачів, рахунки (з defer_accounts) та історію транзакцій у колонки."""
+        if self._accounts is not None:
+            store = AccountStore()
+            for account in self._accounts:
+                # Під блокуванням рахунку, щоб не прочитати стан транзакції, що виконується (або відкочується).
+                with account_locks.hold(account):
+                    store.add(account)
+            self.columns.update((name, getattr(store, "_" + name)) for name in AccountStore._columns)
+            self._accounts = None
+        if self._users is None:
+            return
+
+        ids = array('q')
+        lengths = array('i')
+        parts = []
+        for user in self._users:
+            ids.append(user._user_id)
+            for value in (user._first_name, user._last_name, user._email, user._phone_number):
+                if value is None:
+                    lengths.append(-1)
+                else:
+                    lengths.append(len(value))
+                    parts.append(value)
+        self.columns["user_id"] = ids
+        self.columns["user_lengths"] = lengths
+        self.columns["user_text"] = array('B', "".join(parts).encode("utf-8"))
+
+        kinds = {kind: code for code, kind in enumerate(_KINDS)}
+        currencies = {currency: code for code, currency in enumerate(AccountStore._currencies)}
+        tx = {name: array(typecode) for name, typecode in (("tx_id", 'q'), ("tx_kind", 'b'), ("tx_source", 'q'),
+                                                            ("tx_target", 'q'), ("tx_amount", 'q'),
+                                                            ("tx_currency", 'b'), ("tx_timestamp", 'q'))}
+        for index in range(self._transaction_count):
+            record = self._transactions[index]
+            tx["tx_id"].append(record.transaction_id)
+            tx["tx_kind"].append(kinds[record.kind])
+            tx["tx_source"].append(-1 if record.source_id is None else record.source_id)
+            tx["tx_target"].append(-1 if record.target_id is None else record.target_id)
+            tx["tx_amount"].append(record.amount)
+            tx["tx_currency"].append(currencies.get(record.currency, -1))
+            tx["tx_timestamp"].append(record.timestamp)
+        self.columns.update(tx)
+        self._users = self._transactions = None
+
+    def write(self, path : str):
+        """
+            Записує знімок у файл.
+
+            Файл спочатку записується поруч (path + ".tmp"), фіксується os.fsync і лише потім
+            атомарно замінює попередній знімок, тож після збою завжди лишається цілий знімок.
+
+            Аргументи:
+                path (str): Шлях до файлу знімка.
+        """
+        self._encode()
+        names = list(self.columns)
+        position = _align(_HEADER.size + _SECTION.size * len(names))
+        sections = []
+        for name in names:
+            column = self.columns[name]
+            sections.append(_SECTION.pack(name.encode("ascii"), column.typecode.encode("ascii"), position, len(column)))
+            position = _align(position + len(column) * column.itemsize)
+
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, sys.byteorder == "big", self.seq, self.offset, *self.counters, len(names)))
+            file.write(b"".join(sections))
+            for name in names:
+                file.write(b"\0" * (_align(file.tell()) - file.tell()))
+                self.columns[name].tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path : str):
+        """
+            Завантажує знімок з файлу, відображеного у пам'ять.
+
+            Аргументи:
+                path (str): Шлях до файлу знімка.
+
+            Повертає:
+                Snapshot: Завантажений знімок.
+
+            Винятки:
+                ValueError: Якщо файл не є знімком банку.
+        """
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if len(mapped) < _HEADER.size:
+                magic = None
+            else:
+                magic, big_endian, seq, offset, next_user, next_account, next_transaction, count = \
+                    _HEADER.unpack_from(mapped, 0)
+            if magic != _MAGIC:
+                e = ValueError(f"Файл {path} не є знімком банку")
+                log.exception("Неможливо завантажити знімок", e)
+                raise e
+
+            columns = {}
+            view = memoryview(mapped)
+            try:
+                for index in range(count):
+                    name, typecode, start, length = _SECTION.unpack_from(mapped, _HEADER.size + index * _SECTION.size)
+                    column = array(typecode.decode("ascii"))
+                    column.frombytes(view[start:start + length * column.itemsize])
+                    if bool(big_endian) != (sys.byteorder == "big"):
+                        column.byteswap()
+                    columns[name.rstrip(b"\0").decode("ascii")] = column
+            finally:
+                view.release()
+        return cls(seq, offset, (next_user, next_account, next_transaction), columns)
+
+    def users(self):
+        """
+            Повертає дані користувачів знімка.
+
+            Повертає:
+                generator: Словники з ключами id, first_name, last_name, email, phone_number.
+        """
+        text = self.columns["user_text"].tobytes().decode("utf-8")
+        lengths = self.columns["user_lengths"]
+        position = 0
+        index = 0
+        for user_id in self.columns["user_id"]:
+            values = []
+            for length in lengths[index:index + 4]:
+                if length < 0:
+                    values.append(None)
+                else:
+                    values.append(text[position:position + length])
+                    position += length
+            index += 4
+            yield {"id": user_id, "first_name": values[0], "last_name": values[1],
+                   "email": values[2], "phone_number": values[3]}
+
+    def account_store(self, users : dict) -> AccountStore:
+        """
+            Створює колонкове сховище з колонок рахунків знімка (без копіювання).
+
+            Аргументи:
+                users (dict): Словник користувачів {user_id: User}.
+
+            Повертає:
+                AccountStore: Сховище рахунків.
+        """
+        return AccountStore.from_columns(users, self.columns)
+
+    def transactions(self):
+        """
+            Повертає записи транзакцій знімка.
+
+            Повертає:
+                generator: Записи TransactionRecord у порядку виконання.
+        """
+        columns = self.columns
+        currencies = AccountStore._currencies
+        for transaction_id, kind, source, target, amount, currency, timestamp in zip(
+                columns["tx_id"], columns["tx_kind"], columns["tx_source"], columns["tx_target"],
+                columns["tx_amount"], columns["tx_currency"], columns["tx_timestamp"]):
+            yield TransactionRecord(transaction_id, _KINDS[kind], None if source < 0 else source,
+                                    None if target < 0 else target, amount,
+                                    currencies[currency] if currency >= 0 else None, timestamp)
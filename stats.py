@@ -0,0 +1,178 @@
+import threading
+from accounts import Credit_account, observe_balances
+
+"""
+Модуль stats містить агреговані показники банку, що оновлюються інкрементно.
+
+Класи:
+- BankStats: Сумарні залишки на рахунках та кредитна заборгованість у кожній валюті.
+"""
+
+
+def _contribution(account) -> tuple:
+    """
+        Повертає внесок рахунку до агрегатів.
+
+        Аргументи:
+            account (Cheking_account, Savings_account, Credit_account): Рахунок.
+
+        Повертає:
+            tuple: ((показник, валюта), сума у мінорних одиницях), де показник - "deposits" (залишок чекового
+            чи ощадного рахунку) або "exposure" (заборгованість за кредитним рахунком: _limit - _balance + _credit).
+    """
+    if isinstance(account, Credit_account):
+        return ("exposure", account._currency), \
+            account._limit._minor - account._balance._minor + account._credit._minor
+    return ("deposits", account._currency), account._balance._minor
+
+
+class BankStats:
+    """
+        Агреговані показники банку.
+
+        Замість перебору всіх рахунків показники оновлюються на різницю внеску кожного зміненого
+        рахунку: до операції внесок запам'ятовується (capture), після неї - замінюється новим (update).
+        Обидва кроки виконуються під блокуванням рахунку, тож паралельні операції над різними
+        рахунками оновлюють показники незалежно. Якщо показники створено для рахунків банку, вони також
+        підписуються на зміни балансів (observe_balances), тож враховують і прямі виклики deposit, withdraw,
+        Transaction.execute та calculate_interest.
+
+        Методи:
+        - capture: Запам'ятовує внесок рахунків перед операцією.
+        - update: Замінює запам'ятований внесок рахунків поточним.
+        - add: Додає внесок нового рахунку.
+        - add_states: Додає внесок пакета нових рахунків за їхніми станами.
+        - _balance_changed: Враховує зміну балансу рахунку банку (викликається підпискою observe_balances).
+        - rebuild: Перераховує показники з усіх рахунків.
+        - totals: Повертає поточні показники.
+        - recompute: Обчислює показники повним перебором рахунків (статичний метод).
+    """
+    __slots__ = ("_totals", "_lock", "_accounts", "__weakref__")
+
+    def __init__(self, accounts = None) -> None:
+        """
+            Ініціалізує порожні показники.
+
+            Аргументи:
+                accounts (dict, AccountStore, optional): Рахунки банку. Якщо вказано, показники підписуються
+                    на зміни балансів цих рахунків. За замовчуванням None.
+        """
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._accounts = accounts
+        if accounts is not None:
+            observe_balances(self)
+
+    @staticmethod
+    def capture(accounts) -> list:
+        """
+            Запам'ятовує внесок рахунків перед операцією.
+
+            Аргументи:
+                accounts (iterable): Рахунки операції.
+
+            Повертає:
+                list: Внески рахунків (передаються у update).
+        """
+        return [_contribution(account) for account in accounts]
+
+    def update(self, before : list, accounts):
+        """
+            Замінює запам'ятований внесок рахунків поточним.
+
+            Аргументи:
+                before (list): Внески, повернуті capture до операції.
+                accounts (iterable): Ті самі рахунки після операції.
+        """
+        after = [_contribution(account) for account in accounts]
+        with self._lock:
+            totals = self._totals
+            for key, minor in before:
+                totals[key] = totals.get(key, 0) - minor
+            for key, minor in after:
+                totals[key] = totals.get(key, 0) + minor
+
+    def _balance_changed(self, account, balance : int, credit : int):
+        """
+            Враховує зміну балансу та кредиту рахунку, якщо рахунок належить банку.
+
+            Аргументи:
+                account (Cheking_account, Savings_account, Credit_account): Рахунок.
+                balance (int): Зміна балансу у мінорних одиницях.
+                credit (int): Зміна кредиту у мінорних одиницях.
+        """
+        if self._accounts.get(account._account_id) != account:
+            return
+        if isinstance(account, Credit_account):
+            key, minor = ("exposure", account._currency), credit - balance
+        else:
+            key, minor = ("deposits", account._currency), balance
+        with self._lock:
+            self._totals[key] = self._totals.get(key, 0) + minor
+
+    def add(self, account):
+        """
+            Додає внесок нового рахунку.
+
+            Аргументи:
+                account (Cheking_account, Savings_account, Credit_account): Рахунок.
+        """
+        self.update((), (account,))
+
+    def add_states(self, states : list):
+        """
+            Додає внесок пакета нових рахунків за їхніми станами (без читання властивостей рахунків).
+
+            Аргументи:
+                states (list): Стани рахунків у форматі _dump (ключі type, currency, balance, а для
+                    кредитних - limit та credit).
+        """
+        sums = {}
+        for state in states:
+            if state["type"] == Credit_account._kind:
+                key, minor = ("exposure", state["currency"]), state["limit"] - state["balance"] + state["credit"]
+            else:
+                key, minor = ("deposits", state["currency"]), state["balance"]
+            sums[key] = sums.get(key, 0) + minor
+        with self._lock:
+            totals = self._totals
+            for key, minor in sums.items():
+                totals[key] = totals.get(key, 0) + minor
+
+    def rebuild(self, accounts):
+        """
+            Перераховує показники з усіх рахунків (після відновлення стану банку).
+
+            Аргументи:
+                accounts (iterable): Усі рахунки банку.
+        """
+        totals = self.recompute(accounts)
+        with self._lock:
+            self._totals = totals
+
+    def totals(self) -> dict:
+        """
+            Повертає поточні показники.
+
+            Повертає:
+                dict: {(показник, валюта): сума у мінорних одиницях}.
+        """
+        with self._lock:
+            return dict(self._totals)
+
+    @staticmethod
+    def recompute(accounts) -> dict:
+        """
+            Обчислює показники повним перебором рахунків.
+
+            Аргументи:
+                accounts (iterable): Усі рахунки банку.
+
+            Повертає:
+                dict: {(показник, валюта): сума у мінорних одиницях}.
+        """
+        totals = {}
+        for account in accounts:
+            key, minor = _contribution(account)
+            totals[key] = totals.get(key, 0) + minor
+        return totals
@@ -0,0 +1,502 @@
+import datetime
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from accounts import Cheking_account, Savings_account, Credit_account
+from money import Money, _money
+from logger import log
+
+"""
+Модуль store містить колонкове сховище рахунків.
+
+Класи:
+- AccountStore: Сховище рахунків у вигляді паралельних масивів (колонок).
+- CheckingRow, SavingsRow, CreditRow: Легкі представлення рахунків, що читають і змінюють один рядок сховища.
+"""
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """Повертає модуль numpy (імпортується при першому виклику, а не під час імпорту модуля) або None."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class _AccountRow:
+    """
+        Властивості рахунку, що читають і записують значення у колонки AccountStore.
+
+        Класи-представлення успадковуються від цього класу та відповідного класу рахунку,
+        тож усі методи рахунку (deposit, withdraw, calculate_interest, ...) працюють
+        без змін, але стан зберігається лише у колонках.
+    """
+    __slots__ = ()
+
+    @property
+    def _account_id(self):
+        return self._store._ids[self._row]
+
+    @property
+    def _currency(self):
+        return self._store._currencies[self._store._currency[self._row]]
+
+    @property
+    def _owner(self):
+        return self._store._users.get(self._store._owner[self._row])
+
+    @property
+    def _balance(self):
+        return _money(self._store._balance[self._row], self._currency)
+
+    @_balance.setter
+    def _balance(self, value : Money):
+        self._store._balance[self._row] = value._minor
+
+    @property
+    def _blocked(self):
+        return bool(self._store._blocked[self._row])
+
+    @_blocked.setter
+    def _blocked(self, value : bool):
+        self._store._blocked[self._row] = value
+
+    @property
+    def _last_interest_date(self):
+        return datetime.date.fromordinal(self._store._last_interest[self._row])
+
+    @_last_interest_date.setter
+    def _last_interest_date(self, value : datetime.date):
+        self._store._last_interest[self._row] = value.toordinal()
+
+    @property
+    def _period(self):
+        return self._store._period[self._row]
+
+    @property
+    def _percent(self):
+        return self._store._percent[self._row]
+
+    @property
+    def _limit(self):
+        return _money(self._store._limit[self._row], self._currency)
+
+    @property
+    def _credit(self):
+        return _money(self._store._credit[self._row], self._currency)
+
+    @_credit.setter
+    def _credit(self, value : Money):
+        self._store._credit[self._row] = value._minor
+
+    def __eq__(self, other):
+        if isinstance(other, _AccountRow):
+            return self._store is other._store and self._row == other._row
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+
+class CheckingRow(_AccountRow, Cheking_account):
+    """Представлення чекового рахунку у колонковому сховищі."""
+    __slots__ = ("_store", "_row")
+
+
+class SavingsRow(_AccountRow, Savings_account):
+    """Представлення ощадного рахунку у колонковому сховищі."""
+    __slots__ = ("_store", "_row")
+
+
+class CreditRow(_AccountRow, Credit_account):
+    """Представлення кредитного рахунку у колонковому сховищі."""
+    __slots__ = ("_store", "_row")
+
+
+class AccountStore:
+    """
+        Колонкове сховище рахунків.
+
+        Замість окремого об'єкта з __dict__ на кожен рахунок зберігає паралельні масиви:
+        id, id власника, код валюти, баланс у мінорних одиницях, прапорець блокування,
+        тип рахунку, ліміт, кредит, період, ставку та дату останнього нарахування.
+        Рахунки повертаються як легкі представлення (CheckingRow, SavingsRow, CreditRow),
+        а агрегатні запити виконуються безпосередньо по колонках.
+
+        Сховище підтримує інтерфейс словника {account_id: рахунок}, тож може
+        використовуватись як Bank._accounts.
+
+        Атрибути класу:
+        - _currencies: Валюти, індекс у цьому списку зберігається у колонці валюти.
+        - _types: Класи рахунків, індекс у цьому списку зберігається у колонці типу.
+        - _views: Класи представлень для кожного типу.
+
+        Методи:
+        - add: Переносить стан рахунку у колонки та повертає його представлення.
+        - extend: Переносить стан кількох нових рахунків у колонки одним проходом по кожній колонці.
+        - extend_states: Доповнює колонки станами нових рахунків (формат _dump) без створення об'єктів рахунків.
+        - get: Повертає представлення рахунку за ID.
+        - values, items, keys: Ітерація по рахунках, як у словнику.
+        - total_balance: Сума балансів по колонці.
+        - blocked_count: Кількість заблокованих рахунків.
+        - select: ID рахунків, що відповідають фільтрам.
+        - column: Повертає колонку (як numpy.ndarray, якщо NumPy встановлено).
+        - columns: Повертає копії всіх колонок.
+        - from_columns: Створює сховище з готових колонок (класовий метод).
+    """
+    _currencies = tuple(Cheking_account._suported_currency)
+    _types = (Cheking_account, Savings_account, Credit_account)
+    _views = (CheckingRow, SavingsRow, CreditRow)
+    _columns = ("ids", "owner", "currency", "balance", "blocked", "type", "limit", "credit",
+                "period", "percent", "last_interest")
+
+    def __init__(self, users : dict = None) -> None:
+        """
+            Ініціалізує порожнє сховище.
+
+            Аргументи:
+                users (dict, optional): Словник користувачів {user_id: User} для відновлення власників рахунків.
+        """
+        self._users = users if users is not None else {}
+        self._ids = array('q')
+        self._owner = array('q')
+        self._currency = array('b')
+        self._balance = array('q')
+        self._blocked = array('b')
+        self._type = array('b')
+        self._limit = array('q')
+        self._credit = array('q')
+        self._period = array('i')
+        self._percent = array('d')
+        self._last_interest = array('i')
+
+    def add(self, account : (Cheking_account, Savings_account, Credit_account)):
+        """
+            Переносить стан рахунку у колонки сховища.
+
+            ID рахунків повинні додаватись у порядку зростання (так їх видає Cheking_account.change_id),
+            що дозволяє шукати рядок бінарним пошуком без окремого словника.
+
+            Аргументи:
+                account (Cheking_account, Savings_account, Credit_account): Новий рахунок.
+
+            Повертає:
+                CheckingRow, SavingsRow, CreditRow: Представлення рахунку у сховищі.
+
+            Винятки:
+                TypeError: Якщо account не є рахунком підтримуваного типу.
+                ValueError: Якщо ID рахунку не більший за вже збережені.
+        """
+        try:
+            type_code = self._types.index(type(account))
+        except ValueError:
+            e = TypeError(f"Непідтримуваний тип рахунку: {type(account).__name__}")
+            log.exception("Неможливо додати рахунок до сховища", e)
+            raise e from None
+
+        if self._ids and account._account_id <= self._ids[-1]:
+            e = ValueError(f"ID рахунку {account._account_id} повинен бути більшим за {self._ids[-1]}")
+            log.exception("Неможливо додати рахунок до сховища", e)
+            raise e
+
+        self._ids.append(account._account_id)
+        self._owner.append(account._owner._user_id)
+        self._currency.append(self._currencies.index(account._currency))
+        self._balance.append(account._balance._minor)
+        self._blocked.append(account._blocked)
+        self._type.append(type_code)
+        if type_code:
+            self._period.append(account._period)
+            self._percent.append(account._percent)
+            self._last_interest.append(account._last_interest_date.toordinal())
+        else:
+            self._period.append(0)
+            self._percent.append(0.0)
+            self._last_interest.append(0)
+        if type_code == 2:
+            self._limit.append(account._limit._minor)
+            self._credit.append(account._credit._minor)
+        else:
+            self._limit.append(0)
+            self._credit.append(0)
+        return self._view(len(self._ids) - 1)
+
+    def extend(self, accounts) -> list:
+        """
+            Переносить стан кількох нових рахунків у колонки сховища (для пакетного створення рахунків).
+
+            Спочатку перевіряються всі рахунки, тож при помилці сховище не змінюється; потім кожна
+            колонка доповнюється одним викликом array.extend.
+
+            Аргументи:
+                accounts (iterable): Нові рахунки у порядку зростання ID.
+
+            Повертає:
+                list: Представлення рахунків у сховищі (CheckingRow, SavingsRow, CreditRow).
+
+            Винятки:
+                TypeError: Якщо рахунок не є рахунком підтримуваного типу.
+                ValueError: Якщо ID рахунків не зростають або не більші за вже збережені.
+        """
+        accounts = list(accounts)
+        codes = array('b')
+        last = self._ids[-1] if self._ids else None
+        for account in accounts:
+            try:
+                codes.append(self._types.index(type(account)))
+            except ValueError:
+                e = TypeError(f"Непідтримуваний тип рахунку: {type(account).__name__}")
+                log.exception("Неможливо додати рахунки до сховища", e)
+                raise e from None
+            if last is not None and account._account_id <= last:
+                e = ValueError(f"ID рахунку {account._account_id} повинен бути більшим за {last}")
+                log.exception("Неможливо додати рахунки до сховища", e)
+                raise e
+            last = account._account_id
+
+        start = len(self._ids)
+        currencies = self._currencies
+        typed = list(zip(accounts, codes))
+        self._ids.extend([account._account_id for account in accounts])
+        self._owner.extend([account._owner._user_id for account in accounts])
+        self._currency.extend([currencies.index(account._currency) for account in accounts])
+        self._balance.extend([account._balance._minor for account in accounts])
+        self._blocked.extend([account._blocked for account in accounts])
+        self._type.extend(codes)
+        self._period.extend([account._period if code else 0 for account, code in typed])
+        self._percent.extend([account._percent if code else 0.0 for account, code in typed])
+        self._last_interest.extend([account._last_interest_date.toordinal() if code else 0 for account, code in typed])
+        self._limit.extend([account._limit._minor if code == 2 else 0 for account, code in typed])
+        self._credit.extend([account._credit._minor if code == 2 else 0 for account, code in typed])
+        return [self._view(row) for row in range(start, len(self._ids))]
+
+    def extend_states(self, states : list) -> list:
+        """
+            Доповнює колонки станами нових рахунків без створення об'єктів рахунків (для пакетного створення
+            рахунків та відновлення з журналу).
+
+            Аргументи:
+                states (list): Стани рахунків у форматі _dump (з ключами type, id, owner, currency, balance, blocked,
+                    а для ощадних і кредитних - period, percent, last_interest; для кредитних - limit, credit)
+                    у порядку зростання ID.
+
+            Повертає:
+                list: Представлення рахунків у сховищі (CheckingRow, SavingsRow, CreditRow).
+
+            Винятки:
+                ValueError: Якщо тип рахунку невідомий або ID рахунків не зростають чи не більші за вже збережені.
+        """
+        kinds = {cls._kind: code for code, cls in enumerate(self._types)}
+        codes = array('b')
+        last = self._ids[-1] if self._ids else None
+        for state in states:
+            code = kinds.get(state["type"])
+            if code is None or (last is not None and state["id"] <= last):
+                e = ValueError(f"Невідомий тип рахунку або ID не більший за {last}: {state!r}")
+                log.exception("Неможливо додати рахунки до сховища", e)
+                raise e
+            codes.append(code)
+            last = state["id"]
+
+        start = len(self._ids)
+        currencies = {currency: code for code, currency in enumerate(self._currencies)}
+        typed = list(zip(states, codes))
+        self._ids.extend([state["id"] for state in states])
+        self._owner.extend([state["owner"] for state in states])
+        self._currency.extend([currencies[state["currency"]] for state in states])
+        self._balance.extend([state["balance"] for state in states])
+        self._blocked.extend([state["blocked"] for state in states])
+        self._type.extend(codes)
+        self._period.extend([state["period"] if code else 0 for state, code in typed])
+        self._percent.extend([state["percent"] if code else 0.0 for state, code in typed])
+        self._last_interest.extend([state["last_interest"] if code else 0 for state, code in typed])
+        self._limit.extend([state["limit"] if code == 2 else 0 for state, code in typed])
+        self._credit.extend([state["credit"] if code == 2 else 0 for state, code in typed])
+        view = self._view
+        return [view(row) for row in range(start, len(self._ids))]
+
+    def _view(self, row : int):
+        """
+            Створює представлення рахунку для рядка.
+
+            Аргументи:
+                row (int): Номер рядка.
+
+            Повертає:
+                CheckingRow, SavingsRow, CreditRow: Представлення рахунку.
+        """
+        view = object.__new__(self._views[self._type[row]])
+        view._store = self
+        view._row = row
+        return view
+
+    def _find(self, account_id : int) -> int:
+        """
+            Шукає рядок рахунку бінарним пошуком по колонці ID.
+
+            Повертає:
+                int: Номер рядка або -1, якщо рахунку немає.
+        """
+        row = bisect_left(self._ids, account_id)
+        if row < len(self._ids) and self._ids[row] == account_id:
+            return row
+        return -1
+
+    def get(self, account_id : int, default=None):
+        row = self._find(account_id)
+        return self._view(row) if row >= 0 else default
+
+    def __getitem__(self, account_id : int):
+        row = self._find(account_id)
+        if row < 0:
+            raise KeyError(account_id)
+        return self._view(row)
+
+    def __setitem__(self, account_id : int, account):
+        if account_id != account._account_id:
+            raise KeyError(account_id)
+        self.add(account)
+
+    def __contains__(self, account_id) -> bool:
+        return self._find(account_id) >= 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def keys(self):
+        return iter(self._ids)
+
+    def values(self):
+        return (self._view(row) for row in range(len(self._ids)))
+
+    def items(self):
+        return ((self._ids[row], self._view(row)) for row in range(len(self._ids)))
+
+    def column(self, name : str):
+        """
+            Повертає копію колонки сховища.
+
+            Колонка копіюється (одне копіювання пам'яті): представлення numpy над живим масивом заборонило б
+            array.extend у add/extend_states (BufferError), доки воно існує.
+
+            Аргументи:
+                name (str): Назва колонки (ids, owner, currency, balance, blocked, type, limit, credit,
+                    period, percent, last_interest).
+
+            Повертає:
+                numpy.ndarray, array: Копія колонки - numpy.ndarray, якщо NumPy встановлено, інакше array.
+
+            Винятки:
+                KeyError: Якщо колонки не існує.
+        """
+        if name not in self._columns:
+            raise KeyError(name)
+        data = getattr(self, "_" + name)[:]
+        numpy = _numpy()
+        if numpy is not None and len(data):
+            return numpy.frombuffer(data, dtype=data.typecode)
+        return data
+
+    def columns(self) -> dict:
+        """
+            Повертає копії всіх колонок сховища (копіювання масиву - одне копіювання пам'яті).
+
+            Повертає:
+                dict: {назва колонки: array}.
+        """
+        return {name: getattr(self, "_" + name)[:] for name in self._columns}
+
+    @classmethod
+    def from_columns(cls, users : dict, columns : dict):
+        """
+            Створює сховище з готових колонок (наприклад, завантажених зі знімка).
+
+            Аргументи:
+                users (dict): Словник користувачів {user_id: User}.
+                columns (dict): {назва колонки: array} для всіх колонок сховища.
+
+            Повертає:
+                AccountStore: Нове сховище, що використовує передані масиви.
+
+            Винятки:
+                ValueError: Якщо колонки відсутні, мають різну довжину або невірний тип.
+        """
+        store = cls(users)
+        for name in cls._columns:
+            column = columns.get(name)
+            expected = getattr(store, "_" + name)
+            if column is None or column.typecode != expected.typecode or len(column) != len(columns["ids"]):
+                e = ValueError(f"Колонка {name} відсутня або пошкоджена")
+                log.exception("Неможливо створити сховище з колонок", e)
+                raise e
+            setattr(store, "_" + name, column)
+        return store
+
+    def _mask(self, currency : str = None, account_type : type = None, blocked : bool = None):
+        """
+            Повертає ітератор номерів рядків, що відповідають фільтрам.
+        """
+        currency_code = self._currencies.index(currency) if currency is not None else None
+        type_code = self._types.index(account_type) if account_type is not None else None
+        # Колонка типу доповнюється після ids, валюти, балансу та блокування, тож ці рядки вже заповнено.
+        for row in range(len(self._type)):
+            if currency_code is not None and self._currency[row] != currency_code:
+                continue
+            if type_code is not None and self._type[row] != type_code:
+                continue
+            if blocked is not None and bool(self._blocked[row]) != blocked:
+                continue
+            yield row
+
+    def total_balance(self, currency : str, account_type : type = None) -> Money:
+        """
+            Рахує суму балансів рахунків у валюті безпосередньо по колонках.
+
+            Аргументи:
+                currency (str): Валюта рахунків.
+                account_type (type, optional): Клас рахунку (точний тип) для фільтрації.
+
+            Повертає:
+                Money: Сума балансів.
+        """
+        if _numpy() is not None and len(self._type):
+            # Колонки копіюються, тому рахунки можна додавати паралельно; враховуються лише рядки,
+            # повністю додані до початку підрахунку.
+            rows = len(self._type)
+            selected = self.column("currency")[:rows] == self._currencies.index(currency)
+            if account_type is not None:
+                selected &= self.column("type")[:rows] == self._types.index(account_type)
+            return Money(int(self.column("balance")[:rows][selected].sum()), currency)
+        balance = self._balance
+        return Money(sum(balance[row] for row in self._mask(currency, account_type)), currency)
+
+    def blocked_count(self) -> int:
+        """
+            Повертає кількість заблокованих рахунків.
+
+            Повертає:
+                int: Кількість рахунків з прапорцем блокування.
+        """
+        if _numpy() is not None and len(self._type):
+            return int(self.column("blocked").sum())
+        return sum(self._blocked)
+
+    def select(self, currency : str = None, account_type : type = None, blocked : bool = None) -> list:
+        """
+            Повертає ID рахунків, що відповідають усім заданим фільтрам.
+
+            Аргументи:
+                currency (str, optional): Валюта рахунку.
+                account_type (type, optional): Клас рахунку (точний тип).
+                blocked (bool, optional): Статус блокування.
+
+            Повертає:
+                list: ID рахунків.
+        """
+        ids = self._ids
+        return [ids[row] for row in self._mask(currency, account_type, blocked)]
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from logger import log
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    """Вимикає логування на час тесту (тести навмисно викликають помилки)."""
+    log.set_level("EXCEPTION")
+    yield
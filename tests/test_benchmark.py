@@ -0,0 +1,19 @@
+from benchmark import compare_results
+
+
+def scenario(ops, p99):
+    return {"ops_per_sec": ops, "p50_us": 1.0, "p99_us": p99, "peak_rss_delta_kb": 0}
+
+
+def test_compare_reports_missing_and_slower_scenarios():
+    baseline = {"scenarios": {"deposit": scenario(1000, 2.0), "convert": scenario(5000, 1.0)}}
+    current = {"scenarios": {"deposit": scenario(800, 2.0)}}
+    assert compare_results(baseline, current) == [
+        ("deposit", "ops_per_sec", 1000, 800),
+        ("convert", "missing", 5000, None),
+    ]
+
+
+def test_compare_accepts_equal_results():
+    baseline = {"scenarios": {"deposit": scenario(1000, 2.0)}}
+    assert compare_results(baseline, baseline) == []
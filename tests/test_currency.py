@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+from currency import CurrencyRates, RateSource, StaticRateSource
+
+RATES = {"USD": {"buy": 41.0, "sale": 41.5}, "EUR": {"buy": 45.0, "sale": 45.6}}
+
+
+class SlowRateSource(RateSource):
+    """Джерело, що віддає курси лише після release."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def fetch(self) -> dict:
+        self.release.wait(5)
+        return RATES
+
+
+def test_first_conversion_does_not_wait_for_source():
+    source = SlowRateSource()
+    rates = CurrencyRates(source)
+    started = time.monotonic()
+    with pytest.raises(Exception, match="ще не завантажено"):
+        rates.convert(100, "USD", "UAH")
+    assert time.monotonic() - started < 1
+
+    source.release.set()
+    deadline = time.monotonic() + 5
+    while rates._last_usage is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert rates.convert(100, "USD", "UAH") == pytest.approx(4150)
+
+
+def test_preload_loads_rates_synchronously():
+    rates = CurrencyRates(StaticRateSource(RATES))
+    rates.preload()
+    assert rates.convert(100, "USD", "UAH") == pytest.approx(4150)
+
+
+@pytest.mark.parametrize("options", [{"ttl": 0}, {"retry": -1}])
+def test_non_positive_intervals_raise_value_error(options):
+    with pytest.raises(ValueError):
+        CurrencyRates(StaticRateSource(RATES), **options)
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import journal
+from journal import Journal, iter_entries
+
+
+class FlakyFile:
+    """Обгортка файлу журналу, що записує лише частину перших failures пакетів і кидає OSError."""
+
+    def __init__(self, file, failures):
+        self._file = file
+        self.failures = failures
+
+    def write(self, data):
+        if self.failures:
+            self.failures -= 1
+            self._file.write(bytes(data[:len(data) // 2]))
+            raise OSError(5, "Input/output error")
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "test.journal")
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(Journal, "_RETRY_DELAY", 0)
+
+
+def seqs(path):
+    return [entry["seq"] for entry in iter_entries(path)]
+
+
+def test_transient_fsync_error_is_retried(path, monkeypatch):
+    fsync = os.fsync
+    calls = []
+
+    def flaky_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError(5, "Input/output error")
+        fsync(fd)
+
+    monkeypatch.setattr(journal.os, "fsync", flaky_fsync)
+    j = Journal(path, durable=True)
+    for i in range(5):
+        assert j.append({"op": "test", "i": i}) == i + 1
+    j.close()
+
+    assert seqs(path) == [1, 2, 3, 4, 5]
+    assert [entry["i"] for entry in iter_entries(path)] == [0, 1, 2, 3, 4]
+
+
+def test_partial_write_is_truncated_before_retry(path):
+    j = Journal(path, durable=True)
+    j.append({"op": "test", "i": 0})
+    j._file = FlakyFile(j._file, failures=2)
+    j.append({"op": "test", "i": 1})
+    j.append({"op": "test", "i": 2})
+    j.close()
+
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    assert seqs(path) == [1, 2, 3]
+
+
+def test_permanent_error_stops_journal_without_gaps(path):
+    j = Journal(path, durable=True)
+    j.append({"op": "test", "i": 0})
+    j._file = FlakyFile(j._file, failures=Journal._RETRIES + 1)
+
+    with pytest.raises(OSError):
+        j.append({"op": "test", "i": 1})
+    # Після зупинки нові записи не приймаються - жоден пізніший запис не може перекрити втрачений.
+    with pytest.raises(OSError):
+        j.append({"op": "test", "i": 2})
+    with pytest.raises(OSError):
+        j.flush()
+    j.wait(1)
+    j.close()
+
+    assert seqs(path) == [1]
+    with open(path, "rb") as f:
+        assert f.read().endswith(b"\n")
+    reopened = Journal(path, durable=True)
+    assert reopened.seq == 1
+    assert reopened.append({"op": "test", "i": 1}) == 2
+    reopened.close()
+    assert seqs(path) == [1, 2]
+
+
+def test_failure_fails_every_seq_from_first_lost(path, monkeypatch):
+    j = Journal(path, durable=False)
+    first = j.append({"op": "test", "i": 0})
+    j.flush()
+    monkeypatch.setattr(journal.os, "fsync", lambda fd: (_ for _ in ()).throw(OSError(5, "Input/output error")))
+    lost = j.append({"op": "test", "i": 1})
+    with pytest.raises(OSError):
+        j.wait(lost)
+    j.wait(first)
+    monkeypatch.undo()
+    j.close()
+    assert seqs(path) == [first]
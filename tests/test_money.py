@@ -0,0 +1,19 @@
+from money import Money
+
+
+def test_money_is_not_equal_to_numbers():
+    assert Money.of(1, "UAH") != 1
+    assert Money.of(0.001) != 0.001
+    assert 1 not in {Money.of(1, "UAH")}
+
+
+def test_equal_money_has_equal_hash():
+    assert Money.of(0.1) + Money.of(0.2) == Money.of("0.3")
+    assert hash(Money.of(0.1) + Money.of(0.2)) == hash(Money.of("0.3"))
+    assert Money.of(1, "UAH") != Money.of(1, "USD")
+    assert Money.of(1, "UAH") in {Money.of("1.00", "UAH")}
+
+
+def test_ordering_with_numbers():
+    assert Money.of(1) < 2
+    assert Money.of(0.05) <= 0.05
@@ -0,0 +1,38 @@
+import pytest
+
+from bank import Bank
+from money import Money
+from sharding import ShardedBank
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    with ShardedBank(2) as bank:
+        yield bank
+
+
+def cross_shard_pair(bank, source_deposit, target_deposit):
+    user = bank.add_user("Ivan", "Ivanenko")
+    source = bank.create_checking_account(user)
+    target = bank.create_checking_account(user)
+    while bank.shard_of(target) == bank.shard_of(source):
+        target = bank.create_checking_account(user)
+    assert bank.deposit(source, source_deposit) == Bank.BATCH_OK
+    assert bank.deposit(target, target_deposit) == Bank.BATCH_OK
+    return source, target
+
+
+@pytest.mark.parametrize("amount, code", [(0.05, Bank.BATCH_INVALID), (500, Bank.BATCH_FUNDS)])
+def test_transfer_aborted_in_prepare_leaves_both_shards_unchanged(sharded, amount, code):
+    source, target = cross_shard_pair(sharded, 100, 10)
+    deposits = sharded.stats()["deposits"]
+
+    # 0.05: списання підготовлено, а зарахування відхилено - підготовлене списання скасовується (abort).
+    assert sharded.transfer(source, target, amount) == code
+
+    assert sharded.balance(source) == Money.of(100, "UAH")
+    assert sharded.balance(target) == Money.of(10, "UAH")
+    assert sharded.stats()["deposits"] == deposits
+    assert sharded.transfer(source, target, 30) == Bank.BATCH_OK
+    assert sharded.balance(source) == Money.of(70, "UAH")
+    assert sharded.balance(target) == Money.of(40, "UAH")
@@ -0,0 +1,42 @@
+import threading
+
+from bank import Bank
+from journal import Journal
+from money import Money
+from transaction import DepositTransaction, TransferTransaction
+
+
+def test_snapshot_during_transfers_restores_final_balances(tmp_path):
+    journal, snapshot = str(tmp_path / "bank.journal"), str(tmp_path / "bank.snap")
+    bank = Bank("Test", "Kyiv", journal=Journal(journal, durable=False), snapshot=snapshot)
+    user = bank.add_user("Ivan", "Ivanenko")
+    accounts = [bank.create_checking_account(user, "UAH") for _ in range(20)]
+    for account in accounts:
+        bank.execute(DepositTransaction(1000, account))
+
+    stop = threading.Event()
+
+    def transfer(shift):
+        i = 0
+        while not stop.is_set():
+            bank.execute(TransferTransaction(1, accounts[i % 20], accounts[(i + shift) % 20]))
+            i += 1
+
+    threads = [threading.Thread(target=transfer, args=(shift,)) for shift in (3, 7)]
+    for thread in threads:
+        thread.start()
+    for _ in range(20):
+        bank.snapshot(wait=True)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    expected = {account._account_id: account._balance for account in accounts}
+    bank.close()
+
+    restored = Bank("Test", "Kyiv", journal=Journal(journal, durable=False), snapshot=snapshot)
+    try:
+        assert restored._snapshot_seq > 0
+        assert {account_id: restored._accounts[account_id]._balance for account_id in expected} == expected
+        assert sum(expected.values(), Money(0, "UAH")) == Money.of(20000, "UAH")
+    finally:
+        restored.close()
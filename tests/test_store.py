@@ -0,0 +1,17 @@
+from bank import Bank
+from money import Money
+
+
+def test_column_is_a_copy():
+    bank = Bank("Test", "Kyiv", columnar=True)
+    user = bank.add_user("Ivan", "Ivanenko")
+    account = bank.create_checking_account(user, "UAH")
+    account.deposit(100)
+    balance = bank._accounts.column("balance")
+
+    # Колонка не утримує буфер сховища: нові рахунки додаються, а копія не змінюється.
+    other = bank.create_checking_account(user, "UAH")
+    other.deposit(50)
+    assert list(balance) == [10000]
+    assert bank._accounts.total_balance("UAH") == Money.of(150, "UAH")
+    assert bank._accounts.blocked_count() == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from bank import Bank
+from money import Money
+from transaction import CompositeTransaction, DepositTransaction, Transaction, TransferTransaction
+
+
+@pytest.fixture
+def bank():
+    bank = Bank("Test", "Kyiv")
+    yield bank
+    bank.close()
+
+
+def open_accounts(bank, *deposits):
+    user = bank.add_user("Ivan", "Ivanenko")
+    accounts = []
+    for amount in deposits:
+        account = bank.create_checking_account(user, "UAH")
+        if amount:
+            bank.execute(DepositTransaction(amount, account))
+        accounts.append(account)
+    return accounts
+
+
+def test_failed_deposit_leg_leaves_both_balances_unchanged(bank):
+    source, target = open_accounts(bank, 100, 10)
+    history = len(bank.transactions())
+
+    # Зняття 0.05 можливе, а поповнення на 0.05 - ні (мінімальна сума поповнення).
+    with pytest.raises(Exception):
+        bank.execute(TransferTransaction(0.05, source, target))
+
+    assert source._balance == Money.of(100, "UAH")
+    assert target._balance == Money.of(10, "UAH")
+    assert len(bank.transactions()) == history
+
+
+def test_failing_composite_leg_changes_nothing_and_consumes_reserved_ids(bank):
+    a, b, c = open_accounts(bank, 100, 50, 0)
+    history = len(bank.transactions())
+    transaction = CompositeTransaction([(30, a, b), (20, b, c), (500, c, a)])
+    reserved = transaction._ids
+
+    with pytest.raises(Exception):
+        bank.execute(transaction)
+
+    assert [account._balance for account in (a, b, c)] == [Money.of(100, "UAH"), Money.of(50, "UAH"), Money(0, "UAH")]
+    assert len(bank.transactions()) == history
+    assert len(reserved) == 3
+    assert Transaction._next_id() > reserved[-1]
+    record = bank.execute(TransferTransaction(10, a, b))
+    assert record.transaction_id not in reserved
@@ -0,0 +1,370 @@
+import cProfile
+import functools
+import heapq
+import io
+import itertools
+import pstats
+import threading
+import time
+import tracemalloc
+from accounts import Cheking_account
+from bank import Bank
+from currency import CurrencyRates
+from logger import Logger, log
+from money import Money
+from transaction import Transaction
+
+"""
+Модуль tracing містить засоби для пошуку повільних фаз виконання транзакцій.
+
+Режим трасування вмикається і вимикається під час роботи: увімкнення встановлює обгортки (хуки)
+на методи фаз (перевірка блокування, валідація та зміна балансів, конвертація валют, запис логу,
+фіксація у журналі), а вимкнення повертає оригінальні методи, тож вимкнене трасування не має
+накладних витрат. Кожен виклик Bank.execute, Bank.execute_batch чи Transaction.execute поза ними
+стає коренем дерева проміжків (span) з часом кожної фази у наносекундах; зберігаються лише
+найповільніші дерева.
+
+Класи:
+- Span: Проміжок виконання (фаза) з вкладеними проміжками.
+- Tracer: Трасувальник із хуками та найповільнішими трасами.
+
+Функції:
+- profile_call: Виконує функцію під cProfile та записує звіт у файл.
+- trace_memory: Виконує функцію під tracemalloc та записує звіт про виділення пам'яті у файл.
+
+Змінні:
+- tracer: Спільний трасувальник з хуками на фази транзакцій (за замовчуванням вимкнений).
+"""
+
+
+class Span:
+    """
+        Проміжок виконання (фаза) з вкладеними проміжками.
+
+        Атрибути:
+        - name: Назва фази (ім'я методу).
+        - detail: Додатковий опис кореневого проміжку (наприклад, ID транзакції) або None.
+        - start, end: Час початку та завершення (time.perf_counter_ns).
+        - children: Вкладені проміжки у порядку виконання.
+
+        Методи:
+        - duration: Тривалість у наносекундах (властивість).
+        - to_dict: Дерево проміжків у вигляді словника.
+        - format: Дерево проміжків у вигляді тексту.
+    """
+    __slots__ = ("name", "detail", "start", "end", "children")
+
+    def __init__(self, name : str, start : int, detail : str = None) -> None:
+        self.name = name
+        self.detail = detail
+        self.start = start
+        self.end = start
+        self.children = []
+
+    @property
+    def duration(self) -> int:
+        """Тривалість проміжку у наносекундах."""
+        return self.end - self.start
+
+    def to_dict(self) -> dict:
+        """
+            Повертає дерево проміжків у вигляді словника.
+
+            Повертає:
+                dict: {"name", "detail", "start_ns", "duration_ns", "children": [...]}.
+        """
+        return {"name": self.name, "detail": self.detail, "start_ns": self.start, "duration_ns": self.duration,
+                "children": [child.to_dict() for child in self.children]}
+
+    def format(self, indent : int = 0) -> str:
+        """
+            Повертає дерево проміжків у вигляді тексту: тривалість (мкс), власний час без вкладених фаз і назва.
+
+            Аргументи:
+                indent (int, optional): Рівень відступу. За замовчуванням 0.
+
+            Повертає:
+                str: Текст дерева.
+        """
+        own = self.duration - sum(child.duration for child in self.children)
+        title = f"{self.name} {self.detail}" if self.detail is not None else self.name
+        lines = [f"{self.duration / 1000:>12.3f} us {own / 1000:>10.3f} us  {'  ' * indent}{title}"]
+        lines.extend(child.format(indent + 1) for child in self.children)
+        return "\n".join(lines)
+
+
+class Tracer:
+    """
+        Трасувальник фаз виконання.
+
+        Хуки реєструються методом hook і встановлюються лише на час увімкненого трасування:
+        обгортка замінює метод у класі та в усіх його підкласах, що визначають метод самостійно.
+        Кореневий хук (root=True) починає нову трасу, якщо в потоці її ще немає; решта хуків записують
+        проміжки лише всередині траси. Завершені траси потрапляють до обмеженої купи найповільніших
+        (keep штук), тож пам'ять не зростає з кількістю транзакцій.
+
+        Атрибути:
+        - enabled: Чи увімкнено трасування (властивість).
+        - keep: Кількість найповільніших трас, що зберігаються.
+
+        Методи:
+        - hook: Реєструє метод, виклики якого записуються як проміжки.
+        - enable, disable: Вмикають та вимикають трасування (встановлюють та знімають хуки).
+        - slowest: Найповільніші траси.
+        - clear: Видаляє збережені траси.
+        - report: Текстовий звіт про найповільніші траси.
+    """
+
+    def __init__(self, keep : int = 100) -> None:
+        """
+            Ініціалізує вимкнений трасувальник без хуків.
+
+            Аргументи:
+                keep (int, optional): Кількість найповільніших трас, що зберігаються. За замовчуванням 100.
+        """
+        self.keep = keep
+        self._hooks = []
+        self._installed = []
+        self._traces = []
+        self._order = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Чи увімкнено трасування."""
+        return bool(self._installed)
+
+    def hook(self, owner : type, attribute : str, root : bool = False, detail = None):
+        """
+            Реєструє метод, виклики якого записуються як проміжки.
+
+            Аргументи:
+                owner (type): Клас, що визначає метод (хук встановлюється також у підкласи з власним методом).
+                attribute (str): Назва методу.
+                root (bool, optional): Чи починає виклик нову трасу. За замовчуванням False.
+                detail (callable, optional): Функція, що за аргументами виклику повертає опис кореневого проміжку.
+
+            Винятки:
+                AttributeError: Якщо клас не має методу attribute.
+        """
+        if not callable(getattr(owner, attribute, None)):
+            e = AttributeError(f"{owner.__name__}.{attribute} не є методом")
+            log.exception("Неможливо зареєструвати хук трасування", e)
+            raise e
+        with self._lock:
+            self._hooks.append((owner, attribute, root, detail))
+            if self._installed:
+                self._install(owner, attribute, root, detail)
+
+    def _install(self, owner : type, attribute : str, root : bool, detail):
+        """Встановлює обгортку на метод класу owner та підкласів, що визначають метод самостійно."""
+        classes = [owner]
+        for cls in classes:
+            classes.extend(subclass for subclass in cls.__subclasses__() if subclass not in classes)
+        for cls in classes:
+            function = cls.__dict__.get(attribute)
+            if callable(function) and not isinstance(function, type):
+                self._installed.append((cls, attribute, function))
+                setattr(cls, attribute, self._wrap(function, f"{cls.__name__}.{attribute}", root, detail))
+
+    def _wrap(self, function, name : str, root : bool, detail):
+        """Повертає обгортку, що записує виклик function як проміжок."""
+        local = self._local
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if not stack:
+                if not root:
+                    return function(*args, **kwargs)
+                stack = local.stack = []
+                span = Span(name, clock(), detail(*args, **kwargs) if detail is not None else None)
+            else:
+                span = Span(name, clock())
+                stack[-1].children.append(span)
+            stack.append(span)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                span.end = clock()
+                stack.pop()
+                if not stack:
+                    self._finish(span)
+        return wrapper
+
+    def _finish(self, span : Span):
+        """Додає завершену трасу до купи найповільніших."""
+        item = (span.duration, next(self._order), span)
+        with self._lock:
+            if len(self._traces) < self.keep:
+                heapq.heappush(self._traces, item)
+            elif item[0] > self._traces[0][0]:
+                heapq.heapreplace(self._traces, item)
+
+    def enable(self, keep : int = None):
+        """
+            Вмикає трасування: встановлює хуки всіх зареєстрованих методів.
+
+            Аргументи:
+                keep (int, optional): Нова кількість найповільніших трас, що зберігаються.
+
+            Винятки:
+                ValueError: Якщо keep не є додатним цілим числом.
+        """
+        if keep is not None:
+            if not isinstance(keep, int) or keep < 1:
+                e = ValueError(f"keep повинно бути додатним цілим числом, а не {keep!r}")
+                log.exception("Неможливо увімкнути трасування", e)
+                raise e
+            with self._lock:
+                self.keep = keep
+                while len(self._traces) > keep:
+                    heapq.heappop(self._traces)
+        with self._lock:
+            if not self._installed:
+                for owner, attribute, root, detail in self._hooks:
+                    self._install(owner, attribute, root, detail)
+        log.info("Трасування увімкнено: %s хуків", len(self._installed))
+
+    def disable(self):
+        """Вимикає трасування: повертає оригінальні методи (збережені траси залишаються)."""
+        with self._lock:
+            for cls, attribute, function in reversed(self._installed):
+                setattr(cls, attribute, function)
+            self._installed = []
+        log.info("Трасування вимкнено")
+
+    def slowest(self, limit : int = None) -> list:
+        """
+            Повертає найповільніші траси.
+
+            Аргументи:
+                limit (int, optional): Максимальна кількість трас. За замовчуванням - усі збережені.
+
+            Повертає:
+                list: Кореневі проміжки (Span) за спаданням тривалості.
+        """
+        with self._lock:
+            traces = sorted(self._traces, reverse=True)
+        return [span for _, _, span in traces[:limit]]
+
+    def clear(self):
+        """Видаляє збережені траси."""
+        with self._lock:
+            self._traces = []
+
+    def report(self, limit : int = 10) -> str:
+        """
+            Повертає текстовий звіт про найповільніші траси та сумарний власний час кожної фази в них.
+
+            Аргументи:
+                limit (int, optional): Кількість трас у звіті. За замовчуванням 10.
+
+            Повертає:
+                str: Текст звіту.
+        """
+        traces = self.slowest(limit)
+        phases = {}
+        pending = list(traces)
+        while pending:
+            span = pending.pop()
+            own = span.duration - sum(child.duration for child in span.children)
+            phases[span.name] = phases.get(span.name, 0) + own
+            pending.extend(span.children)
+
+        lines = [f"{'total':>15} {'own':>13}  phase"]
+        lines.extend(span.format() for span in traces)
+        lines.append("")
+        lines.append(f"Власний час фаз у {len(traces)} найповільніших трасах:")
+        lines.extend(f"{own / 1000:>15.3f} us  {name}"
+                     for name, own in sorted(phases.items(), key=lambda item: item[1], reverse=True))
+        return "\n".join(lines) + "\n"
+
+
+def profile_call(path : str, function, *args, top : int = 50, **kwargs):
+    """
+        Виконує функцію під cProfile та записує звіт у файл.
+
+        У path записується статистика у форматі pstats (для pstats, snakeviz тощо), а у path.txt -
+        текстовий звіт top функцій за накопиченим часом.
+
+        Аргументи:
+            path (str): Шлях до файлу статистики.
+            function (callable): Функція (наприклад, bank.execute_batch).
+            *args, **kwargs: Аргументи функції.
+            top (int, optional): Кількість функцій у текстовому звіті. За замовчуванням 50.
+
+        Повертає:
+            Результат function.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        with open(f"{path}.txt", "w", encoding="utf-8") as file:
+            pstats.Stats(profiler, stream=file).sort_stats("cumulative").print_stats(top)
+        log.info("Звіт профілювання %s записано у %s", getattr(function, "__qualname__", function), path)
+
+
+def trace_memory(path : str, function, *args, top : int = 25, frames : int = 10, **kwargs):
+    """
+        Виконує функцію під tracemalloc та записує звіт про виділення пам'яті у файл.
+
+        Звіт містить поточний і піковий обсяг пам'яті, виділеної під час виклику, та top рядків коду
+        з найбільшим приростом виділеної пам'яті.
+
+        Аргументи:
+            path (str): Шлях до текстового звіту.
+            function (callable): Функція (наприклад, bank.execute_batch).
+            *args, **kwargs: Аргументи функції.
+            top (int, optional): Кількість рядків коду у звіті. За замовчуванням 25.
+            frames (int, optional): Глибина стеку, що зберігається для кожного виділення. За замовчуванням 10.
+
+        Повертає:
+            Результат function.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        return function(*args, **kwargs)
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        report = io.StringIO()
+        report.write(f"Виділено: {(current - base) / 1024:,.1f} KiB, пік: {(peak - base) / 1024:,.1f} KiB\n\n")
+        for stat in after.compare_to(before, "lineno")[:top]:
+            report.write(f"{stat}\n")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(report.getvalue())
+        log.info("Звіт про пам'ять %s записано у %s", getattr(function, "__qualname__", function), path)
+
+
+def _transaction_id(owner, transaction = None, *args, **kwargs):
+    """Повертає опис кореневого проміжку: ID транзакції, якщо вона є серед аргументів."""
+    transaction = transaction if isinstance(transaction, Transaction) else owner
+    return f"#{transaction._transaction_id}" if isinstance(transaction, Transaction) else None
+
+
+tracer = Tracer()
+tracer.hook(Bank, "execute", root=True, detail=_transaction_id)
+tracer.hook(Bank, "execute_batch", root=True)
+tracer.hook(Bank, "_commit")
+tracer.hook(Bank, "_await_commit")
+tracer.hook(Transaction, "execute", root=True, detail=_transaction_id)
+tracer.hook(Transaction, "_check_blocked")
+tracer.hook(Cheking_account, "_prepare_withdraw")
+tracer.hook(Cheking_account, "_prepare_deposit")
+tracer.hook(Cheking_account, "withdraw")
+tracer.hook(Cheking_account, "deposit")
+tracer.hook(Money, "convert")
+tracer.hook(CurrencyRates, "convert")
+tracer.hook(Logger, "_write")
@@ -1,42 +1,124 @@
 import datetime
+import time
 from types import NoneType
-from accounts import Cheking_account, Credit_account, Savings_account
+from typing import NamedTuple
+from accounts import Cheking_account, Credit_account, Savings_account, _notify_balance
 from logger import log
-from currency import currate
+from concurrency import IdAllocator, account_locks
+from money import Money
+from metrics import metrics
 
 """
 Модуль transaction містить класи для роботи з транзакціями.
 
 Класи:
+- TransactionRecord: Компактний незмінний запис виконаної транзакції.
 - Transaction: Базовий клас для транзакцій.
 - DepositTransaction: Клас для депозитних транзакцій.
 - TransferTransaction: Клас для переказів.
+- CompositeTransaction: Клас для кількох переказів, що виконуються атомарно.
 - WithdrawTransaction: Клас для зняття коштів.
 - CalculateInterestTransaction: Клас для нарахування відсотків.
 """
 
+_transactions = metrics.counter("bank_transactions_total", "Виклики Transaction.execute", ("kind",))
+_transaction_errors = metrics.counter("bank_transaction_errors_total", "Транзакції, що завершились помилкою", ("kind",))
+_transaction_seconds = metrics.histogram("bank_transaction_seconds", "Час виконання Transaction.execute", ("kind",))
+_timed = metrics.timed(_transaction_seconds, _transactions, _transaction_errors, lambda transaction: (transaction._kind,))
+
+def _apply_transfers(legs):
+    """
+        Атомарно (все або нічого) виконує перекази; рахунки вже повинні бути заблоковані.
+
+        Для кожного переказу спочатку обидва рахунки перевіряють операцію без зміни балансу
+        (_prepare_withdraw, _prepare_deposit: валюта, мінімальна сума, достатність коштів),
+        і лише потім баланси змінюються. Стан кожного задіяного рахунку запам'ятовується
+        перед першою зміною, тож якщо будь-який переказ завершується помилкою,
+        усі вже виконані перекази компенсуються відновленням цього стану. Підписники на зміни
+        балансів (observe_balances) отримують зміни лише після успішного виконання всіх переказів.
+
+        Аргументи:
+            legs (iterable): Перекази (amount: Money, source, target).
+
+        Винятки:
+            Exception: Помилка переказу (стан усіх рахунків відновлено).
+    """
+    saved = {}
+    changes = []
+    try:
+        for amount, source, target in legs:
+            for account in (source, target):
+                if account._account_id not in saved:
+                    saved[account._account_id] = (account, account._state())
+            debit = source._prepare_withdraw(amount)
+            credit = target._prepare_deposit(amount.convert(target._currency))
+            source._balance -= debit
+            target._balance += credit
+            changes.append((source, -debit._minor))
+            changes.append((target, credit._minor))
+    except Exception:
+        for account, state in saved.values():
+            account._load_state(state)
+        raise
+    for account, change in changes:
+        _notify_balance(account, change)
+
+
+class TransactionRecord(NamedTuple):
+    """
+        Компактний незмінний запис виконаної транзакції.
+
+        Не тримає посилань на об'єкти рахунків, тому придатний для довгої історії транзакцій.
+
+        Атрибути:
+        - transaction_id: ID транзакції.
+        - kind: Тип транзакції (deposit, transfer, withdraw, interest).
+        - source_id: ID вихідного рахунку або None.
+        - target_id: ID цільового рахунку або None.
+        - amount: Сума у мінорних одиницях.
+        - currency: Валюта суми.
+        - timestamp: Час виконання (наносекунди від епохи).
+    """
+    transaction_id: int
+    kind: str
+    source_id: int
+    target_id: int
+    amount: int
+    currency: str
+    timestamp: int
+
+
 class Transaction:
     """
         Базовий клас для транзакцій.
 
         Атрибути класу:
-        - __id: Лічильник для генерації унікальних ID транзакцій.
+        - __ids: Потокобезпечний генератор унікальних ID транзакцій (IdAllocator).
+        - _kind: Тип транзакції для TransactionRecord.
 
         Атрибути екземпляра:
         - _transaction_id: Унікальний ідентифікатор транзакції.
         - _source: Вихідний рахунок.
         - _target: Цільовий рахунок.
-        - _amount: Сума транзакції.
+        - _amount: Сума транзакції (Money).
         - _data: Дата та час транзакції.
 
         Методи:
         - __init__: Ініціалізує транзакцію.
         - change_id: Змінює ID транзакції (класовий метод).
-        - execute: Виконує транзакцію (абстрактний метод).
+        - _advance_id: Зсуває лічильник ID за вже використаний ID (класовий метод).
+        - _stride_ids: Задає крок ID транзакцій для шардів (класовий метод).
+        - execute: Виконує транзакцію (абстрактний метод; реалізації підкласів записують кількість викликів,
+          помилок та час виконання у метрики bank_transaction_*, див. metrics.py).
         - _check_blocked: Перевіряє, чи заблоковані рахунки.
+        - _accounts: Повертає рахунки, задіяні у транзакції.
+        - to_record: Повертає компактний запис транзакції.
+        - to_records: Повертає записи транзакції для історії.
         """
 
-    __id = 1
+    __slots__ = ("_transaction_id", "_source", "_target", "_amount", "_data")
+    __ids = IdAllocator()
+    _kind = "transaction"
 
     @classmethod
     def change_id(cls):
@@ -46,25 +128,68 @@ class Transaction:
                 Повертає:
                     int: Новий ID транзакції.
         """
-        cls.__id += 1
-        return cls.__id - 1
+        return Transaction.__ids.next()
+
+    @classmethod
+    def _advance_id(cls, transaction_id : int):
+        """
+                Гарантує, що наступні згенеровані ID будуть більшими за transaction_id.
+
+                Аргументи:
+                    transaction_id (int): Вже використаний ID.
+        """
+        Transaction.__ids.advance(transaction_id)
+
+    @classmethod
+    def _reserve_ids(cls, count : int) -> range:
+        """
+                Резервує count наступних ID транзакцій.
+
+                Аргументи:
+                    count (int): Кількість ID.
+
+                Повертає:
+                    range: Зарезервовані ID.
+        """
+        return Transaction.__ids.reserve(count)
+
+    @staticmethod
+    def _next_id() -> int:
+        """Повертає ID, який буде видано наступній транзакції."""
+        return Transaction.__ids.peek()
+
+    @classmethod
+    def _stride_ids(cls, step : int, offset : int):
+        """
+                Задає крок ID транзакцій (див. IdAllocator.stride), щоб шарди не видавали однакових ID.
 
-    def __init__(self, amount: (float, int), source : (Credit_account, Cheking_account, Savings_account) = None,
-                 target : (Credit_account, Cheking_account, Savings_account) = None) -> None :
+                Аргументи:
+                    step (int): Крок ID.
+                    offset (int): Остача ID від ділення на step.
+        """
+        Transaction.__ids.stride(step, offset)
+
+    def _new_id(self) -> int:
+        """Генерує ID нової транзакції."""
+        return Transaction.change_id()
+
+    def __init__(self, amount: (float, int, Money), source : (Credit_account, Cheking_account, Savings_account) = None,
+                 target : (Credit_account, Cheking_account, Savings_account) = None, currency : str = "UAH") -> None :
         """
                 Ініціалізує нову транзакцію.
 
                 Аргументи:
-                    amount (float, int): Сума транзакції.
+                    amount (float, int, Money): Сума транзакції.
                     source (Account, optional): Вихідний рахунок. За замовчуванням None.
                     target (Account, optional): Цільовий рахунок. За замовчуванням None.
+                    currency (str, optional): Валюта числової суми (для Money береться його валюта). За замовчуванням "UAH".
 
                 Винятки:
                     Exception: Якщо amount не є числом або менше 0.
                     Exception: Якщо source або target мають невірний тип.
                 """
 
-        if not isinstance(amount, (float, int, NoneType)) or amount < 0:
+        if not isinstance(amount, (float, int, Money, NoneType)) or (amount is not None and amount < 0):
             e = Exception(f"amount повинно бути числом більше 0, а не {amount}")
             log.exception("Недопустиме значення аргументу", e)
             raise e
@@ -80,12 +205,12 @@ class Transaction:
             raise e
 
 
-        self._transaction_id = Transaction.change_id()
+        self._transaction_id = self._new_id()
         self._source = source
         self._target = target
-        self._amount = amount
+        self._amount = Money.of(amount, currency) if amount is not None else None
         self._data = datetime.datetime.now()
-        log.info(f"Була створена транзакція з id : {self._transaction_id}")
+        log.info("Була створена транзакція з id : %s", self._transaction_id, transaction_id=self._transaction_id)
 
     def __str__(self):
         """
@@ -100,6 +225,45 @@ class Transaction:
         """Абстрактний метод для виконання транзакції."""
         pass
 
+    def to_record(self, timestamp : int = None) -> TransactionRecord:
+        """
+                Повертає компактний незмінний запис транзакції.
+
+                Аргументи:
+                    timestamp (int, optional): Час виконання у наносекундах від епохи. За замовчуванням - поточний час.
+
+                Повертає:
+                    TransactionRecord: Запис транзакції.
+        """
+        amount = self._amount
+        return TransactionRecord(self._transaction_id, self._kind,
+                                 self._source._account_id if self._source is not None else None,
+                                 self._target._account_id if self._target is not None else None,
+                                 amount._minor if amount is not None else 0,
+                                 amount._currency if amount is not None else None,
+                                 timestamp if timestamp is not None else time.time_ns())
+
+    def to_records(self, timestamp : int = None) -> list:
+        """
+                Повертає записи транзакції для історії банку.
+
+                Аргументи:
+                    timestamp (int, optional): Час виконання у наносекундах від епохи. За замовчуванням - поточний час.
+
+                Повертає:
+                    list: Записи TransactionRecord (для звичайної транзакції - один запис).
+        """
+        return [self.to_record(timestamp)]
+
+    def _accounts(self) -> tuple:
+        """
+                Повертає рахунки, задіяні у транзакції.
+
+                Повертає:
+                    tuple: Рахунки (без None).
+        """
+        return tuple(account for account in (self._source, self._target) if account is not None)
+
     def _check_blocked(self):
         """
                 Перевіряє, чи заблоковані рахунки.
@@ -121,6 +285,9 @@ class DepositTransaction(Transaction):
         - __init__: Ініціалізує депозитну транзакцію.
         - execute: Виконує депозит.
         """
+    __slots__ = ()
+    _kind = "deposit"
+
     def __init__(self, amount : float, target : (Credit_account, Cheking_account, Savings_account)):
         """
                 Ініціалізує депозитну транзакцію.
@@ -132,21 +299,23 @@ class DepositTransaction(Transaction):
         super().__init__(amount,None, target)
 
 
+    @_timed
     def execute(self):
         """
-                Виконує депозит на цільовий рахунок.
+                Виконує депозит на цільовий рахунок (під блокуванням рахунку).
 
                 Винятки:
                     Exception: Якщо рахунок заблоковано.
         """
-        try:
-            self._check_blocked()
-        except Exception as e:
-            log.exception(f"Помилка транзакції #{self._transaction_id}", e)
-            raise e
+        with account_locks.hold(self._target):
+            try:
+                self._check_blocked()
+            except Exception as e:
+                log.exception("Помилка транзакції #%s", e, self._transaction_id, transaction_id=self._transaction_id)
+                raise e
 
-        self._target.deposit(self._amount)
-        log.info(f"Була проведена транзакція з id : {self._transaction_id}")
+            self._target.deposit(self._amount)
+        log.info("Була проведена транзакція з id : %s", self._transaction_id, transaction_id=self._transaction_id)
 
 class TransferTransaction(Transaction):
     """
@@ -156,12 +325,15 @@ class TransferTransaction(Transaction):
         - __init__: Ініціалізує транзакцію переказу.
         - execute: Виконує переказ.
     """
+    __slots__ = ()
+    _kind = "transfer"
+
     def __init__(self, amount : float, source : (Credit_account, Cheking_account, Savings_account), target : (Credit_account, Cheking_account, Savings_account)) -> None:
         """
             Ініціалізує транзакцію переказу.
 
             Аргументи:
-                amount (float): Сума переказу.
+                amount (float, Money): Сума переказу (числова сума - у валюті вихідного рахунку).
                 source (Account): Вихідний рахунок.
                 target (Account): Цільовий рахунок.
 
@@ -172,25 +344,153 @@ class TransferTransaction(Transaction):
             e = TypeError("source, target - не можуть бути None")
             log.exception("Неприпустиме значення атрибутів", e)
             raise e
-        super().__init__(amount, source, target)
+        super().__init__(amount, source, target, getattr(source, "_currency", "UAH"))
 
+    @_timed
     def execute(self):
         """
             Виконує переказ між рахунками з конвертацією валют.
 
+            Обидва рахунки блокуються на весь час переказу (у порядку зростання ID). Переказ атомарний:
+            зняття та поповнення спершу перевіряються обома рахунками і лише потім застосовуються,
+            а якщо застосування не вдалося, стан обох рахунків відновлюється.
+
             Винятки:
-                Exception: Якщо рахунки заблоковано.
+                Exception: Якщо рахунки заблоковано або зняття чи поповнення неможливе (баланси не змінюються).
         """
-        try:
-            self._check_blocked()
-        except Exception as e:
-            log.exception(f"Помилка транзакції #{self._transaction_id}", e)
+        with account_locks.hold(self._source, self._target):
+            try:
+                self._check_blocked()
+                _apply_transfers(((self._amount, self._source, self._target),))
+            except Exception as e:
+                log.exception("Помилка транзакції #%s", e, self._transaction_id, transaction_id=self._transaction_id)
+                raise e
+        log.info("Була проведена транзакція з id : %s", self._transaction_id, transaction_id=self._transaction_id)
+
+class CompositeTransaction(Transaction):
+    """
+        Клас для кількох переказів, що виконуються атомарно як одна транзакція.
+
+        Або виконуються всі перекази, або (якщо хоча б один неможливий) жоден.
+        Кожен переказ отримує власний ID з діапазону, зарезервованого при створенні;
+        ID транзакції - перший з них.
+
+        Атрибути екземпляра:
+        - _legs: Перекази (amount: Money, source, target).
+        - _ids: Зарезервовані ID переказів.
+
+        Методи:
+        - __init__: Ініціалізує складену транзакцію.
+        - execute: Виконує всі перекази.
+        - to_records: Повертає записи переказів.
+    """
+    __slots__ = ("_legs", "_ids")
+    _kind = "transfer"
+
+    def __init__(self, legs) -> None:
+        """
+            Ініціалізує складену транзакцію.
+
+            Аргументи:
+                legs (iterable): Перекази (amount, source, target); числова сума - у валюті вихідного рахунку.
+
+            Винятки:
+                ValueError: Якщо не вказано жодного переказу.
+                Exception: Якщо сума переказу не є числом більше 0 або рахунки мають невірний тип.
+        """
+        prepared = []
+        for amount, source, target in legs:
+            if not isinstance(source, (Cheking_account, Credit_account, Savings_account)) or \
+                    not isinstance(target, (Cheking_account, Credit_account, Savings_account)):
+                e = Exception(f"source, target повинні бути рахунками, а не {source}, {target}")
+                log.exception("Недопустиме значення аргументу", e)
+                raise e
+            if not isinstance(amount, (float, int, Money)) or amount <= 0:
+                e = Exception(f"amount повинно бути числом більше 0, а не {amount}")
+                log.exception("Недопустиме значення аргументу", e)
+                raise e
+            prepared.append((Money.of(amount, source._currency), source, target))
+
+        if not prepared:
+            e = ValueError("Складена транзакція повинна містити хоча б один переказ")
+            log.exception("Недопустиме значення аргументу", e)
             raise e
 
-        real_amount = currate.convert(self._amount, self._source._currency, self._target._currency)
-        self._source.withdraw(self._amount)
-        self._target.deposit(real_amount)
-        log.info(f"Була проведена транзакція з id : {self._transaction_id}")
+        self._legs = tuple(prepared)
+        super().__init__(None)
+
+    def _new_id(self) -> int:
+        """Резервує ID для кожного переказу та повертає перший з них."""
+        self._ids = Transaction._reserve_ids(len(self._legs))
+        return self._ids[0]
+
+    def _accounts(self) -> tuple:
+        """
+                Повертає рахунки, задіяні у всіх переказах транзакції.
+
+                Повертає:
+                    tuple: Рахунки без повторів у порядку першої появи.
+        """
+        accounts = {}
+        for _, source, target in self._legs:
+            accounts[source._account_id] = source
+            accounts[target._account_id] = target
+        return tuple(accounts.values())
+
+    def _check_blocked(self):
+        """
+                Перевіряє, чи заблоковані рахунки транзакції.
+
+                Винятки:
+                    Exception: Якщо будь-який задіяний рахунок заблоковано.
+        """
+        for account in self._accounts():
+            if account._blocked:
+                raise Exception(f"Акаунт #{account._account_id} Заблоковано")
+
+    @_timed
+    def execute(self):
+        """
+            Виконує всі перекази атомарно.
+
+            Усі задіяні рахунки блокуються (у порядку зростання ID) на весь час виконання.
+            Якщо будь-який переказ неможливий, вже виконані перекази компенсуються.
+
+            Винятки:
+                Exception: Якщо рахунки заблоковано або будь-який переказ неможливий (баланси не змінюються).
+        """
+        with account_locks.hold(*self._accounts()):
+            try:
+                self._check_blocked()
+                _apply_transfers(self._legs)
+            except Exception as e:
+                log.exception("Помилка транзакції #%s", e, self._transaction_id, transaction_id=self._transaction_id)
+                raise e
+        log.info("Була проведена транзакція з id : %s (%s переказів)", self._transaction_id, len(self._legs),
+                 transaction_id=self._transaction_id)
+
+    def to_record(self, timestamp : int = None) -> TransactionRecord:
+        """
+            Повертає запис першого переказу (усі записи повертає to_records).
+        """
+        return self.to_records(timestamp)[0]
+
+    def to_records(self, timestamp : int = None) -> list:
+        """
+            Повертає записи всіх переказів з однаковим часом виконання.
+
+            Аргументи:
+                timestamp (int, optional): Час виконання у наносекундах від епохи. За замовчуванням - поточний час.
+
+            Повертає:
+                list: Записи TransactionRecord у порядку переказів.
+        """
+        if timestamp is None:
+            timestamp = time.time_ns()
+        return [TransactionRecord(transaction_id, self._kind, source._account_id, target._account_id,
+                                  amount._minor, amount._currency, timestamp)
+                for transaction_id, (amount, source, target) in zip(self._ids, self._legs)]
+
 
 class WithdrawTransaction(Transaction):
     """
@@ -200,6 +500,9 @@ class WithdrawTransaction(Transaction):
     - __init__: Ініціалізує транзакцію зняття.
     - execute: Виконує зняття коштів.
     """
+    __slots__ = ()
+    _kind = "withdraw"
+
     def __init__(self, amount : float, source : (Credit_account, Cheking_account, Savings_account)):
         """
             Ініціалізує транзакцію зняття коштів.
@@ -211,21 +514,23 @@ class WithdrawTransaction(Transaction):
         super().__init__(amount, source, None)
 
 
+    @_timed
     def execute(self):
         """
-            Виконує зняття коштів з рахунку.
+            Виконує зняття коштів з рахунку (під блокуванням рахунку).
 
             Винятки:
                 Exception: Якщо рахунок заблоковано.
         """
-        try:
-            self._check_blocked()
-        except Exception as e:
-            log.exception(f"Помилка транзакції #{self._transaction_id}", e)
-            raise e
+        with account_locks.hold(self._source):
+            try:
+                self._check_blocked()
+            except Exception as e:
+                log.exception("Помилка транзакції #%s", e, self._transaction_id, transaction_id=self._transaction_id)
+                raise e
 
-        self._source.withdraw(self._amount)
-        log.info(f"Була проведена транзакція з id : {self._transaction_id}")
+            self._source.withdraw(self._amount)
+        log.info("Була проведена транзакція з id : %s", self._transaction_id, transaction_id=self._transaction_id)
 
 class CalculateInterestTransaction(Transaction):
     """
@@ -235,10 +540,16 @@ class CalculateInterestTransaction(Transaction):
         - __init__: Ініціалізує транзакцію нарахування відсотків.
         - execute: Виконує нарахування відсотків.
     """
+    __slots__ = ()
+    _kind = "interest"
+
     def __init__(self, target : (Credit_account, Cheking_account, Savings_account)):
         """
             Ініціалізує транзакцію нарахування відсотків.
 
+            Сума транзакції - відсотки, що належать до нарахування на момент створення;
+            фактично нараховані відсотки фіксуються під час execute.
+
             Аргументи:
                 target (Account): Цільовий рахунок (кредитний або ощадний).
 
@@ -250,24 +561,23 @@ class CalculateInterestTransaction(Transaction):
             log.exception("Недопустиме значення аргументу", e)
             raise e
         super().__init__(None, None, target)
-        self._amount = self._target.calculate_interest()
+        self._amount = self._target.interest_due()
 
+    @_timed
     def execute(self):
         """
-            Виконує нарахування відсотків на рахунок.
+            Виконує нарахування відсотків на рахунок (під блокуванням рахунку).
 
             Винятки:
                 Exception: Якщо виникла помилка під час нарахування.
         """
         try:
-            if isinstance(self._target, Credit_account):
-                self._target._credit += self._amount
-
-            if isinstance(self._target, Savings_account):
-                self._target.deposit(self._amount)
+            with account_locks.hold(self._target):
+                self._amount = self._target.calculate_interest()
 
-            log.info(f"Нараховано {self._amount} грн відсотків. Транзакція #{self._transaction_id}")
+            log.info("Нараховано %s відсотків. Транзакція #%s", self._amount, self._transaction_id,
+                     transaction_id=self._transaction_id, account_id=self._target._account_id)
 
         except Exception as e:
-            log.exception(f"Помилка транзакції #{self._transaction_id}", e)
+            log.exception("Помилка транзакції #%s", e, self._transaction_id, transaction_id=self._transaction_id)
             raise e
\ No newline at end of file
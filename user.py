@@ -1,5 +1,5 @@
 from logger import log
-from accounts import Cheking_account, Credit_account, Savings_account
+from concurrency import IdAllocator
 """
 Модуль user містить клас для роботи з користувачами банку.
 
@@ -11,7 +11,7 @@ class User:
         Клас, що представляє користувача банку.
 
         Атрибути класу:
-        - __id: Лічильник для генерації унікальних ID користувачів.
+        - __ids: Потокобезпечний генератор унікальних ID користувачів (IdAllocator).
 
         Атрибути екземпляра:
         - _user_id: Унікальний ідентифікатор користувача.
@@ -24,11 +24,17 @@ class User:
         Методи:
         - __init__: Ініціалізує користувача.
         - _change_id: Змінює ID користувача (класовий метод).
+        - _advance_id: Зсуває лічильник ID за вже використаний ID (класовий метод).
+        - _next_id: Повертає ID, який буде видано наступним (класовий метод).
+        - _reserve_ids: Резервує діапазон ID для пакетного створення користувачів (класовий метод).
+        - _dump: Повертає дані користувача для журналу.
+        - _restore: Відновлює користувача з даних журналу (класовий метод).
         - get_user_id: Повертає ID користувача.
         - get_full_name: Повертає повне ім'я користувача.
         - add_account: Додає рахунок до списку користувача.
     """
-    __id = 1
+    __slots__ = ("_user_id", "_first_name", "_last_name", "_email", "_phone_number", "_accounts_list")
+    __ids = IdAllocator()
 
     @classmethod
     def _generate_user_id(cls):
@@ -38,9 +44,35 @@ class User:
             Повертає:
                 int: Новий ID користувача.
         """
-        user_id = cls.__id
-        cls.__id += 1
-        return user_id
+        return User.__ids.next()
+
+    @classmethod
+    def _advance_id(cls, user_id : int):
+        """
+            Гарантує, що наступні згенеровані ID будуть більшими за user_id.
+
+            Аргументи:
+                user_id (int): Вже використаний ID.
+        """
+        User.__ids.advance(user_id)
+
+    @classmethod
+    def _next_id(cls) -> int:
+        """Повертає ID, який буде видано наступному користувачу."""
+        return User.__ids.peek()
+
+    @classmethod
+    def _reserve_ids(cls, count : int) -> range:
+        """
+            Резервує count наступних ID користувачів (для Bank.bulk_add_users).
+
+            Аргументи:
+                count (int): Кількість ID.
+
+            Повертає:
+                range: Зарезервовані ID.
+        """
+        return User.__ids.reserve(count)
 
     def __init__(self, first_name: str, last_name: str, email: str = None, phone_number: str = None):
         """
@@ -65,7 +97,41 @@ class User:
         self._email = email
         self._phone_number = phone_number
         self._accounts_list = {}
-        log.info(f"Створено нового користувача з ID: {self._user_id}, ім'я: {self._first_name} {self._last_name}")
+        log.info("Створено нового користувача з ID: %s, ім'я: %s %s", self._user_id, self._first_name, self._last_name)
+
+    def _dump(self) -> dict:
+        """
+            Повертає дані користувача для журналу.
+
+            Повертає:
+                dict: Словник з ключами id, first_name, last_name, email, phone_number.
+        """
+        return {"id": self._user_id, "first_name": self._first_name, "last_name": self._last_name,
+                "email": self._email, "phone_number": self._phone_number}
+
+    @classmethod
+    def _restore(cls, data : dict, advance : bool = True):
+        """
+            Відновлює користувача з даних журналу без генерації нового ID.
+
+            Аргументи:
+                data (dict): Дані, отримані з _dump.
+                advance (bool, optional): Зсунути лічильник ID за ID користувача. False - якщо ID вже
+                    зарезервовано (Bank.bulk_add_users). За замовчуванням True.
+
+            Повертає:
+                User: Відновлений користувач (без рахунків).
+        """
+        user = object.__new__(cls)
+        user._user_id = data["id"]
+        user._first_name = data["first_name"]
+        user._last_name = data["last_name"]
+        user._email = data["email"]
+        user._phone_number = data["phone_number"]
+        user._accounts_list = {}
+        if advance:
+            User._advance_id(user._user_id)
+        return user
 
     def __str__(self):
         """
@@ -94,7 +160,7 @@ class User:
         """
         return f"{self._first_name} {self._last_name}"
 
-    def add_account(self, account : (Cheking_account, Savings_account, Credit_account)) -> None:
+    def add_account(self, account) -> None:
         """
             Додає рахунок до списку користувача.
 
@@ -104,6 +170,9 @@ class User:
             Винятки:
                 TypeError: Якщо account має невірний тип.
         """
+        # accounts імпортує user, тому імпорт виконується тут, а не на рівні модуля
+        from accounts import Cheking_account, Credit_account, Savings_account
+
         if not isinstance(account, (Cheking_account, Savings_account, Credit_account)):
             e = TypeError("Об'єкт не є дійсним типом банківського рахунку")
             log.exception("Неіснуючий акаунт", e)